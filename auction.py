@@ -0,0 +1,163 @@
+"""
+This module computes call-auction (batch uncross) results for an order book.
+
+A call auction executes every crossing order at one clearing price instead
+of uncrossing one fill at a time. The clearing price is chosen from the
+aggregated supply and demand curves:
+
+- demand at price p is the total quantity bid at p or higher,
+- supply at p is the total quantity offered at p or lower,
+- the executable volume at p is min(demand, supply).
+
+Only the level prices inside the crossed range [best ask, best bid] are
+candidates. The price with the highest volume wins; ties go to the smallest
+imbalance |demand - supply|, then to the price closest to the reference
+price (the last matched price), then to the lower price.
+
+At the clearing price every eligible order on the short side fills in full.
+On the long side, levels priced better than the clearing price fill in full
+and the marginal level shares what is left, either in time priority (FIFO)
+or in proportion to order size (pro-rata, with rounding lots handed out in
+time priority).
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+ALLOCATIONS = ("fifo", "pro_rata")
+
+
+class AuctionResult:
+    __slots__ = ("price", "volume", "demand", "supply")
+
+    def __init__(self, price, volume, demand, supply):
+        """
+        Initialize a new AuctionResult object.
+
+        Args:
+            price (float): The clearing price.
+            volume (int): The quantity executed at the clearing price.
+            demand (int): The quantity bid at or above the clearing price.
+            supply (int): The quantity offered at or below the clearing price.
+        """
+        self.price = price
+        self.volume = volume
+        self.demand = demand
+        self.supply = supply
+
+    @property
+    def imbalance(self):
+        """Unexecuted eligible quantity: positive for surplus demand, negative for surplus supply."""
+        return self.demand - self.supply
+
+    def __repr__(self):
+        return (f"AuctionResult(price={self.price}, volume={self.volume}, "
+                f"demand={self.demand}, supply={self.supply})")
+
+
+def _crossed_levels(side, limit_price):
+    # Levels of one side that can trade against limit_price, best first
+    levels = []
+    for level in side.iter_levels():
+        if (level.price < limit_price) if side.sign > 0 else (level.price > limit_price):
+            break
+        levels.append(level)
+    return levels
+
+
+def clearing_price(bids, asks, reference_price=None):
+    """
+    Compute the price that maximizes the executed volume of a crossed book.
+
+    This visits only the price levels inside the crossed range, so the cost is
+    O(L log L) for L crossed levels regardless of the number of orders.
+
+    Args:
+        bids (BookSide): The buy side.
+        asks (BookSide): The sell side.
+        reference_price (float, optional): Price used to break ties between
+            equally good clearing prices. Defaults to None.
+
+    Returns:
+        AuctionResult: The clearing price and volume, or None if the book is not crossed.
+    """
+    best_bid, best_ask = bids.best(), asks.best()
+    if best_bid is None or best_ask is None or best_bid.price < best_ask.price:
+        return None
+
+    buy_levels = _crossed_levels(bids, best_ask.price)
+    sell_levels = _crossed_levels(asks, best_bid.price)
+
+    # Ascending prices with cumulative quantity from the far end of each curve:
+    # demand(p) sums bids priced >= p, supply(p) sums asks priced <= p
+    buy_prices = [level.price for level in reversed(buy_levels)]
+    demand = list(accumulate(level.quantity for level in buy_levels))[::-1]
+    sell_prices = [level.price for level in sell_levels]
+    supply = list(accumulate(level.quantity for level in sell_levels))
+
+    best = None
+    best_rank = None
+    for price in sorted(set(buy_prices) | set(sell_prices)):
+        index = bisect_left(buy_prices, price)
+        demanded = demand[index] if index < len(demand) else 0
+        index = bisect_right(sell_prices, price)
+        supplied = supply[index - 1] if index else 0
+        volume = min(demanded, supplied)
+        distance = abs(price - reference_price) if reference_price is not None else 0.0
+        rank = (-volume, abs(demanded - supplied), distance)
+        if best_rank is None or rank < best_rank:
+            best_rank = rank
+            best = AuctionResult(price, volume, demanded, supplied)
+    return best if best.volume else None
+
+
+def allocate(side, price, volume, allocation="fifo"):
+    """
+    Allocate an auction volume to one side's eligible orders.
+
+    Args:
+        side (BookSide): The side to allocate.
+        price (float): The clearing price; orders priced worse do not take part.
+        volume (int): The quantity to allocate.
+        allocation (str, optional): "fifo" or "pro_rata", applied at the marginal level. Defaults to "fifo".
+
+    Returns:
+        list: (level, order, quantity) tuples in priority order, omitting orders allocated nothing.
+
+    Raises:
+        ValueError: If the allocation method is unknown.
+    """
+    if allocation not in ALLOCATIONS:
+        raise ValueError(f"Allocation must be one of {', '.join(ALLOCATIONS)}")
+
+    fills = []
+    remaining = volume
+    for level in _crossed_levels(side, price):
+        if remaining <= 0:
+            break
+        if level.quantity <= remaining:
+            # The whole level trades
+            fills.extend((level, order, order.quantity) for order in level.orders)
+            remaining -= level.quantity
+            continue
+
+        # Marginal level: share what is left
+        if allocation == "fifo":
+            for order in level.orders:
+                quantity = min(order.quantity, remaining)
+                fills.append((level, order, quantity))
+                remaining -= quantity
+                if not remaining:
+                    break
+        else:
+            shares = [order.quantity * remaining // level.quantity for order in level.orders]
+            leftover = remaining - sum(shares)
+            for order, share in zip(level.orders, shares):
+                # Rounding lots go one at a time to the oldest orders
+                if leftover and share < order.quantity:
+                    share += 1
+                    leftover -= 1
+                if share:
+                    fills.append((level, order, share))
+        remaining = 0
+    return fills
@@ -0,0 +1,381 @@
+"""
+This module contains the user store and session tokens used to authenticate users.
+
+Users are kept in a dictionary keyed by username, so finding a user is O(1)
+and at most one bcrypt check runs per login. A successful login returns a
+session token; later requests present the token and are validated with a
+dictionary lookup and an expiry check instead of another bcrypt check.
+
+bcrypt is deliberately slow, so the *_async methods run hashing and checks
+on a thread pool (bcrypt releases the GIL) and return futures; the a*
+coroutines wrap those for asyncio callers. The matching engine and the Qt
+event loop keep running while a login is being verified.
+
+With a repository (see user_repository.py) users are persisted with their
+hashes and loaded lazily on first lookup, so startup does no bcrypt work
+however many users exist.
+
+Self-registration only creates the roles in SELF_SERVICE_ROLES. Admins are
+granted by an existing admin (UserStore.grant_role) or created from the
+command line by whoever can write the user database:
+
+    python auth.py add-user alice --role admin
+    python auth.py set-role bob admin
+"""
+
+import argparse
+import asyncio
+import getpass
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from user import User
+
+# Roles a user may choose when registering themselves; 'admin' must be granted
+SELF_SERVICE_ROLES = ('trader', 'viewer')
+
+
+class SessionManager:
+    def __init__(self, ttl=3600, clock=time.monotonic):
+        """
+        Initialize a new SessionManager object.
+
+        Args:
+            ttl (float, optional): Seconds a session stays valid after it is created. Defaults to 3600.
+            clock (callable, optional): Monotonic clock returning seconds. Defaults to time.monotonic.
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self._sessions = {}  # Token -> (user, expiry time)
+        self._lock = threading.Lock()  # Guards _sessions; logins complete on worker threads
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self, user):
+        """
+        Create a session for an authenticated user.
+
+        Args:
+            user (User): The user that was authenticated.
+
+        Returns:
+            str: An unguessable session token.
+        """
+        token = secrets.token_urlsafe(32)
+        expires_at = self.clock() + self.ttl
+        with self._lock:
+            self._sessions[token] = (user, expires_at)
+        return token
+
+    def validate(self, token):
+        """
+        Return the user of a live session in O(1), dropping the session if it has expired.
+
+        Args:
+            token (str): The session token, may be None.
+
+        Returns:
+            User: The session's user, or None if the token is unknown or expired.
+        """
+        session = self._sessions.get(token)
+        if session is None:
+            return None
+        user, expires_at = session
+        if self.clock() >= expires_at:
+            # Another thread may have dropped or revoked it since the lookup
+            with self._lock:
+                if self._sessions.get(token) is session:
+                    del self._sessions[token]
+            return None
+        return user
+
+    def revoke(self, token):
+        """Remove a session. Returns True if it existed."""
+        with self._lock:
+            return self._sessions.pop(token, None) is not None
+
+    def revoke_user(self, username):
+        """Remove every session belonging to the given username and return how many were removed."""
+        with self._lock:
+            tokens = [token for token, (user, _) in self._sessions.items() if user.username == username]
+            for token in tokens:
+                del self._sessions[token]
+        return len(tokens)
+
+    def purge_expired(self):
+        """Remove all expired sessions and return how many were removed."""
+        now = self.clock()
+        with self._lock:
+            expired = [token for token, (_, expires_at) in self._sessions.items() if now >= expires_at]
+            for token in expired:
+                del self._sessions[token]
+        return len(expired)
+
+
+class UserStore:
+    def __init__(self, session_ttl=3600, bcrypt_rounds=None, max_workers=None, repository=None):
+        """
+        Initialize a new UserStore object.
+
+        Args:
+            repository (SQLiteUserRepository, optional): Persistent storage for users. When
+                given, self.users only caches the users looked up so far. Defaults to None,
+                which keeps users in memory only.
+            session_ttl (float, optional): Seconds a login session stays valid. Defaults to 3600.
+            bcrypt_rounds (int, optional): bcrypt cost factor for new password hashes.
+                Defaults to User.bcrypt_rounds.
+            max_workers (int, optional): Size of the bcrypt thread pool, created on first
+                use of an async method. Defaults to the number of CPUs.
+        """
+        self.users = {}  # Username -> User (a lazily filled cache when a repository is used)
+        self.repository = repository
+        self.sessions = SessionManager(ttl=session_ttl)
+        self.bcrypt_rounds = bcrypt_rounds
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()  # Guards users and _pending across worker threads
+        self._pending = set()  # Usernames whose password is still being hashed
+
+    def __len__(self):
+        return self.repository.count() if self.repository is not None else len(self.users)
+
+    def __contains__(self, username):
+        return self.get_user(username) is not None
+
+    def add_user(self, username, password, role):
+        """
+        Adds a new user, hashing the password once.
+
+        Args:
+            username (str): The username of the new user.
+            password (str): The password of the new user.
+            role (str): The role of the new user, which must be 'admin', 'trader', or 'viewer'.
+
+        Returns:
+            User: The new user.
+
+        Raises:
+            ValueError: If the role is invalid or the username is already taken.
+        """
+        self._reserve_username(username, role)
+        return self._create_user(username, password, role)
+
+    def _reserve_username(self, username, role):
+        User.validate_role(role)
+        with self._lock:
+            if username in self.users or username in self._pending or (
+                    self.repository is not None and self.repository.exists(username)):
+                raise ValueError(f"User {username} already exists")
+            self._pending.add(username)
+
+    def _create_user(self, username, password, role):
+        # Hash outside the lock so other lookups and logins are not held up
+        try:
+            user = User(username, password, role, rounds=self.bcrypt_rounds)
+            if self.repository is not None:
+                self.repository.insert(username, user.password, role)
+            with self._lock:
+                self.users[username] = user
+        finally:
+            with self._lock:
+                self._pending.discard(username)
+        logging.info(f"User added: {user}")
+        return user
+
+    def get_user(self, username):
+        """
+        Returns the user with the given username, loading it from the repository on first lookup.
+
+        Returns:
+            User: The user, or None if the username is unknown.
+        """
+        user = self.users.get(username)
+        if user is None and self.repository is not None:
+            record = self.repository.load(username)
+            if record is not None:
+                password_hash, role = record
+                user = User.from_hash(username, password_hash, role)
+                with self._lock:
+                    user = self.users.setdefault(username, user)
+        return user
+
+    def save_user(self, user):
+        """Persists a user's current password hash and role, e.g. after change_password or set_role."""
+        if self.repository is not None:
+            self.repository.update(user.username, user.password, user.role)
+
+    def authenticate(self, username, password):
+        """
+        Checks a username and password with a single bcrypt check.
+
+        Returns:
+            User: The authenticated user, or None if the username is unknown or the password is wrong.
+        """
+        user = self.get_user(username)
+        if user is not None and user.check_password(password):
+            logging.info(f"User authenticated: {user}")
+            return user
+        logging.warning(f"Authentication failed for user: {username}")
+        return None
+
+    def login(self, username, password):
+        """
+        Authenticates a user and opens a session for them.
+
+        Returns:
+            str: The session token, or None if authentication failed.
+        """
+        user = self.authenticate(username, password)
+        if user is None:
+            return None
+        return self.sessions.create(user)
+
+    def validate_session(self, token):
+        """Returns the user of a live session token in O(1) without any bcrypt work, or None."""
+        return self.sessions.validate(token)
+
+    def logout(self, token):
+        """Ends a session. Returns True if the token belonged to a live session."""
+        user = self.sessions.validate(token)
+        if user is None:
+            return False
+        self.sessions.revoke(token)
+        logging.info(f"User logged out: {user.username}")
+        return True
+
+    @property
+    def executor(self):
+        """The thread pool running bcrypt work for the async methods, created on first use."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="clob-auth")
+        return self._executor
+
+    def add_user_async(self, username, password, role):
+        """
+        Adds a new user with the password hashed on the worker pool.
+
+        The role and username are checked, and the username reserved, before
+        this returns, so a duplicate is rejected immediately.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the new User.
+
+        Raises:
+            ValueError: If the role is invalid or the username is already taken.
+        """
+        self._reserve_username(username, role)
+        return self.executor.submit(self._create_user, username, password, role)
+
+    def authenticate_async(self, username, password):
+        """
+        Checks a username and password on the worker pool.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the User, or None if authentication failed.
+        """
+        return self.executor.submit(self.authenticate, username, password)
+
+    def login_async(self, username, password):
+        """
+        Authenticates on the worker pool and opens a session.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the session token, or None if authentication failed.
+        """
+        return self.executor.submit(self.login, username, password)
+
+    def register_async(self, username, password, role='trader'):
+        """
+        Adds a user on their own behalf, as the GUI and Streamlit sign-up do, hashing on the worker pool.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the new User.
+
+        Raises:
+            ValueError: If the role is not one of SELF_SERVICE_ROLES or the username is already taken.
+        """
+        if role not in SELF_SERVICE_ROLES:
+            raise ValueError(f"Registration may only choose the {' or '.join(SELF_SERVICE_ROLES)} role")
+        return self.add_user_async(username, password, role)
+
+    def grant_role(self, granted_by, username, role):
+        """
+        Changes a user's role on behalf of an admin and persists it.
+
+        Args:
+            granted_by (User): The logged-in user making the change, who must be an admin.
+            username (str): The user whose role changes.
+            role (str): The new role.
+
+        Returns:
+            User: The updated user.
+
+        Raises:
+            ValueError: If granted_by is not an admin, the user is unknown or the role is invalid.
+        """
+        if granted_by is None or granted_by.role != 'admin':
+            raise ValueError("Only an admin may change roles")
+        user = self.get_user(username)
+        if user is None:
+            raise ValueError(f"User {username} does not exist")
+        user.set_role(role)
+        self.save_user(user)
+        logging.info(f"{granted_by.username} set the role of {username} to {role}")
+        return user
+
+    async def aadd_user(self, username, password, role):
+        """Awaitable form of add_user_async()."""
+        return await asyncio.wrap_future(self.add_user_async(username, password, role))
+
+    async def aauthenticate(self, username, password):
+        """Awaitable form of authenticate_async()."""
+        return await asyncio.wrap_future(self.authenticate_async(username, password))
+
+    async def alogin(self, username, password):
+        """Awaitable form of login_async()."""
+        return await asyncio.wrap_future(self.login_async(username, password))
+
+    def shutdown(self, wait=True):
+        """Stops the worker pool; it is recreated if an async method is used again."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the users in CLOB_USER_DB (default users.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add-user", help="Add a user with any role, prompting for the password")
+    add.add_argument("username")
+    add.add_argument("--role", default="trader", choices=["admin", "trader", "viewer"])
+    set_role = commands.add_parser("set-role", help="Change an existing user's role")
+    set_role.add_argument("username")
+    set_role.add_argument("role", choices=["admin", "trader", "viewer"])
+    args = parser.parse_args()
+
+    # Imported here so the store itself does not depend on SQLite
+    from user_repository import SQLiteUserRepository
+    store = UserStore(repository=SQLiteUserRepository.from_env())
+    if args.command == "add-user":
+        store.add_user(args.username, getpass.getpass(f"Password for {args.username}: "), args.role)
+        print(f"Added {args.username} ({args.role})")
+    else:
+        user = store.get_user(args.username)
+        if user is None:
+            sys.exit(f"User {args.username} does not exist")
+        user.set_role(args.role)
+        store.save_user(user)
+        print(f"{args.username} is now {args.role}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare continuous matching with a call auction on a large crossed backlog.
+
+Orders are collected without matching (as during an auction call phase),
+so most of the book is crossed. The same backlog is then uncrossed once
+with OrderBook.match_orders() and once with OrderBook.run_auction() for
+each allocation method, timing only the uncross. The NumPy backend
+(NumpyOrderBook) runs the same passes with its vectorized crossing and
+auction.
+
+Logging is disabled so the comparison measures the book itself.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_auction --orders 100000
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from order import Order
+from numpy_book import NumpyOrderBook
+from order_book import OrderBook
+
+
+def backlog(count, rng):
+    # Buys and sells drawn from overlapping price ranges, so most of the book crosses
+    specs = []
+    for i in range(count):
+        side = rng.choice(["buy", "sell"])
+        centre = 100.5 if side == "buy" else 99.5
+        specs.append((i, str(i), "AAPL", round(rng.gauss(centre, 1.0), 2), rng.randint(1, 100), side))
+    return specs
+
+
+def uncross(specs, book_class, run, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        book = book_class()
+        for spec in specs:
+            book.add_order(Order(*spec))
+        start = time.perf_counter()
+        matched = run(book)
+        best = min(best, time.perf_counter() - start)
+    volume = sum(quantity for _, _, quantity in matched)
+    return best, len(matched), volume, book.last_matched_price
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    specs = backlog(args.orders, random.Random(args.seed))
+
+    runs = [
+        ("continuous", lambda book: book.match_orders()),
+        ("auction fifo", lambda book: book.run_auction("fifo")),
+        ("auction pro_rata", lambda book: book.run_auction("pro_rata")),
+    ]
+    print(f"backlog: {args.orders} orders")
+    print(f"  {'book':<8}{'mode':<18}{'time':>11}{'fills':>9}{'volume':>10}  last price")
+    for book_name, book_class in (("object", OrderBook), ("numpy", NumpyOrderBook)):
+        for name, run in runs:
+            elapsed, fills, volume, last_price = uncross(specs, book_class, run, args.repeat)
+            print(f"  {book_name:<8}{name:<18}{elapsed * 1000:>9.1f}ms{fills:>9}{volume:>10}  {last_price}")
+
+
+if __name__ == "__main__":
+    main()
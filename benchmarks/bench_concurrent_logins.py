@@ -0,0 +1,108 @@
+"""
+Benchmark concurrent logins with synchronous and pooled bcrypt checks.
+
+Three runs over the same users:
+
+- sync: logins run one after another on the calling thread, which is what
+  the engine thread or the Qt event loop would be blocked by.
+- pool: logins are submitted with UserStore.login_async while the calling
+  thread keeps adding and matching orders; the longest gap between two
+  engine iterations shows whether matching was ever stalled.
+- asyncio: the same logins awaited with UserStore.alogin and asyncio.gather.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_concurrent_logins --logins 64 --workers 4
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+
+from auth import UserStore
+from order import Order
+from order_book import OrderBook
+
+
+def make_store(users, rounds, workers):
+    store = UserStore(bcrypt_rounds=rounds, max_workers=workers)
+    futures = [store.add_user_async(f"user{i}", f"password{i}", "trader") for i in range(users)]
+    for future in futures:
+        future.result()
+    return store
+
+
+def run_sync(store, logins):
+    start = time.perf_counter()
+    tokens = [store.login(f"user{i % len(store)}", f"password{i % len(store)}") for i in range(logins)]
+    elapsed = time.perf_counter() - start
+    assert all(tokens)
+    return elapsed
+
+
+def run_pool(store, logins):
+    order_book = OrderBook()
+    rng = random.Random(7)
+    start = time.perf_counter()
+    pending = {store.login_async(f"user{i % len(store)}", f"password{i % len(store)}") for i in range(logins)}
+    engine_iterations = 0
+    max_gap = 0.0
+    last = time.perf_counter()
+    while pending:
+        # One engine iteration: add an order and run a matching pass
+        side = rng.choice(["buy", "sell"])
+        order_book.add_order(Order(engine_iterations, str(engine_iterations), "AAPL",
+                                   round(rng.uniform(99, 101), 2), rng.randint(1, 100), side))
+        order_book.match_orders()
+        engine_iterations += 1
+        now = time.perf_counter()
+        max_gap = max(max_gap, now - last)
+        last = now
+        done, pending = wait(pending, timeout=0, return_when=FIRST_COMPLETED)
+        for future in done:
+            assert future.result()
+    elapsed = time.perf_counter() - start
+    return elapsed, engine_iterations, max_gap
+
+
+async def run_asyncio(store, logins):
+    start = time.perf_counter()
+    tokens = await asyncio.gather(*(store.alogin(f"user{i % len(store)}", f"password{i % len(store)}")
+                                    for i in range(logins)))
+    elapsed = time.perf_counter() - start
+    assert all(tokens)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, default=None, help="pool size, defaults to the CPU count")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    store = make_store(args.users, args.rounds, args.workers)
+    print(f"{args.logins} logins over {args.users} users, bcrypt rounds={args.rounds}, "
+          f"pool workers={store.max_workers}")
+
+    elapsed = run_sync(store, args.logins)
+    print(f"  sync:    {elapsed:.3f} s  ({args.logins / elapsed:,.1f} logins/s), "
+          f"caller blocked for the whole run")
+
+    elapsed, iterations, max_gap = run_pool(store, args.logins)
+    print(f"  pool:    {elapsed:.3f} s  ({args.logins / elapsed:,.1f} logins/s), "
+          f"{iterations} engine iterations meanwhile, longest engine gap {max_gap * 1000:.2f} ms")
+
+    elapsed = asyncio.run(run_asyncio(store, args.logins))
+    print(f"  asyncio: {elapsed:.3f} s  ({args.logins / elapsed:,.1f} logins/s)")
+
+    store.shutdown()
+
+
+if __name__ == "__main__":
+    main()
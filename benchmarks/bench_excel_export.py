@@ -0,0 +1,98 @@
+"""
+Measure the Excel export and the cost of its summary sheets.
+
+--trades fills over a few symbols and owners are generated in the order
+book's history format, then:
+
+- collect: the single pass over the fills that gathers the raw columns
+  and the per-symbol and per-owner summaries (excel_exporter.collect_trades),
+- pandas pivot: the same summaries computed afterwards with pandas
+  groupby over a DataFrame of the fills, i.e. a second read of the data,
+- export: the whole export_orders_to_excel() call, writing all three
+  sheets to a temporary file.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_excel_export --trades 200000
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from excel_exporter import collect_trades, export_orders_to_excel
+
+SYMBOLS = ["AAPL", "GOOGL", "MSFT", "AMZN", "TSLA"]
+OWNERS = ["alice", "bob", "carol", "dave", None]
+
+
+def make_history(count, seed):
+    """Generate count fills newest first, a few per second, as OrderBook.get_order_history() returns them."""
+    rng = random.Random(seed)
+    start = 1_700_000_000
+    return [{
+        "buy_order_id": str(2 * index),
+        "sell_order_id": str(2 * index + 1),
+        "symbol": rng.choice(SYMBOLS),
+        "quantity": rng.randint(1, 100),
+        "price": rng.randint(90, 110),
+        "timestamp": start + (count - index) // 4,
+        "buy_owner": rng.choice(OWNERS),
+        "sell_owner": rng.choice(OWNERS),
+    } for index in range(count)]
+
+
+def pandas_pivot(history):
+    df = pd.DataFrame(history)
+    df["notional"] = df["quantity"] * df["price"]
+    by_symbol = df.iloc[::-1].groupby("symbol").agg(
+        trades=("quantity", "size"), volume=("quantity", "sum"), notional=("notional", "sum"),
+        open=("price", "first"), high=("price", "max"), low=("price", "min"), close=("price", "last"))
+    by_symbol["vwap"] = by_symbol["notional"] / by_symbol["volume"]
+    bought = df.groupby(["symbol", "buy_owner"]).agg(volume=("quantity", "sum"), notional=("notional", "sum"))
+    sold = df.groupby(["symbol", "sell_owner"]).agg(volume=("quantity", "sum"), notional=("notional", "sum"))
+    return by_symbol, bought, sold
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    history = make_history(args.trades, args.seed)
+    collect_time, (_, symbols, owners) = timed(lambda: collect_trades(history))
+    pivot_time, (by_symbol, _, _) = timed(lambda: pandas_pivot(history))
+    for symbol, summary in symbols.items():
+        assert summary.volume == by_symbol.loc[symbol, "volume"]
+        assert (summary.open, summary.close) == (by_symbol.loc[symbol, "open"], by_symbol.loc[symbol, "close"])
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "bench.xlsx")
+        # The exporter prints its result; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            export_time, _ = timed(lambda: export_orders_to_excel(history, filename))
+        size = os.path.getsize(filename)
+
+    print(f"history: {args.trades} fills, {len(symbols)} symbols, {len(owners)} symbol-owner pairs")
+    print(f"  collect       {collect_time * 1000:>9.1f} ms  ({collect_time / args.trades * 1e9:.0f} ns/fill)")
+    print(f"  pandas pivot  {pivot_time * 1000:>9.1f} ms")
+    print(f"  export        {export_time * 1000:>9.1f} ms  ({size / 1e6:.1f} MB, three sheets)")
+
+
+if __name__ == "__main__":
+    main()
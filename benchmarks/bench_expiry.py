@@ -0,0 +1,85 @@
+"""
+Measure order expiry: GTT orders through the expiry buckets and day orders at session end.
+
+A book is loaded with --orders resting orders spread over --levels price
+levels. It is timed on:
+
+- gtt expiry: every order is GTT, expiring over --seconds seconds, and the
+  clock is stepped one second at a time with expire_orders(),
+- session end: every order is a day order, expired with end_session(),
+- cancel loop: the same day orders cancelled one at a time with cancel_order(),
+  for comparison with the bulk session end.
+
+Logging is disabled so the comparison measures the book itself.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_expiry --orders 100000
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from order import Order
+from order_book import OrderBook
+
+START = 1_000_000.0
+
+
+def load(book, count, levels, seconds, time_in_force, rng):
+    for i in range(count):
+        side = "buy" if i % 2 else "sell"
+        tick = rng.randrange(levels) + 1
+        price = round(100 - tick * 0.01, 2) if side == "buy" else round(100 + tick * 0.01, 2)
+        expire_at = START + rng.uniform(0, seconds) if time_in_force == "gtt" else None
+        book.add_order(Order(i, str(i), "AAPL", price, rng.randint(1, 100), side,
+                             time_in_force=time_in_force, expire_at=expire_at))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--levels", type=int, default=500, help="Price levels per side")
+    parser.add_argument("--seconds", type=int, default=3600, help="Spread of the GTT expiry times")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    now = [START - 1]
+
+    book = OrderBook(clock=lambda: now[0])
+    load(book, args.orders, args.levels, args.seconds, "gtt", random.Random(args.seed))
+    start = time.perf_counter()
+    expired = 0
+    for second in range(args.seconds + 2):
+        now[0] = START + second
+        expired += book.expire_orders()
+    gtt = time.perf_counter() - start
+
+    book = OrderBook()
+    load(book, args.orders, args.levels, args.seconds, "day", random.Random(args.seed))
+    start = time.perf_counter()
+    session = book.end_session()
+    bulk = time.perf_counter() - start
+
+    book = OrderBook()
+    load(book, args.orders, args.levels, args.seconds, "day", random.Random(args.seed))
+    order_ids = list(book.orders_by_id)
+    random.Random(args.seed).shuffle(order_ids)
+    start = time.perf_counter()
+    for order_id in order_ids:
+        book.cancel_order(order_id)
+    loop = time.perf_counter() - start
+
+    print(f"orders: {args.orders} over {args.levels} levels per side")
+    print(f"  gtt expiry    {gtt * 1000:>9.1f} ms  {expired} expired over {args.seconds} s steps "
+          f"({gtt / max(expired, 1) * 1e6:.2f} us/order)")
+    print(f"  session end   {bulk * 1000:>9.1f} ms  {session} expired ({bulk / max(session, 1) * 1e6:.2f} us/order)")
+    print(f"  cancel loop   {loop * 1000:>9.1f} ms  {len(order_ids)} cancelled "
+          f"({loop / max(len(order_ids), 1) * 1e6:.2f} us/order)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Load-generate against the asyncio order gateway and measure throughput and latency.
+
+Starts a gateway in a separate process (or targets one given with --port),
+opens a number of client connections and has each send new orders with up
+to --window requests outstanding. Round-trip latency is measured from
+writing a request to reading its ack or reject. Buy and sell prices
+overlap, so the run also exercises matching and fill reports.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_gateway --connections 4 --orders 100000
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import random
+import time
+
+from gateway import GatewayClient, OrderGateway
+from metrics import LatencyHistogram
+
+REPLY_TYPES = ('ack', 'reject', 'cancelled', 'modified')
+
+
+def serve(port_queue, max_batch, max_in_flight):
+    logging.disable(logging.CRITICAL)
+
+    async def run():
+        gateway = OrderGateway('127.0.0.1', 0, max_batch, max_in_flight)
+        await gateway.start()
+        port_queue.put(gateway.port)
+        await gateway.serve_forever()
+
+    asyncio.run(run())
+
+
+async def load(client_id, port, orders, window, symbols, histogram, counts):
+    client = await GatewayClient.connect('127.0.0.1', port)
+    rng = random.Random(client_id)
+    sent_at = {}
+    slots = asyncio.Semaphore(window)
+
+    async def read_replies():
+        received = 0
+        while received < orders:
+            message = await client.read_message()
+            if message is None:
+                raise ConnectionError("gateway closed the connection")
+            kind = message['type']
+            counts[kind] = counts.get(kind, 0) + 1
+            if kind in REPLY_TYPES:
+                histogram.record(time.perf_counter_ns() - sent_at.pop(message['id']))
+                received += 1
+                slots.release()
+
+    reader = asyncio.create_task(read_replies())
+    for i in range(orders):
+        await slots.acquire()
+        order_id = f"{client_id}-{i}"
+        side = 'buy' if i % 2 else 'sell'
+        sent_at[order_id] = time.perf_counter_ns()
+        client.new_order(order_id, rng.choice(symbols), round(100 * rng.uniform(0.99, 1.01), 2),
+                         rng.randint(1, 100), side)
+        if i % 64 == 0:
+            await client.drain()
+    await client.drain()
+    await reader
+    await client.close()
+
+
+async def run_load(port, connections, orders, window, symbols):
+    histogram = LatencyHistogram()
+    counts = {}
+    per_connection = orders // connections
+    start = time.perf_counter()
+    await asyncio.gather(*(load(i, port, per_connection, window, symbols, histogram, counts)
+                           for i in range(connections)))
+    return time.perf_counter() - start, per_connection * connections, histogram, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, help="Target a running gateway instead of starting one")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--orders", type=int, default=100000, help="Total orders across all connections")
+    parser.add_argument("--window", type=int, default=256, help="Outstanding requests per connection")
+    parser.add_argument("--symbols", type=int, default=8)
+    parser.add_argument("--max-batch", type=int, default=512)
+    parser.add_argument("--max-in-flight", type=int, default=1024)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    server = None
+    port = args.port
+    if port is None:
+        port_queue = multiprocessing.Queue()
+        server = multiprocessing.Process(target=serve, args=(port_queue, args.max_batch, args.max_in_flight),
+                                         daemon=True)
+        server.start()
+        port = port_queue.get(timeout=30)
+
+    symbols = [f"SYM{i}" for i in range(args.symbols)]
+    try:
+        elapsed, sent, histogram, counts = asyncio.run(
+            run_load(port, args.connections, args.orders, args.window, symbols))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+
+    summary = histogram.summary()
+    print(f"orders: {sent}, connections: {args.connections}, window: {args.window}, symbols: {args.symbols}")
+    print(f"  throughput: {sent / elapsed:,.0f} orders/s  ({elapsed:.3f} s)")
+    print(f"  round trip: p50={summary['p50'] / 1000:,.0f} us  p99={summary['p99'] / 1000:,.0f} us  "
+          f"max={summary['max'] / 1000:,.0f} us")
+    print(f"  messages:   {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Measure the import time of the application modules with `python -X importtime`.
+
+Each module is imported in a fresh interpreter several times and the best
+cumulative time reported by -X importtime is printed, together with the
+heavy third-party packages the import pulled in.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --modules order_book headless --repeat 10
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+DEFAULT_MODULES = ["order", "order_book", "risk", "excel_exporter", "auth", "headless", "main_window"]
+HEAVY_PACKAGES = ["pandas", "numpy", "matplotlib", "PyQt5", "redis", "bcrypt", "multiprocessing.shared_memory"]
+
+
+def import_time_us(module, cwd):
+    """Return the cumulative import time of module in microseconds and the heavy packages it loaded."""
+    code = (f"import sys; import {module}; "
+            f"print(','.join(name for name in {HEAVY_PACKAGES!r} if name in sys.modules))")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd,
+                            capture_output=True, text=True, check=True,
+                            env=dict(os.environ, QT_QPA_PLATFORM="offscreen"))
+    cumulative = None
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1])
+    loaded = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+    return cumulative, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cwd", default=os.getcwd(), help="Directory to import from, e.g. an older checkout")
+    args = parser.parse_args()
+
+    print(f"{'module':<16}{'best ms':>10}  heavy packages loaded")
+    for module in args.modules:
+        runs = [import_time_us(module, args.cwd) for _ in range(args.repeat)]
+        best = min(us for us, _ in runs)
+        print(f"{module:<16}{best / 1000:>10.1f}  {runs[0][1] or '-'}")
+
+
+if __name__ == "__main__":
+    main()
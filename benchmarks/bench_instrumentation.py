@@ -0,0 +1,74 @@
+"""
+Benchmark the cost of OrderBook latency instrumentation.
+
+Runs the same add/match/cancel workload against an uninstrumented and an
+instrumented OrderBook and reports the throughput of each. Logging is
+disabled so the comparison measures the book itself rather than log I/O.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_instrumentation
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from order import Order
+from order_book import OrderBook
+
+
+def make_orders(count, seed=42):
+    rng = random.Random(seed)
+    orders = []
+    for i in range(count):
+        side = rng.choice(["buy", "sell"])
+        price = round(100 * rng.uniform(0.98, 1.02), 2)
+        orders.append((i, "AAPL", price, rng.randint(1, 100), side))
+    return orders
+
+
+def run(instrumented, specs, match_every):
+    order_book = OrderBook(instrumented=instrumented)
+    start = time.perf_counter()
+    for i, symbol, price, quantity, side in specs:
+        order_book.add_order(Order(i, str(i), symbol, price, quantity, side))
+        if i % match_every == 0:
+            order_book.match_orders()
+    order_book.match_orders()
+    elapsed = time.perf_counter() - start
+    return elapsed, order_book
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--match-every", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--prom", help="Write the instrumented run's metrics to this .prom file")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    specs = make_orders(args.orders)
+
+    plain = min(run(False, specs, args.match_every)[0] for _ in range(args.repeat))
+    timed_runs = [run(True, specs, args.match_every) for _ in range(args.repeat)]
+    instrumented, order_book = min(timed_runs, key=lambda result: result[0])
+
+    print(f"orders: {args.orders}, match every {args.match_every} adds, best of {args.repeat}")
+    print(f"  plain:        {plain:.3f} s  ({args.orders / plain:,.0f} orders/s)")
+    print(f"  instrumented: {instrumented:.3f} s  ({args.orders / instrumented:,.0f} orders/s)")
+    print(f"  overhead:     {(instrumented / plain - 1) * 100:+.1f}%")
+
+    for name, summary in order_book.stats()["latency_ns"].items():
+        print(f"  {name:<14} n={summary['count']:<8} p50={summary['p50']:>8} ns  "
+              f"p99={summary['p99']:>8} ns  max={summary['max']:>10} ns")
+
+    if args.prom:
+        order_book.dump_prometheus(args.prom)
+        print(f"metrics written to {args.prom}")
+
+
+if __name__ == "__main__":
+    main()
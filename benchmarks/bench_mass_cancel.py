@@ -0,0 +1,80 @@
+"""
+Compare OrderBook.mass_cancel() with cancelling the same orders one at a time.
+
+A book is loaded with --orders resting orders over --levels price levels
+per side and --symbols symbols, owned by --owners owners. Each scenario is
+timed once as a mass cancel and once as a cancel_order() loop over the same
+orders on a fresh book:
+
+- side: every buy order,
+- band: every order priced inside the inner half of the levels,
+- symbol: every order of one symbol,
+- owner: every order of one owner.
+
+Logging is disabled so the comparison measures the book itself.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_mass_cancel --orders 100000
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from order import Order
+from order_book import OrderBook
+
+
+def load(count, levels, symbols, owners, seed):
+    rng = random.Random(seed)
+    book = OrderBook()
+    for i in range(count):
+        side = "buy" if i % 2 else "sell"
+        tick = rng.randrange(levels) + 1
+        price = round(100 - tick * 0.01, 2) if side == "buy" else round(100 + tick * 0.01, 2)
+        book.add_order(Order(i, str(i), f"SYM{rng.randrange(symbols)}", price, rng.randint(1, 100), side,
+                             owner=f"user{rng.randrange(owners)}"))
+    return book
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--levels", type=int, default=500, help="Price levels per side")
+    parser.add_argument("--symbols", type=int, default=5)
+    parser.add_argument("--owners", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    half = args.levels // 2 * 0.01
+    scenarios = [
+        ("side", dict(side="buy")),
+        ("band", dict(min_price=round(100 - half, 2), max_price=round(100 + half, 2))),
+        ("symbol", dict(symbol="SYM0")),
+        ("owner", dict(owner="user0")),
+    ]
+
+    print(f"orders: {args.orders} over {args.levels} levels per side, "
+          f"{args.symbols} symbols, {args.owners} owners")
+    print(f"  {'filter':<8}{'orders':>9}{'mass cancel':>14}{'cancel loop':>14}")
+    for name, filters in scenarios:
+        book = load(args.orders, args.levels, args.symbols, args.owners, args.seed)
+        start = time.perf_counter()
+        cancelled = book.mass_cancel(**filters)
+        bulk = time.perf_counter() - start
+
+        # The orders the mass cancel removed, cancelled one at a time on a fresh book
+        before = load(args.orders, args.levels, args.symbols, args.owners, args.seed)
+        order_ids = [order_id for order_id in before.orders_by_id if order_id not in book.orders_by_id]
+        start = time.perf_counter()
+        for order_id in order_ids:
+            before.cancel_order(order_id)
+        loop = time.perf_counter() - start
+        print(f"  {name:<8}{cancelled:>9}{bulk * 1000:>11.1f} ms{loop * 1000:>11.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
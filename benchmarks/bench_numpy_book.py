@@ -0,0 +1,117 @@
+"""
+Compare the object OrderBook with the NumPy structured-array backend side by side.
+
+Both books are loaded with the same resting orders and then timed on:
+
+- streaming: adds with a match pass every --match-every adds,
+- batch cross: one match pass after a batch of aggressive orders,
+- depth: full-depth aggregation of both sides,
+- range filter: a price and quantity filter on one side.
+
+Logging is disabled so the comparison measures the books themselves.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_numpy_book --resting 100000
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from order import Order
+from order_book import OrderBook
+from numpy_book import NumpyOrderBook
+
+
+def resting_specs(count, rng):
+    # Non-crossing book: bids below 100, asks above
+    specs = []
+    for i in range(count):
+        side = "buy" if i % 2 else "sell"
+        offset = round(rng.uniform(0.01, 5.0), 2)
+        price = round(100 - offset, 2) if side == "buy" else round(100 + offset, 2)
+        specs.append((i, str(i), "AAPL", price, rng.randint(1, 100), side))
+    return specs
+
+
+def stream_specs(count, rng, first_id):
+    return [(i, str(i), "AAPL", round(100 * rng.uniform(0.98, 1.02), 2), rng.randint(1, 100),
+             rng.choice(["buy", "sell"])) for i in range(first_id, first_id + count)]
+
+
+def timed(function, repeat=1):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(book_class, resting, stream, batch, match_every, repeat):
+    book = book_class()
+    for spec in resting:
+        book.add_order(Order(*spec))
+    book.get_depth(1)  # Let the NumPy backend merge its pending orders before timing
+
+    results = {}
+    results["depth"] = timed(lambda: book.get_depth(None), repeat)
+    results["range filter"] = timed(lambda: book.filter_orders("buy", 97.0, 99.0, 20, 60), repeat)
+
+    def streaming():
+        fills = 0
+        for spec in stream:
+            book.add_order(Order(*spec))
+            if spec[0] % match_every == 0:
+                fills += len(book.match_orders())
+        return fills + len(book.match_orders())
+    results["streaming"] = timed(streaming)
+
+    for spec in batch:
+        book.add_order(Order(*spec))
+    results["batch cross"] = timed(book.match_orders)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resting", type=int, default=100000)
+    parser.add_argument("--stream", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=5000, help="Aggressive orders crossed in one match pass")
+    parser.add_argument("--match-every", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(42)
+    resting = resting_specs(args.resting, rng)
+    stream = stream_specs(args.stream, rng, args.resting)
+    first = args.resting + args.stream
+    # Marketable buys sweeping into the asks
+    batch = [(i, str(i), "AAPL", 103.0, rng.randint(1, 100), "buy") for i in range(first, first + args.batch)]
+
+    objects = run(OrderBook, resting, stream, batch, args.match_every, args.repeat)
+    arrays = run(NumpyOrderBook, resting, stream, batch, args.match_every, args.repeat)
+
+    print(f"resting: {args.resting}, stream: {args.stream} (match every {args.match_every}), batch: {args.batch}")
+    print(f"  {'operation':<14}{'object':>12}{'numpy':>12}{'speedup':>10}  result")
+    for name in ("streaming", "batch cross", "depth", "range filter"):
+        (object_time, object_result), (array_time, array_result) = objects[name], arrays[name]
+        size = (len(object_result["bids"]) + len(object_result["asks"]) if name == "depth"
+                else len(object_result) if isinstance(object_result, list) else object_result)
+        same = "same" if _comparable(object_result) == _comparable(array_result) else "DIFFERENT"
+        print(f"  {name:<14}{object_time * 1000:>10.2f}ms{array_time * 1000:>10.2f}ms"
+              f"{object_time / array_time:>9.1f}x  {size} ({same})")
+
+
+def _comparable(result):
+    if isinstance(result, list):
+        return [item.order_id if isinstance(item, Order) else (item[0].order_id, item[1].order_id, item[2])
+                for item in result]
+    return result
+
+
+if __name__ == "__main__":
+    main()
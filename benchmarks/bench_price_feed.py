@@ -0,0 +1,89 @@
+"""
+Measure the reference price feeds and lookups.
+
+Times, for --lookups reference price lookups spread over --symbols symbols:
+
+- fetch per order: the old pattern of calling fetch_current_prices() for
+  every generated order (fresh random prices, no continuity),
+- store lookup: PriceStore.get() on prices kept current by a feed,
+
+then the feeds themselves: RandomWalkFeed steps, and ReplayFeed replaying a
+--ticks tick CSV file written to a temporary directory (and a Parquet copy
+when pyarrow is installed).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_price_feed --lookups 1000000
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from order_book import fetch_current_prices
+from price_feed import TICK_COLUMNS, PriceStore, RandomWalkFeed, ReplayFeed, write_ticks
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=1000000)
+    parser.add_argument("--symbols", type=int, default=5)
+    parser.add_argument("--ticks", type=int, default=500000, help="Ticks in the replayed file")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    symbols = [f"SYM{index}" for index in range(args.symbols)]
+    lookups = [symbols[index % len(symbols)] for index in range(args.lookups)]
+
+    fetch, _ = timed(lambda: [fetch_current_prices(symbols)[symbol] for symbol in lookups])
+    store = PriceStore()
+    feed = RandomWalkFeed(symbols, seed=args.seed)
+    feed.poll(store)
+    get = store.get
+    lookup, _ = timed(lambda: [get(symbol) for symbol in lookups])
+    steps = args.ticks // len(symbols)
+    walk, _ = timed(lambda: [feed.poll(store) for _ in range(steps)])
+
+    print(f"lookups: {args.lookups} over {args.symbols} symbols")
+    print(f"  fetch per order {fetch * 1000:>9.1f} ms  ({fetch / args.lookups * 1e9:.0f} ns/lookup)")
+    print(f"  store lookup    {lookup * 1000:>9.1f} ms  ({lookup / args.lookups * 1e9:.0f} ns/lookup)")
+    print(f"  random walk     {walk * 1000:>9.1f} ms  ({steps * len(symbols)} ticks, "
+          f"{walk / (steps * len(symbols)) * 1e9:.0f} ns/tick)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file = os.path.join(directory, "ticks.csv")
+        walk_feed = RandomWalkFeed(symbols, seed=args.seed)
+        recorded = PriceStore()
+        ticks = []
+        recorded.subscribe(lambda symbol, price, timestamp: ticks.append((timestamp, symbol, price)))
+        while len(ticks) < args.ticks:
+            walk_feed.poll(recorded)
+        write_ticks(csv_file, ticks)
+        files = [("replay csv", csv_file)]
+        try:
+            import pyarrow
+            import pyarrow.parquet as pq
+        except ImportError:
+            pass
+        else:
+            parquet_file = os.path.join(directory, "ticks.parquet")
+            pq.write_table(pyarrow.table(dict(zip(TICK_COLUMNS, zip(*ticks)))), parquet_file)
+            files.append(("replay parquet", parquet_file))
+        for name, filename in files:
+            replay = ReplayFeed(filename)
+            elapsed, published = timed(lambda: replay.poll(PriceStore(), until=float("inf")))
+            print(f"  {name:<15} {elapsed * 1000:>9.1f} ms  ({published} ticks, "
+                  f"{elapsed / max(published, 1) * 1e9:.0f} ns/tick)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark the cost of the pre-trade risk checks.
+
+Runs the same add/match workload straight into an OrderBook and through a
+RiskManager in front of one, spreading the orders over a set of trader
+accounts, and reports the throughput of each path plus any rejections.
+The limits are loose enough that the checks run in full without rejecting
+the workload; the per-user counters are kept up to date by the book's
+listener callbacks either way.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_risk_checks
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from order import Order
+from order_book import OrderBook
+from risk import RiskLimits, RiskManager
+from user import User
+
+
+def make_orders(count, seed=42):
+    rng = random.Random(seed)
+    orders = []
+    for i in range(count):
+        side = rng.choice(["buy", "sell"])
+        price = round(100 * rng.uniform(0.98, 1.02), 2)
+        orders.append((i, "AAPL", price, rng.randint(1, 100), side))
+    return orders
+
+
+def run(specs, users, match_every, checked):
+    order_book = OrderBook()
+    limits = RiskLimits(max_open_orders=len(specs), max_position=10 ** 9, max_orders_per_second=10 ** 9)
+    risk_manager = RiskManager(order_book, limits) if checked else None
+    user_count = len(users)
+    start = time.perf_counter()
+    for i, symbol, price, quantity, side in specs:
+        order = Order(i, str(i), symbol, price, quantity, side)
+        if checked:
+            risk_manager.add_order(order, users[i % user_count])
+        else:
+            order_book.add_order(order)
+        if i % match_every == 0:
+            order_book.match_orders()
+    order_book.match_orders()
+    return time.perf_counter() - start, risk_manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--match-every", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    specs = make_orders(args.orders)
+    # Accounts are built from a placeholder hash; the checks never touch the password
+    users = [User.from_hash(f"trader{i}", b"", "trader") for i in range(args.users)]
+
+    raw = min(run(specs, users, args.match_every, False)[0] for _ in range(args.repeat))
+    checked_runs = [run(specs, users, args.match_every, True) for _ in range(args.repeat)]
+    checked, risk_manager = min(checked_runs, key=lambda result: result[0])
+
+    print(f"orders: {args.orders}, users: {args.users}, match every {args.match_every} adds, best of {args.repeat}")
+    print(f"  raw add:          {raw:.3f} s  ({args.orders / raw:,.0f} orders/s)")
+    print(f"  risk-checked add: {checked:.3f} s  ({args.orders / checked:,.0f} orders/s)")
+    print(f"  overhead:         {(checked / raw - 1) * 100:+.1f}%  "
+          f"({(checked - raw) / args.orders * 1e9:,.0f} ns per order)")
+    print(f"  rejections:       {risk_manager.rejections or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
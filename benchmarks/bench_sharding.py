@@ -0,0 +1,90 @@
+"""
+Benchmark matching throughput against the number of shards.
+
+Runs the same multi-symbol add/match workload through an in-process
+baseline (one OrderBook per symbol) and through ShardedOrderBook with an
+increasing number of worker processes, and reports orders/s for each.
+Shards only run in parallel on separate cores, so run this on a multi-core
+Linux box; on a single core the numbers show the cost of the pipes instead.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sharding --shards 1 2 4 8
+"""
+
+import argparse
+import logging
+import os
+import random
+import time
+
+from order import Order
+from order_book import OrderBook
+from sharded_engine import ShardedOrderBook
+
+
+def make_orders(count, symbols, seed=42):
+    rng = random.Random(seed)
+    prices = {symbol: rng.uniform(100, 500) for symbol in symbols}
+    orders = []
+    for i in range(count):
+        symbol = rng.choice(symbols)
+        side = rng.choice(["buy", "sell"])
+        price = round(prices[symbol] * rng.uniform(0.98, 1.02), 2)
+        orders.append((i, str(i), symbol, price, rng.randint(1, 100), side))
+    return orders
+
+
+def run_baseline(specs, match_every):
+    books = {}
+    start = time.perf_counter()
+    for spec in specs:
+        book = books.get(spec[2])
+        if book is None:
+            book = books[spec[2]] = OrderBook()
+        book.add_order(Order(*spec))
+        if spec[0] % match_every == 0:
+            for book in books.values():
+                book.match_orders()
+    for book in books.values():
+        book.match_orders()
+    return time.perf_counter() - start
+
+
+def run_sharded(specs, match_every, shards, batch_size):
+    with ShardedOrderBook(shards=shards, batch_size=batch_size) as engine:
+        engine.flush()  # Exclude process start-up from the timing
+        start = time.perf_counter()
+        for spec in specs:
+            engine.add_order(Order(*spec))
+            if spec[0] % match_every == 0:
+                engine.match_orders()
+        engine.match_orders()
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--symbols", type=int, default=32)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--match-every", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    symbols = [f"SYM{i}" for i in range(args.symbols)]
+    specs = make_orders(args.orders, symbols)
+
+    print(f"orders: {args.orders}, symbols: {args.symbols}, match every {args.match_every} adds, "
+          f"batch size {args.batch_size}, cpus: {os.cpu_count()}")
+    baseline = run_baseline(specs, args.match_every)
+    print(f"  in-process:  {baseline:.3f} s  ({args.orders / baseline:,.0f} orders/s)")
+    for shards in args.shards:
+        elapsed = run_sharded(specs, args.match_every, shards, args.batch_size)
+        print(f"  {shards:>2} shard(s): {elapsed:.3f} s  ({args.orders / elapsed:,.0f} orders/s, "
+              f"{baseline / elapsed:.2f}x in-process)")
+
+
+if __name__ == "__main__":
+    main()
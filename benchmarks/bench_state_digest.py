@@ -0,0 +1,66 @@
+"""
+Measure the cost of keeping an incremental state digest.
+
+The same stream of adds, cancels and match passes runs through an
+OrderBook without a digest and with one (state_digest() called once up
+front). The incremental digest read is then compared with recomputing it
+by scanning the whole book (state_digest.book_digest()).
+
+Logging is disabled so the comparison measures the book itself.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_state_digest --events 200000
+"""
+
+import argparse
+import logging
+import time
+
+from differential import apply_event, random_events
+from order_book import OrderBook
+from state_digest import book_digest
+
+
+def run(events, digest):
+    book = OrderBook()
+    if digest:
+        book.state_digest()
+    start = time.perf_counter()
+    for event in events:
+        apply_event(book, event)
+    return time.perf_counter() - start, book
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--reads", type=int, default=1000, help="Digest reads timed at the end")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    # A deep book: few cancels and rare matches leave many orders resting
+    events = list(random_events(args.events, args.seed, cancel_ratio=0.05, match_every=50, spread_ticks=200))
+    plain, _ = run(events, False)
+    digested, book = run(events, True)
+
+    start = time.perf_counter()
+    for _ in range(args.reads):
+        book.state_digest()
+    read = (time.perf_counter() - start) / args.reads
+    start = time.perf_counter()
+    scanned = book_digest(book)
+    scan = time.perf_counter() - start
+    assert scanned == book.digest.order_digest
+
+    resting = len(book.orders_by_id)
+    print(f"stream: {len(events)} events, {resting} orders resting at the end")
+    print(f"  no digest       {plain * 1000:>9.1f} ms")
+    print(f"  digest          {digested * 1000:>9.1f} ms  (+{(digested - plain) / len(events) * 1e6:.2f} us/event)")
+    print(f"  digest read     {read * 1e6:>9.2f} us")
+    print(f"  full scan       {scan * 1000:>9.1f} ms  over {resting} orders")
+
+
+if __name__ == "__main__":
+    main()
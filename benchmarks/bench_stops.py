@@ -0,0 +1,110 @@
+"""
+Measure the cost of dormant stop orders on matching.
+
+The same stream of orders is matched against a book with no stops and
+against one holding --stops dormant stop orders priced away from the
+market, next to a naive trigger check that rescans every stop after each
+match pass. Finally a burst of --triggered stops is activated by a single
+trade to time activation itself.
+
+Logging is disabled so the comparison measures the book itself.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_stops --stops 100000
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from order import Order
+from order_book import OrderBook
+
+
+def dormant_stops(count, rng):
+    # Buy stops well above the market and sell stops well below it
+    stops = []
+    for i in range(count):
+        side = "buy" if i % 2 else "sell"
+        stop = round(rng.uniform(110, 150), 2) if side == "buy" else round(rng.uniform(50, 90), 2)
+        stops.append(Order(i, f"stop-{i}", "AAPL", stop, rng.randint(1, 100), side, "stop_limit", stop_price=stop))
+    return stops
+
+
+def stream(count, rng):
+    return [Order(i, str(i), "AAPL", round(rng.uniform(98, 102), 2), rng.randint(1, 100),
+                  rng.choice(["buy", "sell"])) for i in range(count)]
+
+
+def run_stream(book, orders, match_every, naive_stops=None):
+    start = time.perf_counter()
+    for index, order in enumerate(orders, 1):
+        book.add_order(order)
+        if index % match_every == 0:
+            matched = book.match_orders()
+            if matched and naive_stops is not None:
+                # What a trigger check without an index costs: look at every stop
+                high = max(sell.price for _, sell, _ in matched)
+                low = min(sell.price for _, sell, _ in matched)
+                [stop for stop in naive_stops
+                 if (stop.stop_price <= high if stop.side == "buy" else stop.stop_price >= low)]
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stops", type=int, default=100000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--match-every", type=int, default=10)
+    parser.add_argument("--triggered", type=int, default=1000, help="Stops activated by one trade at the end")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(args.seed)
+    orders = stream(args.orders, rng)
+
+    def fresh(orders):
+        return [Order(o.timestamp, o.order_id, o.symbol, o.price, o.quantity, o.side) for o in orders]
+
+    results = []
+    results.append(("no stops", run_stream(OrderBook(), fresh(orders), args.match_every)))
+
+    book = OrderBook()
+    stops = dormant_stops(args.stops, rng)
+    start = time.perf_counter()
+    for stop in stops:
+        book.add_order(stop)
+    load = time.perf_counter() - start
+    results.append((f"{args.stops} stops, indexed", run_stream(book, fresh(orders), args.match_every)))
+
+    naive_book = OrderBook()
+    results.append((f"{args.stops} stops, rescan", run_stream(naive_book, fresh(orders), args.match_every,
+                                                              dormant_stops(args.stops, random.Random(args.seed)))))
+
+    # One trade through a band of buy stops, next to the dormant ones
+    book = OrderBook()
+    for stop in dormant_stops(args.stops, random.Random(args.seed)):
+        book.add_order(stop)
+    for i in range(args.triggered):
+        book.add_order(Order(i, f"burst-{i}", "AAPL", 106.0, 1, "buy", "stop_limit", stop_price=105.0))
+    for i in range(args.triggered):
+        book.add_order(Order(i, f"offer-{i}", "AAPL", 105.0 + i / 1e6, 1, "sell"))
+    book.add_order(Order(0, "trigger", "AAPL", 105.0, 1, "buy"))
+    start = time.perf_counter()
+    book.match_orders()
+    burst = time.perf_counter() - start
+    dormant = len(book.stops)
+
+    print(f"stream: {args.orders} orders, match every {args.match_every}; loading {args.stops} stops "
+          f"took {load * 1000:.1f} ms")
+    for name, elapsed in results:
+        print(f"  {name:<28}{elapsed * 1000:>10.1f} ms")
+    print(f"  trigger burst: {args.triggered} stops activated and matched in {burst * 1000:.1f} ms, "
+          f"{dormant} still dormant")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Measure writing and reading memory-mapped trade tape files.
+
+--trades fills are appended to one symbol's tape through a TradeTapeWriter
+(as the order book's listener would), in a temporary directory. The tape
+is then read back:
+
+- open: mapping the tape and loading its sparse index,
+- seek: --seeks random time-range seeks through the sparse index,
+- iter_trades: decoding every record into a history dictionary,
+- numpy sum: the total quantity and VWAP over a numpy.memmap of the tape,
+- bars: one-minute OHLCV bars over the whole tape.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_trade_tape --trades 1000000
+"""
+
+import argparse
+import logging
+import random
+import tempfile
+import time
+
+from order import Order
+from trade_tape import TradeTapeReader, TradeTapeWriter, tape_day
+
+START_NS = 1_700_000_000_000_000_000
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=1000000)
+    parser.add_argument("--seeks", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(args.seed)
+    buy = Order(0, "buy-order", "AAPL", 100.0, 1, "buy", owner="alice")
+    sell = Order(0, "sell-order", "AAPL", 100.0, 1, "sell", owner="bob")
+    # Trades 10 ms apart on average, all inside one UTC day
+    clock_ns = [START_NS]
+
+    def clock():
+        clock_ns[0] += rng.randrange(20_000_000)
+        return clock_ns[0]
+
+    fills = [(rng.randint(1, 100), round(rng.uniform(99, 101), 2)) for _ in range(args.trades)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        writer = TradeTapeWriter(directory, clock=clock)
+
+        def write():
+            for quantity, price in fills:
+                writer.orders_matched(buy, sell, quantity, price)
+            writer.close()
+
+        write_time, _ = timed(write)
+        reader = TradeTapeReader(directory)
+        open_time, tape = timed(lambda: reader.open(tape_day(START_NS), "AAPL"))
+        end_ns = clock_ns[0]
+        targets = [rng.randrange(START_NS, end_ns) for _ in range(args.seeks)]
+        seek_time, _ = timed(lambda: [tape.seek(target) for target in targets])
+        iterate_time, count = timed(lambda: sum(1 for _ in tape.iter_trades("AAPL")))
+
+        def numpy_sum():
+            records = tape.array()
+            quantity = records["quantity"].sum()
+            return quantity, (records["price"] * records["quantity"]).sum() / quantity
+
+        numpy_time, (quantity, vwap) = timed(numpy_sum)
+        bars_time, bars = timed(lambda: tape.bars(60))
+        tape.close()
+
+    print(f"tape: {args.trades} trades")
+    print(f"  write        {write_time * 1000:>9.1f} ms  ({write_time / args.trades * 1e9:.0f} ns/trade)")
+    print(f"  open         {open_time * 1000:>9.1f} ms")
+    print(f"  seek         {seek_time * 1000:>9.1f} ms  ({seek_time / args.seeks * 1e6:.1f} us/seek)")
+    print(f"  iter_trades  {iterate_time * 1000:>9.1f} ms  ({count} trades)")
+    print(f"  numpy sum    {numpy_time * 1000:>9.1f} ms  (quantity {quantity}, vwap {vwap:.4f})")
+    print(f"  bars         {bars_time * 1000:>9.1f} ms  ({len(bars)} one-minute bars)")
+
+
+if __name__ == "__main__":
+    main()
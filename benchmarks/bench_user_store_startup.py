@@ -0,0 +1,81 @@
+"""
+Benchmark user store startup and first lookups against a persistent repository.
+
+Seeds a SQLite repository with existing bcrypt hashes (one hash computed and
+reused, as an import of existing records would), then measures opening a
+UserStore over it, the first lookup of a user and a login. bcrypt calls are
+counted to show that startup and lookups do no hashing at all.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_user_store_startup --users 10000
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import bcrypt
+
+import user
+from auth import UserStore
+from user_repository import SQLiteUserRepository
+
+bcrypt_calls = {"hashpw": 0, "checkpw": 0}
+
+
+def counted(name, function):
+    def wrapper(*args, **kwargs):
+        bcrypt_calls[name] += 1
+        return function(*args, **kwargs)
+    return wrapper
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor of the seeded hashes")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    # Count bcrypt work done through the user module
+    user.bcrypt.hashpw = counted("hashpw", bcrypt.hashpw)
+    user.bcrypt.checkpw = counted("checkpw", bcrypt.checkpw)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "users.db")
+        password_hash = bcrypt.hashpw(b"password", bcrypt.gensalt(args.rounds))
+        seed = SQLiteUserRepository(path)
+        seed.insert_many((f"user{i}", password_hash, "trader") for i in range(args.users))
+        seed.close()
+        bcrypt_calls.update(hashpw=0, checkpw=0)
+
+        start = time.perf_counter()
+        store = UserStore(repository=SQLiteUserRepository(path))
+        opened = time.perf_counter() - start
+        print(f"{args.users} stored users, bcrypt rounds={args.rounds}")
+        print(f"  open store:     {opened * 1000:8.2f} ms  bcrypt calls: {dict(bcrypt_calls)}")
+
+        start = time.perf_counter()
+        found = store.get_user(f"user{args.users // 2}")
+        lookup = time.perf_counter() - start
+        assert found is not None
+        print(f"  first lookup:   {lookup * 1000:8.2f} ms  bcrypt calls: {dict(bcrypt_calls)}")
+
+        start = time.perf_counter()
+        token = store.login(f"user{args.users - 1}", "password")
+        login = time.perf_counter() - start
+        assert token is not None
+        print(f"  first login:    {login * 1000:8.2f} ms  bcrypt calls: {dict(bcrypt_calls)}")
+
+        start = time.perf_counter()
+        assert store.validate_session(token) is not None
+        validated = time.perf_counter() - start
+        print(f"  session check:  {validated * 1e6:8.2f} us  bcrypt calls: {dict(bcrypt_calls)}")
+        print(f"  users cached:   {len(store.users)} of {len(store)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+This module contains the price-level structures holding one side of the order book.
+
+Each side keeps a dictionary of PriceLevel objects and a sorted list of level
+keys. Keys are the price for bids and the negated price for asks, so the best
+level of either side is always the last key: taking or removing it is O(1),
+and depth, paging and price-range views walk outward from the end without
+touching levels they do not return.
+
+A secondary index buckets the resting orders by remaining quantity, so a
+filter on price and quantity bounds can start from whichever index yields
+fewer candidates.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from itertools import islice
+from time import perf_counter_ns
+
+
+class PriceLevel:
+    __slots__ = ("price", "orders", "quantity")
+
+    def __init__(self, price):
+        """
+        Initialize a new PriceLevel object.
+
+        Args:
+            price (float): The price shared by every order at this level.
+        """
+        self.price = price
+        self.orders = deque()  # Orders in time priority, oldest first
+        self.quantity = 0  # Total remaining quantity at this level
+
+    def __len__(self):
+        return len(self.orders)
+
+    def __repr__(self):
+        return f"PriceLevel(price={self.price}, orders={len(self.orders)}, quantity={self.quantity})"
+
+
+class BookSide:
+    def __init__(self, side):
+        """
+        Initialize a new BookSide object.
+
+        Args:
+            side (str): The side held by this object ("buy" or "sell").
+        """
+        self.side = side
+        self.sign = 1 if side == "buy" else -1
+        self.levels = {}  # Level key -> PriceLevel
+        self.keys = []  # Level keys in ascending order; the best level is last
+        self.order_count = 0
+        self.price_total = 0.0  # Sum of resting order prices, for the average price
+        self.quantity_index = {}  # Remaining quantity -> insertion-ordered dict of orders
+        self.quantity_keys = []  # Quantities present in quantity_index, ascending
+
+    def __len__(self):
+        return self.order_count
+
+    def __bool__(self):
+        return self.order_count > 0
+
+    def best(self):
+        """Return the best PriceLevel, or None if the side is empty."""
+        return self.levels[self.keys[-1]] if self.keys else None
+
+    def add(self, order):
+        """Append an order to the back of its price level, creating the level if needed."""
+        key = self.sign * order.price
+        level = self.levels.get(key)
+        if level is None:
+            level = self.levels[key] = PriceLevel(order.price)
+            insort(self.keys, key)
+        level.orders.append(order)
+        level.quantity += order.quantity
+        self.order_count += 1
+        self.price_total += order.price
+        self._index_quantity(order)
+
+    def remove(self, order):
+        """
+        Remove an order from anywhere in its price level.
+
+        This is O(1) to find the level and linear only in the number of orders
+        resting at that one price.
+        """
+        key = self.sign * order.price
+        level = self.levels[key]
+        level.orders.remove(order)
+        level.quantity -= order.quantity
+        self._unindex_quantity(order)
+        self._forget(order)
+        if not level.orders:
+            self._drop_level(key)
+
+    def remove_orders(self, orders):
+        """
+        Remove many orders at once, visiting each affected price level once.
+
+        A level losing all of its orders is dropped whole; any other level is
+        rebuilt in one pass without the removed orders. This is linear in the
+        orders at the affected levels rather than one deque search per order.
+
+        Args:
+            orders (iterable): Resting orders of this side.
+        """
+        by_level = {}  # Level key -> set of orders to remove from it
+        sign = self.sign
+        for order in orders:
+            by_level.setdefault(sign * order.price, set()).add(order)
+        for key, removing in by_level.items():
+            level = self.levels[key]
+            for order in removing:
+                level.quantity -= order.quantity
+                self._unindex_quantity(order)
+                self._forget(order)
+            if len(removing) == len(level.orders):
+                # Every order at this price goes: drop the level without rebuilding it
+                self._drop_level(key)
+            elif len(removing) < 8:
+                # A few orders: deque.remove's scan in C beats rebuilding the level
+                for order in removing:
+                    level.orders.remove(order)
+            else:
+                level.orders = deque(order for order in level.orders if order not in removing)
+
+    def detach_range(self, min_price=None, max_price=None):
+        """
+        Remove every level with a price inside [min_price, max_price] at once.
+
+        The levels are cut out of the sorted keys with a single slice, so no
+        level is searched for or rebuilt; when the range covers the whole side
+        the quantity index is reset instead of being unwound order by order.
+
+        Returns:
+            list: The removed orders in priority order.
+        """
+        low, high = self._range_bounds(min_price, max_price)
+        if low >= high:
+            return []
+        keys, levels = self.keys, self.levels
+        removed = []
+        for index in range(high - 1, low - 1, -1):
+            removed.extend(levels.pop(keys[index]).orders)
+        del keys[low:high]
+        if keys:
+            for order in removed:
+                self._unindex_quantity(order)
+            self.order_count -= len(removed)
+            self.price_total = self.price_total - sum(order.price for order in removed) if self.order_count else 0.0
+        else:
+            self.quantity_index = {}
+            self.quantity_keys = []
+            self.order_count = 0
+            self.price_total = 0.0
+        return removed
+
+    def fill(self, level, order, quantity):
+        """
+        Reduce a resting order and its level by a filled quantity.
+
+        A fully filled order is left at the front of its level for
+        pop_best_order() to remove.
+        """
+        self._unindex_quantity(order)
+        order.quantity -= quantity
+        level.quantity -= quantity
+        if order.quantity:
+            self._index_quantity(order)
+
+    def pop_best_order(self):
+        """Remove and return the order at the front of the best level."""
+        level = self.levels[self.keys[-1]]
+        order = level.orders.popleft()
+        level.quantity -= order.quantity
+        if order.quantity:
+            self._unindex_quantity(order)
+        self._forget(order)
+        if not level.orders:
+            del self.levels[self.keys.pop()]
+        return order
+
+    def settle(self, fills):
+        """
+        Update the levels and indexes for a sweep of fills already applied to the orders.
+
+        A call auction reduces order.quantity directly while pairing its fills
+        and settles each side once afterwards: partially filled orders are
+        re-indexed and the fully filled ones are removed from their levels, or
+        replenished if they are icebergs with a reserve left. Levels left empty
+        are dropped.
+
+        Args:
+            fills (list): (level, order, quantity) tuples in priority order, with
+                each order's quantity already reduced by its filled quantity.
+        """
+        quantity_index = self.quantity_index
+        exhausted = {}  # Level -> its fully filled orders, in priority order
+        for level, order, quantity in fills:
+            previous = order.quantity + quantity
+            bucket = quantity_index[previous]
+            del bucket[order]
+            if not bucket:
+                del quantity_index[previous]
+                del self.quantity_keys[bisect_left(self.quantity_keys, previous)]
+            level.quantity -= quantity
+            if order.quantity:
+                self._index_quantity(order)
+            else:
+                exhausted.setdefault(level, []).append(order)
+
+        for level, orders in exhausted.items():
+            if level.orders[len(orders) - 1] is orders[-1]:
+                # The usual case: the filled orders are the front of the level
+                for _ in orders:
+                    level.orders.popleft()
+            else:
+                # Pro-rata rounding can fill an order behind a partially filled one
+                level.orders = deque(order for order in level.orders if order.quantity)
+            for order in orders:
+                if order.hidden_quantity:
+                    self._refill(level, order)
+                else:
+                    self._forget(order)
+            if not level.orders:
+                self._drop_level(self.sign * level.price)
+
+    def replenish(self, level, order):
+        """
+        Refill the exhausted clip of an iceberg order at the front of its level from its reserve.
+
+        The same order object moves to the back of the level with a new arrival
+        time, so the refilled clip loses its time priority.
+        """
+        level.orders.popleft()
+        self._refill(level, order)
+
+    def _refill(self, level, order):
+        clip = min(order.display_quantity, order.hidden_quantity)
+        order.hidden_quantity -= clip
+        order.quantity = clip
+        order.arrival_ns = perf_counter_ns()
+        level.quantity += clip
+        level.orders.append(order)
+        self._index_quantity(order)
+
+    def _forget(self, order):
+        self.order_count -= 1
+        # Reset on empty so float rounding cannot accumulate across the session
+        self.price_total = self.price_total - order.price if self.order_count else 0.0
+
+    def _index_quantity(self, order):
+        bucket = self.quantity_index.get(order.quantity)
+        if bucket is None:
+            bucket = self.quantity_index[order.quantity] = {}
+            insort(self.quantity_keys, order.quantity)
+        bucket[order] = None
+
+    def _unindex_quantity(self, order):
+        bucket = self.quantity_index[order.quantity]
+        del bucket[order]
+        if not bucket:
+            del self.quantity_index[order.quantity]
+            del self.quantity_keys[bisect_left(self.quantity_keys, order.quantity)]
+
+    def average_price(self):
+        """Return the average price of the resting orders in O(1), or 0 if the side is empty."""
+        return self.price_total / self.order_count if self.order_count else 0.0
+
+    def _drop_level(self, key):
+        del self.levels[key]
+        index = bisect_left(self.keys, key)
+        del self.keys[index]
+
+    def iter_levels(self, start=0):
+        """
+        Iterate over the price levels from the best price outwards.
+
+        Args:
+            start (int, optional): Number of best levels to skip. Defaults to 0.
+        """
+        keys, levels = self.keys, self.levels
+        for index in range(len(keys) - 1 - start, -1, -1):
+            yield levels[keys[index]]
+
+    def iter_orders(self, start=0, limit=None):
+        """
+        Iterate over the orders in priority order (best price, then time).
+
+        Whole levels before the requested window are skipped using their order
+        counts, so only the levels overlapping the window are walked.
+
+        Args:
+            start (int, optional): Number of orders to skip. Defaults to 0.
+            limit (int, optional): Maximum number of orders to yield. Defaults to all.
+        """
+        remaining = limit
+        for level in self.iter_levels():
+            if remaining is not None and remaining <= 0:
+                return
+            if start >= len(level.orders):
+                start -= len(level.orders)
+                continue
+            orders = level.orders if not start and remaining is None else \
+                islice(level.orders, start, None if remaining is None else start + remaining)
+            start = 0
+            for order in orders:
+                if remaining is not None:
+                    remaining -= 1
+                yield order
+
+    def depth(self, levels=None):
+        """
+        Return the aggregated depth of the best levels.
+
+        Args:
+            levels (int, optional): Number of levels to return. Defaults to all.
+
+        Returns:
+            list: (price, total quantity, order count) tuples, best price first.
+        """
+        return [(level.price, level.quantity, len(level.orders))
+                for level in islice(self.iter_levels(), levels)]
+
+    def levels_in_range(self, min_price=None, max_price=None):
+        """
+        Iterate over the levels with prices inside [min_price, max_price], best first.
+
+        The bounds are located with bisect on the sorted keys, so levels outside
+        the range are never visited.
+        """
+        keys, levels = self.keys, self.levels
+        low, high = self._range_bounds(min_price, max_price)
+        for index in range(high - 1, low - 1, -1):
+            yield levels[keys[index]]
+
+    def _range_bounds(self, min_price, max_price):
+        # Slice of self.keys holding the levels priced inside [min_price, max_price]
+        keys = self.keys
+        if self.sign > 0:
+            low = 0 if min_price is None else bisect_left(keys, min_price)
+            high = len(keys) if max_price is None else bisect_right(keys, max_price)
+        else:
+            low = 0 if max_price is None else bisect_left(keys, -max_price)
+            high = len(keys) if min_price is None else bisect_right(keys, -min_price)
+        return low, high
+
+    def filter_orders(self, min_price=None, max_price=None, min_quantity=None, max_quantity=None):
+        """
+        Return the orders inside the given price and quantity bounds, in priority order.
+
+        The number of orders in the quantity range is read from the quantity
+        index first. Price levels in range are then walked until they hold more
+        orders than that; if they never do, the price levels are scanned,
+        otherwise the quantity buckets are scanned and the result sorted. Either
+        way only min(price candidates, quantity candidates) orders are touched.
+
+        Args:
+            min_price (float, optional): Lowest price to include. Defaults to no bound.
+            max_price (float, optional): Highest price to include. Defaults to no bound.
+            min_quantity (int, optional): Lowest remaining quantity to include. Defaults to no bound.
+            max_quantity (int, optional): Highest remaining quantity to include. Defaults to no bound.
+
+        Returns:
+            list: The matching orders, best price and oldest first.
+        """
+        min_quantity = 0 if min_quantity is None else min_quantity
+        max_quantity = float("inf") if max_quantity is None else max_quantity
+        min_price = float("-inf") if min_price is None else min_price
+        max_price = float("inf") if max_price is None else max_price
+
+        quantity_keys = self.quantity_keys
+        low = bisect_left(quantity_keys, min_quantity)
+        high = bisect_right(quantity_keys, max_quantity)
+        if low == 0 and high == len(quantity_keys):
+            quantity_candidates = self.order_count
+        else:
+            quantity_candidates = sum(len(self.quantity_index[quantity]) for quantity in quantity_keys[low:high])
+
+        levels = []
+        price_candidates = 0
+        for level in self.levels_in_range(min_price, max_price):
+            price_candidates += len(level.orders)
+            if price_candidates > quantity_candidates:
+                break
+            levels.append(level)
+        else:
+            return [order for level in levels for order in level.orders
+                    if min_quantity <= order.quantity <= max_quantity]
+
+        orders = [order for quantity in quantity_keys[low:high] for order in self.quantity_index[quantity]
+                  if min_price <= order.price <= max_price]
+        sign = self.sign
+        orders.sort(key=lambda order: (-sign * order.price, order.arrival_ns))
+        return orders
@@ -0,0 +1,245 @@
+"""
+This module publishes order book snapshots into shared memory for readers in other processes.
+
+A BookSnapshotWriter owns a multiprocessing.shared_memory segment with a
+fixed binary layout: a header, the stats, the top N bid and ask levels and
+the most recent trades. Writing a snapshot packs the values straight into
+the segment with struct.pack_into; nothing is pickled and the writer never
+waits for readers.
+
+Consistency comes from a seqlock. The writer makes the sequence number odd
+before changing the segment and even again afterwards. A reader reads the
+sequence number, the data and the sequence number again, and retries if it
+was odd or changed. Readers never write to the segment, so any number of
+them can poll it without slowing the matcher.
+
+BookSnapshotReader maps the segment read-only (through /dev/shm on Linux)
+and decodes it in place. Run a simple monitor in another process with:
+
+    python book_snapshot.py <segment name>
+"""
+
+import argparse
+import logging
+import mmap
+import os
+import struct
+import time
+from itertools import islice
+from multiprocessing import shared_memory
+
+MAGIC = b'CLOB'
+VERSION = 1
+
+# magic, version, depth, trade capacity, sequence number
+HEADER = struct.Struct('<4sIIIQ')
+SEQUENCE_OFFSET = 16
+# publish count, publish time (ns since epoch), last matched price, bid orders, ask orders,
+# bid levels, ask levels, bid average price, ask average price, total trades, bid rows, ask rows, trade rows
+STATS = struct.Struct('<QQdQQQQddQIII')
+LEVEL = struct.Struct('<dqI')  # price, total quantity, order count
+TRADE = struct.Struct('<dqq')  # price, quantity, timestamp (seconds)
+
+
+def segment_size(depth, trades):
+    """Return the number of bytes needed for a snapshot with the given depth and trade capacity."""
+    return HEADER.size + STATS.size + 2 * depth * LEVEL.size + trades * TRADE.size
+
+
+class BookSnapshotWriter:
+    def __init__(self, name=None, depth=10, trades=50):
+        """
+        Initialize a new BookSnapshotWriter object, creating its shared memory segment.
+
+        Args:
+            name (str, optional): Name of the segment. Defaults to a random name, see self.name.
+            depth (int, optional): Number of price levels published per side. Defaults to 10.
+            trades (int, optional): Number of recent trades published. Defaults to 50.
+        """
+        self.depth = depth
+        self.trades = trades
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=segment_size(depth, trades))
+        self.name = self.shm.name
+        self.buffer = self.shm.buf
+        self.sequence = 0
+        self.publish_count = 0
+        HEADER.pack_into(self.buffer, 0, MAGIC, VERSION, depth, trades, 0)
+        logging.info(f"Book snapshot segment created: {self.name}")
+
+    def publish(self, order_book):
+        """
+        Write the current state of an order book into the segment.
+
+        This is O(depth + trades) and never blocks on readers.
+
+        Args:
+            order_book (OrderBook): The book to publish.
+        """
+        buffer = self.buffer
+        depth = order_book.get_depth(self.depth)
+        bids, asks = depth["bids"], depth["asks"]
+        trades = list(islice(order_book.order_history, self.trades))  # Newest first
+        self.publish_count += 1
+
+        # Odd sequence number: readers retry until the write below is complete
+        self.sequence += 1
+        struct.pack_into('<Q', buffer, SEQUENCE_OFFSET, self.sequence)
+
+        offset = HEADER.size
+        STATS.pack_into(buffer, offset, self.publish_count, time.time_ns(), order_book.last_matched_price or 0.0,
+                        len(order_book.bids), len(order_book.asks),
+                        len(order_book.bids.keys), len(order_book.asks.keys),
+                        order_book.bids.average_price(), order_book.asks.average_price(),
+                        len(order_book.order_history), len(bids), len(asks), len(trades))
+        offset += STATS.size
+        for rows in (bids, asks):
+            for index, row in enumerate(rows):
+                LEVEL.pack_into(buffer, offset + index * LEVEL.size, *row)
+            offset += self.depth * LEVEL.size
+        for index, trade in enumerate(trades):
+            TRADE.pack_into(buffer, offset + index * TRADE.size, trade['price'], trade['quantity'], trade['timestamp'])
+
+        self.sequence += 1
+        struct.pack_into('<Q', buffer, SEQUENCE_OFFSET, self.sequence)
+
+    def close(self, unlink=True):
+        """Release the segment, removing it from the system unless unlink is False."""
+        self.buffer.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+        logging.info(f"Book snapshot segment closed: {self.name}")
+
+
+class BookSnapshotReader:
+    def __init__(self, name):
+        """
+        Initialize a new BookSnapshotReader object by mapping an existing segment read-only.
+
+        Args:
+            name (str): Name of the segment, as BookSnapshotWriter.name.
+
+        Raises:
+            ValueError: If the segment does not hold a book snapshot.
+        """
+        self.name = name
+        path = os.path.join('/dev/shm', name.lstrip('/'))
+        if os.path.exists(path):
+            # Map the segment read-only; this also keeps it out of the resource tracker
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                self._mmap = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+            self._shm = None
+            self.buffer = memoryview(self._mmap)
+        else:
+            self._mmap = None
+            self._shm = shared_memory.SharedMemory(name=name)
+            self.buffer = self._shm.buf
+        magic, version, self.depth, self.trades, _ = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Segment {name} does not hold a version {VERSION} book snapshot")
+
+    def sequence(self):
+        """Return the current sequence number; it changes on every publish."""
+        return struct.unpack_from('<Q', self.buffer, SEQUENCE_OFFSET)[0]
+
+    def read(self, timeout=1.0):
+        """
+        Return a consistent snapshot, retrying while the writer is publishing.
+
+        Each failed attempt yields the CPU, so a writer preempted halfway
+        through a publish can finish it even when both share one core.
+
+        Args:
+            timeout (float, optional): Seconds to keep retrying. Defaults to 1.0.
+
+        Returns:
+            dict: Keys "sequence", "stats", "bids", "asks" and "trades". Levels are
+                (price, quantity, order count) tuples, best first; trades are
+                (price, quantity, timestamp) tuples, newest first.
+
+        Raises:
+            RuntimeError: If no consistent snapshot could be read within the timeout.
+        """
+        buffer = self.buffer
+        deadline = time.monotonic() + timeout
+        while True:
+            before = struct.unpack_from('<Q', buffer, SEQUENCE_OFFSET)[0]
+            if before & 1:
+                if time.monotonic() > deadline:
+                    break
+                time.sleep(0)
+                continue
+            offset = HEADER.size
+            (publish_count, published_ns, last_price, bid_orders, ask_orders, bid_levels, ask_levels,
+             bid_average, ask_average, trade_total, bid_rows, ask_rows, trade_rows) = STATS.unpack_from(buffer, offset)
+            offset += STATS.size
+            sides = []
+            for rows in (bid_rows, ask_rows):
+                sides.append([LEVEL.unpack_from(buffer, offset + index * LEVEL.size)
+                              for index in range(min(rows, self.depth))])
+                offset += self.depth * LEVEL.size
+            trades = [TRADE.unpack_from(buffer, offset + index * TRADE.size)
+                      for index in range(min(trade_rows, self.trades))]
+            if struct.unpack_from('<Q', buffer, SEQUENCE_OFFSET)[0] == before:
+                return {
+                    "sequence": before,
+                    "stats": {
+                        "publish_count": publish_count,
+                        "published_ns": published_ns,
+                        "last_matched_price": last_price or None,
+                        "bid_orders": bid_orders,
+                        "ask_orders": ask_orders,
+                        "bid_levels": bid_levels,
+                        "ask_levels": ask_levels,
+                        "bid_average_price": bid_average,
+                        "ask_average_price": ask_average,
+                        "trades": trade_total,
+                    },
+                    "bids": sides[0],
+                    "asks": sides[1],
+                    "trades": trades,
+                }
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0)
+        raise RuntimeError(f"No consistent snapshot of {self.name} within {timeout} s")
+
+    def close(self):
+        self.buffer.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        else:
+            self._shm.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the book snapshot published in a shared memory segment.")
+    parser.add_argument("name", help="Name of the shared memory segment")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between prints")
+    args = parser.parse_args()
+
+    reader = BookSnapshotReader(args.name)
+    last_sequence = None
+    try:
+        while True:
+            snapshot = reader.read()
+            if snapshot["sequence"] != last_sequence:
+                last_sequence = snapshot["sequence"]
+                stats = snapshot["stats"]
+                best_bid = snapshot["bids"][0] if snapshot["bids"] else None
+                best_ask = snapshot["asks"][0] if snapshot["asks"] else None
+                print(f"#{stats['publish_count']} last={stats['last_matched_price']} "
+                      f"bid={best_bid} ask={best_ask} orders={stats['bid_orders']}/{stats['ask_orders']} "
+                      f"trades={stats['trades']}")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,16 @@ from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit
 from order import Order
 
 class CustomOrderDialog(QDialog):
-    def __init__(self, order_book, symbol_list):
+    def __init__(self, order_book, symbol_list, risk_manager=None, user=None):
         """
         Initializes a new instance of the CustomOrderDialog class.
 
         Args:
             order_book (OrderBook): The order book object.
             symbol_list (list): The list of symbols.
+            risk_manager (RiskManager, optional): When given, orders are added through its
+                pre-trade checks on behalf of user. Defaults to None.
+            user (User, optional): The logged-in user sending the orders. Defaults to None.
         """
         # Call the parent constructor
         super().__init__()
@@ -18,6 +21,8 @@ class CustomOrderDialog(QDialog):
         # Initialize instance variables
         self.order_book = order_book
         self.symbol_list = symbol_list
+        self.risk_manager = risk_manager
+        self.user = user
 
         # Initialize the user interface
         self.init_ui()
@@ -64,8 +69,19 @@ class CustomOrderDialog(QDialog):
         print("Side input field populated")
         self.type_input = QComboBox()  # Type input field
         print("Type input field created")
-        self.type_input.addItems(["limit", "market"])  # Populate the type input field with options
+        self.type_input.addItems(["limit", "market", "stop", "stop_limit"])  # Populate the type input field with options
         print("Type input field populated")
+        self.stop_price_input = QLineEdit()  # Stop price input field, used by stop and stop-limit orders
+        logging.debug("Stop price input field created")
+        self.display_input = QSpinBox()  # Displayed clip of an iceberg order; 0 displays the whole order
+        self.display_input.setRange(0, 10000)
+        logging.debug("Display quantity input field created")
+        self.tif_input = QComboBox()  # Time in force input field
+        self.tif_input.addItems(["gtc", "day", "gtt"])
+        self.expire_input = QSpinBox()  # Seconds until a GTT order expires
+        self.expire_input.setRange(1, 7 * 24 * 3600)
+        self.expire_input.setValue(3600)
+        logging.debug("Time in force input fields created")
 
         # Add the input fields to the form layout
         form_layout.addWidget(QLabel("Order ID"))  # Label for the order ID input field
@@ -92,6 +108,17 @@ class CustomOrderDialog(QDialog):
         print("Type label added")
         form_layout.addWidget(self.type_input)  # Type input field
         print("Type input field added")
+        form_layout.addWidget(QLabel("Stop Price"))  # Label for the stop price input field
+        form_layout.addWidget(self.stop_price_input)  # Stop price input field
+        logging.debug("Stop price input field added")
+        form_layout.addWidget(QLabel("Display"))  # Label for the iceberg display quantity input field
+        form_layout.addWidget(self.display_input)  # Display quantity input field
+        logging.debug("Display quantity input field added")
+        form_layout.addWidget(QLabel("TIF"))  # Label for the time in force input field
+        form_layout.addWidget(self.tif_input)  # Time in force input field
+        form_layout.addWidget(QLabel("GTT Seconds"))  # Label for the GTT expiry input field
+        form_layout.addWidget(self.expire_input)  # GTT expiry input field
+        logging.debug("Time in force input fields added")
 
         # Create the add order button and connect it to the add_order method
         add_order_button = QPushButton("Add Order")
@@ -125,14 +152,21 @@ class CustomOrderDialog(QDialog):
                 price=float(self.price_input.text()),
                 quantity=self.quantity_input.value(),
                 side=self.side_input.currentText(),
-                order_type=self.type_input.currentText()
+                order_type=self.type_input.currentText(),
+                stop_price=float(self.stop_price_input.text()) if self.stop_price_input.text() else None,
+                display_quantity=self.display_input.value() or None,
+                time_in_force=self.tif_input.currentText(),
+                expire_at=time.time() + self.expire_input.value() if self.tif_input.currentText() == "gtt" else None
             )
 
             # Print the order details for debugging
             print("Adding order:", order.__dict__)
 
-            # Add the order to the order book
-            self.order_book.add_order(order)
+            # Add the order to the order book, through the risk checks when configured
+            if self.risk_manager is not None:
+                self.risk_manager.add_order(order, self.user)
+            else:
+                self.order_book.add_order(order)
 
             # Print the successful addition of the order
             print("Order added:", order.__dict__)
@@ -148,7 +182,7 @@ class CustomOrderDialog(QDialog):
             print("Error:", e)
 
             # Show an error message to the user
-            QMessageBox.critical(self, "Error", f"Invalid input: {e}")
+            QMessageBox.critical(self, "Error", f"Order rejected: {e}")
 
         except Exception as e:
             # Log the error caused by failure to add the order
@@ -0,0 +1,196 @@
+"""
+This module checks two order book engines against each other on the same randomized event stream.
+
+Each event (add, cancel or match) is applied to both engines with separate
+Order objects. After each one the harness compares what the engines
+returned and, every check_every events, their state digests (see
+state_digest.py), which cost O(1) to read. The first difference is reported
+with the event that caused it and the first order or fill that differs, so
+a fast backend can be validated against OrderBook over millions of events
+in seconds.
+
+Run from the repository root:
+
+    python differential.py --events 1000000 --seed 1
+    python differential.py --engines orderbook numpy --events 100000
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+
+from order import Order
+from order_book import OrderBook
+
+ENGINES = ("orderbook", "numpy")
+
+
+def make_engine(name):
+    """Create an empty engine by name (one of ENGINES)."""
+    if name == "orderbook":
+        return OrderBook()
+    if name == "numpy":
+        # Imported here so the harness runs without NumPy when it is not compared
+        from numpy_book import NumpyOrderBook
+        return NumpyOrderBook()
+    raise ValueError(f"Engine must be one of {', '.join(ENGINES)}")
+
+
+def random_events(count, seed=None, symbol="AAPL", cancel_ratio=0.2, match_every=10, mid_price=100.0,
+                  spread_ticks=20, tick_size=0.01):
+    """
+    Generate a reproducible stream of add, cancel and match events for one symbol.
+
+    Prices are on the tick grid within spread_ticks of mid_price, so buys and
+    sells overlap and most match passes trade. Cancels pick a random earlier
+    order, which may already be filled.
+
+    Yields:
+        tuple: ("add", (order_id, price, quantity, side, order_type)), ("cancel", order_id) or ("match",).
+    """
+    rng = random.Random(seed)
+    order_ids = []
+    for index in range(1, count + 1):
+        if order_ids and rng.random() < cancel_ratio:
+            yield ("cancel", order_ids[rng.randrange(len(order_ids))])
+        else:
+            order_id = str(index)
+            order_ids.append(order_id)
+            price = round(mid_price + rng.randint(-spread_ticks, spread_ticks) * tick_size, 2)
+            yield ("add", (order_id, symbol, price, rng.randint(1, 100), rng.choice(["buy", "sell"]),
+                           "market" if rng.random() < 0.05 else "limit"))
+        if index % match_every == 0:
+            yield ("match",)
+
+
+def apply_event(book, event):
+    """
+    Apply one event to a book.
+
+    Returns:
+        The comparable outcome: the add error (or None), the cancel message, or the
+        (buy order ID, sell order ID, quantity) fills of a match.
+    """
+    kind = event[0]
+    if kind == "add":
+        order_id, symbol, price, quantity, side, order_type = event[1]
+        try:
+            book.add_order(Order(0, order_id, symbol, price, quantity, side, order_type))
+        except ValueError as e:
+            return str(e)
+        return None
+    if kind == "cancel":
+        return book.cancel_order(event[1])
+    return [(buy.order_id, sell.order_id, quantity) for buy, sell, quantity in book.match_orders()]
+
+
+class Divergence:
+    def __init__(self, index, event, reason, expected, actual):
+        """
+        Initialize a new Divergence object describing where two engines first differ.
+
+        Args:
+            index (int): Position of the event in the stream, from 0.
+            event (tuple): The event after which the engines differed.
+            reason (str): What differed: "outcome", "orders" or "fills".
+            expected: The reference engine's value.
+            actual: The candidate engine's value.
+        """
+        self.index = index
+        self.event = event
+        self.reason = reason
+        self.expected = expected
+        self.actual = actual
+
+    def __str__(self):
+        return (f"Divergence after event {self.index} {self.event}: {self.reason} differ\n"
+                f"  reference: {self.expected}\n  candidate: {self.actual}")
+
+
+def describe_difference(reference, candidate):
+    """
+    Find the first open order or fill that differs between two books whose digests differ.
+
+    Returns:
+        tuple: (reason, reference value, candidate value).
+    """
+    for side in ("buy", "sell"):
+        expected = [(o.order_id, o.price, o.total_quantity) for o in reference.iter_orders(side)]
+        actual = [(o.order_id, o.price, o.total_quantity) for o in candidate.iter_orders(side)]
+        for position, (a, b) in enumerate(zip(expected, actual)):
+            if a != b:
+                return "orders", f"{side} #{position} {a}", f"{side} #{position} {b}"
+        if len(expected) != len(actual):
+            return "orders", f"{len(expected)} {side} orders", f"{len(actual)} {side} orders"
+    # Same resting orders in the same priority: the fills differ (history is newest first)
+    expected = list(reversed(reference.get_order_history()))
+    actual = list(reversed(candidate.get_order_history()))
+    for position, (a, b) in enumerate(zip(expected, actual)):
+        a = (a["buy_order_id"], a["sell_order_id"], a["quantity"], a["price"])
+        b = (b["buy_order_id"], b["sell_order_id"], b["quantity"], b["price"])
+        if a != b:
+            return "fills", f"fill #{position} {a}", f"fill #{position} {b}"
+    return "fills", f"{len(expected)} fills", f"{len(actual)} fills"
+
+
+def run_differential(reference, candidate, events, check_every=1):
+    """
+    Apply the same events to two books and stop at the first difference.
+
+    Outcomes are compared after every event and state digests every
+    check_every events and after the last one. A larger check_every is
+    faster; the divergence is then reported at the first check after it.
+
+    Args:
+        reference (OrderBook): The engine trusted to be right.
+        candidate: The engine under test, with the same interface and state_digest().
+        events (iterable): Events from random_events().
+        check_every (int, optional): Events between digest comparisons. Defaults to 1.
+
+    Returns:
+        tuple: (number of events applied, Divergence or None).
+    """
+    reference.state_digest()
+    candidate.state_digest()
+    index = -1
+    event = None
+    for index, event in enumerate(events):
+        expected = apply_event(reference, event)
+        actual = apply_event(candidate, event)
+        if expected != actual:
+            return index + 1, Divergence(index, event, "outcome", expected, actual)
+        if index % check_every == 0 and reference.state_digest() != candidate.state_digest():
+            return index + 1, Divergence(index, event, *describe_difference(reference, candidate))
+    if index >= 0 and reference.state_digest() != candidate.state_digest():
+        return index + 1, Divergence(index, event, *describe_difference(reference, candidate))
+    return index + 1, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two order book engines on a randomized event stream")
+    parser.add_argument("--engines", nargs=2, default=["orderbook", "numpy"], choices=ENGINES,
+                        metavar="ENGINE", help=f"Reference and candidate engine: {', '.join(ENGINES)}")
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cancel-ratio", type=float, default=0.2)
+    parser.add_argument("--match-every", type=int, default=10)
+    parser.add_argument("--check-every", type=int, default=1, help="Events between digest comparisons")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    reference, candidate = (make_engine(name) for name in args.engines)
+    events = random_events(args.events, args.seed, cancel_ratio=args.cancel_ratio, match_every=args.match_every)
+    start = time.perf_counter()
+    applied, divergence = run_differential(reference, candidate, events, args.check_every)
+    elapsed = time.perf_counter() - start
+    if divergence is not None:
+        print(divergence)
+        sys.exit(1)
+    print(f"{applied} events identical in {elapsed:.2f} s ({applied / elapsed:,.0f} events/s), "
+          f"digest {reference.state_digest()}")
+
+
+if __name__ == "__main__":
+    main()
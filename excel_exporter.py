@@ -1,62 +1,237 @@
-import pandas as pd
 import logging
 
-def export_orders_to_excel(matched_orders, filename='matched_orders.xlsx'):
+# History dictionary keys and the column headings they are exported under, in sheet order
+COLUMNS = {
+    "buy_order_id": "Buy Order ID",
+    "sell_order_id": "Sell Order ID",
+    "symbol": "Symbol",
+    "quantity": "Quantity",
+    "price": "Price",
+    "timestamp": "Timestamp",
+    "buy_owner": "Buy Owner",
+    "sell_owner": "Sell Owner",
+}
+
+SYMBOL_SUMMARY_COLUMNS = ["Symbol", "Trades", "Volume", "Notional", "VWAP", "Open", "High", "Low", "Close",
+                          "First Trade", "Last Trade"]
+OWNER_SUMMARY_COLUMNS = ["Symbol", "Owner", "Buy Trades", "Buy Volume", "Sell Trades", "Sell Volume",
+                         "Net Volume", "Buy Notional", "Sell Notional"]
+
+
+class SymbolSummary:
+    def __init__(self, symbol):
+        """
+        Initialize a new SymbolSummary object, the running totals of one symbol's fills.
+
+        Args:
+            symbol (str): The symbol summarized.
+        """
+        self.symbol = symbol
+        self.trades = 0
+        self.volume = 0
+        self.notional = 0.0
+        self.high = None
+        self.low = None
+        self.open = self.close = None  # Prices of the earliest and latest fills
+        self.first = self.last = None  # Timestamps of the earliest and latest fills
+
+    def add(self, quantity, price, timestamp, newest_first):
+        """
+        Add one fill.
+
+        Args:
+            quantity (int): The filled quantity.
+            price (float): The fill price.
+            timestamp (float): The fill time in seconds since the epoch.
+            newest_first (bool): Whether fills arrive newest first, which decides open and close
+                between fills with the same timestamp.
+        """
+        self.trades += 1
+        self.volume += quantity
+        self.notional += quantity * price
+        if self.high is None:
+            self.high = self.low = self.open = self.close = price
+            self.first = self.last = timestamp
+            return
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        if timestamp < self.first or (newest_first and timestamp == self.first):
+            self.first, self.open = timestamp, price
+        if timestamp > self.last or (not newest_first and timestamp == self.last):
+            self.last, self.close = timestamp, price
+
+    def row(self):
+        """Return the summary as a row of SYMBOL_SUMMARY_COLUMNS."""
+        return [self.symbol, self.trades, self.volume, self.notional, self.notional / self.volume,
+                self.open, self.high, self.low, self.close, self.first, self.last]
+
+
+class OwnerSummary:
+    def __init__(self, symbol, owner):
+        """
+        Initialize a new OwnerSummary object, the running totals of one owner's fills in one symbol.
+
+        Args:
+            symbol (str): The symbol summarized.
+            owner (str): The owner of the orders.
+        """
+        self.symbol = symbol
+        self.owner = owner
+        self.buy_trades = self.sell_trades = 0
+        self.buy_volume = self.sell_volume = 0
+        self.buy_notional = self.sell_notional = 0.0
+
+    def row(self):
+        """Return the summary as a row of OWNER_SUMMARY_COLUMNS."""
+        return [self.symbol, self.owner, self.buy_trades, self.buy_volume, self.sell_trades, self.sell_volume,
+                self.buy_volume - self.sell_volume, self.buy_notional, self.sell_notional]
+
+
+def collect_trades(matched_orders, newest_first=True):
+    """
+    Read matched orders once, collecting the raw columns and the per-symbol and per-owner summaries.
+
+    Args:
+        matched_orders (iterable): History dictionaries, e.g. OrderBook.get_order_history()
+            or TradeTapeReader.iter_trades(); a generator is read only once.
+        newest_first (bool, optional): Whether the fills run from newest to oldest, as in
+            the order book's history. Pass False for the trade tape. Defaults to True.
+
+    Returns:
+        tuple: (columns, symbols, owners): a list of values per COLUMNS key, SymbolSummary
+            objects by symbol and OwnerSummary objects by (symbol, owner). Fills of orders
+            without an owner are left out of the owner summaries.
+    """
+    columns = {key: [] for key in COLUMNS}
+    symbols = {}
+    owners = {}
+    # Bound appends of every column, in the order of the keys read from each fill
+    appends = [(key, values.append) for key, values in columns.items()]
+    for trade in matched_orders:
+        for key, append in appends:
+            append(trade[key])
+        symbol = trade["symbol"]
+        quantity = trade["quantity"]
+        price = trade["price"]
+        summary = symbols.get(symbol)
+        if summary is None:
+            summary = symbols[symbol] = SymbolSummary(symbol)
+        summary.add(quantity, price, trade["timestamp"], newest_first)
+
+        buy_owner = trade["buy_owner"]
+        if buy_owner is not None:
+            summary = owners.get((symbol, buy_owner))
+            if summary is None:
+                summary = owners[(symbol, buy_owner)] = OwnerSummary(symbol, buy_owner)
+            summary.buy_trades += 1
+            summary.buy_volume += quantity
+            summary.buy_notional += quantity * price
+        sell_owner = trade["sell_owner"]
+        if sell_owner is not None:
+            summary = owners.get((symbol, sell_owner))
+            if summary is None:
+                summary = owners[(symbol, sell_owner)] = OwnerSummary(symbol, sell_owner)
+            summary.sell_trades += 1
+            summary.sell_volume += quantity
+            summary.sell_notional += quantity * price
+    return columns, symbols, owners
+
+
+def export_orders_to_excel(matched_orders, filename='matched_orders.xlsx', newest_first=True):
     """
     Export matched orders to an Excel file.
 
+    The raw fills go to the "Matched Orders" sheet. The same pass over them
+    builds a "By Symbol" sheet (trades, volume, notional, VWAP, OHLC and the
+    first and last trade times per symbol) and a "By Owner" sheet (bought and
+    sold trades, volume and notional per symbol and owner), so analysts do
+    not need to pivot the raw sheet and the fills are read only once.
+
     Args:
-        matched_orders (list): List of matched orders.
+        matched_orders (iterable): History dictionaries, e.g. OrderBook.get_order_history()
+            or TradeTapeReader.iter_trades().
         filename (str, optional): Name of the Excel file. Defaults to 'matched_orders.xlsx'.
+        newest_first (bool, optional): Whether the fills run from newest to oldest; decides
+            open and close between fills in the same second. Defaults to True, the order
+            book's history order.
 
     Returns:
         str: Success message if export is successful, error message otherwise.
     """
+    # Read the fills once, collecting the raw columns and the summaries together
+    columns, symbols, owners = collect_trades(matched_orders, newest_first)
+
     # Check if there are any matched orders to export
-    if not matched_orders:
+    if not columns["symbol"]:
         logging.info("No matched orders to export.")
         print("No matched orders to export.")
         return "No matched orders to export."
 
-    # Convert matched orders to a DataFrame
-    df = pd.DataFrame(matched_orders)
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
-    
-    # Set column names for the DataFrame
-    df.columns = ["Buy Order ID", "Sell Order ID", "Symbol", "Quantity", "Price", "Timestamp"]
+    # pandas is imported on first export so importing this module stays cheap
+    import pandas as pd
+
+    # Convert the matched orders to a DataFrame with the column headings
+    df = pd.DataFrame({COLUMNS[key]: values for key, values in columns.items()})
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'], unit='s')
+
+    # Build the summary sheets, sorted by symbol and owner
+    by_symbol = pd.DataFrame([symbols[symbol].row() for symbol in sorted(symbols)],
+                             columns=SYMBOL_SUMMARY_COLUMNS)
+    for column in ("First Trade", "Last Trade"):
+        by_symbol[column] = pd.to_datetime(by_symbol[column], unit='s')
+    by_owner = pd.DataFrame([owners[key].row() for key in sorted(owners)], columns=OWNER_SUMMARY_COLUMNS)
 
     try:
         # Create an ExcelWriter object
         writer = pd.ExcelWriter(filename, engine='xlsxwriter')
-        
-        # Write the DataFrame to an Excel sheet
+
+        # Write the DataFrames to their Excel sheets
         df.to_excel(writer, sheet_name='Matched Orders', index=False)
+        by_symbol.to_excel(writer, sheet_name='By Symbol', index=False)
+        by_owner.to_excel(writer, sheet_name='By Owner', index=False)
 
-        # Access the workbook and worksheet objects
+        # Access the workbook object
         workbook = writer.book
-        worksheet = writer.sheets['Matched Orders']
 
         # Add number and date formats to the worksheet columns
-        format1 = workbook.add_format({'num_format': '0.00'})  # Format for decimal numbers
-        format2 = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})  # Format for dates
-        worksheet.set_column('A:F', 20)  # Set column width for all columns
-        worksheet.set_column('E:E', 12, format1)  # Set column width and format for quantity column
-        worksheet.set_column('F:F', 20, format2)  # Set column width and format for timestamp column
+        integer_format = workbook.add_format({'num_format': '0'})  # Format for quantities and counts
+        decimal_format = workbook.add_format({'num_format': '0.00'})  # Format for prices and notionals
+        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})  # Format for dates
+
+        worksheet = writer.sheets['Matched Orders']
+        worksheet.set_column('A:C', 20)  # Set column width for the order ID and symbol columns
+        worksheet.set_column('D:D', 12, integer_format)  # Set column width and format for quantity column
+        worksheet.set_column('E:E', 12, decimal_format)  # Set column width and format for price column
+        worksheet.set_column('F:F', 20, date_format)  # Set column width and format for timestamp column
+        worksheet.set_column('G:H', 20)  # Set column width for the owner columns
+
+        worksheet = writer.sheets['By Symbol']
+        worksheet.set_column('A:A', 12)  # Symbol
+        worksheet.set_column('B:C', 12, integer_format)  # Trades and volume
+        worksheet.set_column('D:I', 14, decimal_format)  # Notional, VWAP and OHLC
+        worksheet.set_column('J:K', 20, date_format)  # First and last trade times
+
+        worksheet = writer.sheets['By Owner']
+        worksheet.set_column('A:B', 16)  # Symbol and owner
+        worksheet.set_column('C:G', 12, integer_format)  # Trade counts and volumes
+        worksheet.set_column('H:I', 14, decimal_format)  # Notionals
 
         # Close the ExcelWriter object
         writer.close()
-        
+
         # Log success message
         logging.info(f"Matched orders exported to {filename}.")
         print(f"Matched orders exported to {filename}.")
-        
+
         # Return success message
         return f"Matched orders exported to {filename}."
-    
+
     except Exception as e:
         # Log error message
         logging.error(f"Failed to export to Excel: {e}")
         print(f"Failed to export to Excel: {e}")
-        
+
         # Return error message
         return f"Failed to export to Excel: {e}"
@@ -0,0 +1,410 @@
+"""
+This module contains an asyncio TCP order-entry gateway in front of OrderBook.
+
+Clients connect over TCP and exchange newline-delimited JSON messages:
+
+    -> {"type": "new", "id": "1", "symbol": "AAPL", "price": 150.0, "qty": 10, "side": "buy"}
+    -> {"type": "cancel", "id": "1"}
+    -> {"type": "modify", "id": "1", "price": 151.0, "qty": 5}
+    <- {"type": "ack", "id": "1"}
+    <- {"type": "reject", "id": "1", "reason": "..."}
+    <- {"type": "cancelled", "id": "1"}
+    <- {"type": "modified", "id": "1"}
+    <- {"type": "fill", "id": "1", "symbol": "AAPL", "qty": 5, "price": 150.0, "remaining": 5}
+
+Every request is answered with exactly one ack, reject, cancelled or
+modified message; replies for one symbol come back in request order.
+
+"new" also accepts "order_type" ("limit" by default), "stop_price" for
+"stop" and "stop_limit" orders and "display_qty" for iceberg orders, whose
+fill reports give the remaining quantity including the hidden reserve, and
+"tif" ("gtc", "day" or "gtt") with "expire_at" (epoch seconds) for GTT orders.
+Expired orders are reported as {"type": "expired", "id": ...}. A modify is a cancel
+and replace: the order keeps its ID but loses its time priority. A modify
+rejected by its checks leaves the order resting; if the book still refuses
+the replacement, the reply is "cancelled" with a "reason". Order IDs
+are unique across all symbols while the order is resting.
+
+Each symbol's OrderBook is only ever touched by one writer task, which
+takes requests from the symbol's queue in batches, applies them, runs one
+matching pass per batch and sends fill reports to the owning connections.
+Replies are buffered per connection and written with one socket write per
+batch. Each connection may have at most max_in_flight requests queued, and
+stops reading new requests while its socket's write buffer is full, so a
+slow or flooding client only holds itself back.
+
+Run a gateway with:
+
+    python gateway.py --host 127.0.0.1 --port 9000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time
+
+from order import Order
+from order_book import BookListener, OrderBook
+
+
+def _finite(value, name):
+    """Return a request field as a float, rejecting anything that is not a finite number."""
+    if isinstance(value, bool):
+        raise TypeError(f"{name} must be a number")
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a finite number")
+    return number
+
+
+def _whole(value, name):
+    """Return a request field as an int, rejecting fractions and non-finite numbers."""
+    number = _finite(value, name)
+    if not number.is_integer():
+        raise ValueError(f"{name} must be a whole number")
+    return int(number)
+
+
+class GatewayConnection:
+    def __init__(self, reader, writer, max_in_flight):
+        """
+        Initialize a new GatewayConnection object for one client socket.
+
+        Args:
+            reader (asyncio.StreamReader): The client's stream reader.
+            writer (asyncio.StreamWriter): The client's stream writer.
+            max_in_flight (int): Most requests the client may have queued at once.
+        """
+        self.reader = reader
+        self.writer = writer
+        self.peer = writer.get_extra_info('peername')
+        self.in_flight = asyncio.Semaphore(max_in_flight)  # Released when a request has been answered
+        self.outgoing = []  # Encoded replies waiting for the next batched write
+        self.closed = False
+
+    def send(self, message):
+        """Queue a reply; it is written by the next flush()."""
+        if not self.closed:
+            self.outgoing.append(json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n')
+
+    def flush(self):
+        """Write all queued replies with a single socket write."""
+        if self.outgoing and not self.closed:
+            self.writer.write(b''.join(self.outgoing))
+        self.outgoing.clear()
+
+
+class ExpiryCollector(BookListener):
+    """Collects the orders a book expires, so their owners can be told after the match pass."""
+
+    def __init__(self):
+        self.expired = []
+
+    def order_cancelled(self, order):
+        if order.status == 'expired':
+            self.expired.append(order)
+
+
+class OrderGateway:
+    def __init__(self, host='127.0.0.1', port=9000, max_batch=512, max_in_flight=1024, instrumented=False):
+        """
+        Initialize a new OrderGateway object.
+
+        Args:
+            host (str, optional): Address to listen on. Defaults to '127.0.0.1'.
+            port (int, optional): TCP port to listen on; 0 picks a free port. Defaults to 9000.
+            max_batch (int, optional): Most requests a symbol's writer applies before matching
+                and writing the replies. Defaults to 512.
+            max_in_flight (int, optional): Most unanswered requests per connection before the
+                gateway stops reading from it. Defaults to 1024.
+            instrumented (bool, optional): Create the symbols' OrderBooks with instrumentation.
+                Defaults to False.
+        """
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.max_in_flight = max_in_flight
+        self.instrumented = instrumented
+        self.books = {}  # Symbol -> OrderBook
+        self.queues = {}  # Symbol -> asyncio.Queue of (message, connection) for the symbol's writer
+        self.writers = {}  # Symbol -> writer task
+        self.orders = {}  # Order ID -> (symbol, connection) of every resting order
+        self.expiries = {}  # Symbol -> ExpiryCollector of its book
+        self.connections = set()
+        self.server = None
+
+    async def start(self):
+        """Start listening. The bound port is stored in self.port."""
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logging.info(f"Order gateway listening on {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def stop(self):
+        """Stop accepting connections, close the clients and cancel the writer tasks."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for connection in list(self.connections):
+            connection.closed = True
+            connection.writer.close()
+        for task in self.writers.values():
+            task.cancel()
+        await asyncio.gather(*self.writers.values(), return_exceptions=True)
+        self.writers.clear()
+        logging.info("Order gateway stopped")
+
+    def _queue_for(self, symbol):
+        queue = self.queues.get(symbol)
+        if queue is None:
+            queue = self.queues[symbol] = asyncio.Queue()
+            self.books[symbol] = OrderBook(instrumented=self.instrumented)
+            self.expiries[symbol] = ExpiryCollector()
+            self.books[symbol].add_listener(self.expiries[symbol])
+            self.writers[symbol] = asyncio.create_task(self._symbol_writer(symbol, queue))
+        return queue
+
+    async def _handle_connection(self, reader, writer):
+        connection = GatewayConnection(reader, writer, self.max_in_flight)
+        self.connections.add(connection)
+        logging.info(f"Gateway client connected: {connection.peer}")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                # Backpressure: wait for queue space, then for the socket to drain if it is backed up
+                await connection.in_flight.acquire()
+                await writer.drain()
+                self._dispatch(line, connection)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logging.warning(f"Gateway client {connection.peer} dropped: {e}")
+        finally:
+            connection.closed = True
+            self.connections.discard(connection)
+            writer.close()
+            logging.info(f"Gateway client disconnected: {connection.peer}")
+
+    def _dispatch(self, line, connection):
+        """Route one request to its symbol's writer, or reject it at once."""
+        order_id = None
+        try:
+            message = json.loads(line)
+            if not isinstance(message, dict):
+                raise TypeError("A request must be a JSON object")
+            kind = message['type']
+            if not isinstance(message['id'], (str, int)) or isinstance(message['id'], bool):
+                raise TypeError("Order ID must be a string or an integer")
+            order_id = str(message['id'])
+            if kind == 'new':
+                symbol = message['symbol']
+                if not isinstance(symbol, str) or not symbol:
+                    raise TypeError("Symbol must be a non-empty string")
+                if order_id in self.orders:
+                    raise ValueError(f"Order ID {order_id} is already in the book")
+                # Reserve the ID now so a cancel or modify pipelined behind it is routed too
+                self.orders[order_id] = (symbol, connection)
+            elif kind in ('cancel', 'modify'):
+                resting = self.orders.get(order_id)
+                if resting is None:
+                    raise ValueError(f"Order {order_id} not found")
+                symbol = resting[0]
+            else:
+                raise ValueError(f"Unknown message type {kind!r}")
+        except Exception as e:
+            # Malformed requests, including ones json parses but nothing else can, are rejected here
+            connection.send({'type': 'reject', 'id': order_id, 'reason': str(e)})
+            connection.flush()
+            connection.in_flight.release()
+            return
+        self._queue_for(symbol).put_nowait((message, connection))
+
+    async def _symbol_writer(self, symbol, queue):
+        """Apply the requests for one symbol in batches; the only code that touches its book."""
+        book = self.books[symbol]
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            touched = set()
+            for message, connection in batch:
+                # Any failure rejects this request only; the writer must keep serving the symbol
+                try:
+                    self._apply(book, symbol, message, connection)
+                except Exception as e:
+                    if not isinstance(e, (ValueError, KeyError, TypeError)):
+                        logging.exception(f"Gateway failed to apply {message!r} to {symbol}")
+                    connection.send({'type': 'reject', 'id': str(message.get('id')), 'reason': str(e)})
+                connection.in_flight.release()
+                touched.add(connection)
+
+            orders = self.orders
+            try:
+                fills = book.match_orders()
+            except Exception:
+                logging.exception(f"Gateway match pass failed for {symbol}")
+                fills = []
+            for buy_order, sell_order, quantity in fills:
+                for order in (buy_order, sell_order):
+                    owner = orders.get(order.order_id)
+                    if owner is None:
+                        continue
+                    connection = owner[1]
+                    connection.send({'type': 'fill', 'id': order.order_id, 'symbol': symbol,
+                                     'qty': quantity, 'price': sell_order.price, 'remaining': order.total_quantity})
+                    touched.add(connection)
+                    if not order.total_quantity:
+                        del orders[order.order_id]
+
+            # GTT orders expired at the start of the match pass
+            expired = self.expiries[symbol].expired
+            for order in expired:
+                owner = orders.pop(order.order_id, None)
+                if owner is not None:
+                    owner[1].send({'type': 'expired', 'id': order.order_id})
+                    touched.add(owner[1])
+            expired.clear()
+
+            for connection in touched:
+                connection.flush()
+
+    def _apply(self, book, symbol, message, connection):
+        kind = message['type']
+        order_id = str(message['id'])
+        if kind == 'new':
+            try:
+                stop_price = message.get('stop_price')
+                display_quantity = message.get('display_qty')
+                expire_at = message.get('expire_at')
+                order = Order(int(time.time() * 1000), order_id, symbol, _finite(message['price'], "Price"),
+                              _whole(message['qty'], "Quantity"), message['side'], message.get('order_type', 'limit'),
+                              None if stop_price is None else _finite(stop_price, "Stop price"),
+                              None if display_quantity is None else _whole(display_quantity, "Display quantity"),
+                              message.get('tif', 'gtc'),
+                              None if expire_at is None else _finite(expire_at, "Expiry time"))
+                book.add_order(order)
+            except Exception:
+                # Release the ID reserved by _dispatch, whatever went wrong
+                self.orders.pop(order_id, None)
+                raise
+            connection.send({'type': 'ack', 'id': order_id})
+        elif kind == 'cancel':
+            if self._owned_order(book, order_id, connection) is None:
+                raise ValueError(f"Order {order_id} not found")
+            book.cancel_order(order_id)
+            del self.orders[order_id]
+            connection.send({'type': 'cancelled', 'id': order_id})
+        else:
+            order = self._owned_order(book, order_id, connection)
+            if order is None:
+                raise ValueError(f"Order {order_id} not found")
+            # Check the new values before cancelling, so a rejected modify leaves the order resting
+            price = message.get('price')
+            quantity = message.get('qty')
+            price = None if price is None else _finite(price, "Price")
+            quantity = None if quantity is None else _whole(quantity, "Quantity")
+            if (price is not None and price <= 0) or (quantity is not None and quantity <= 0):
+                raise ValueError("Price and quantity must be greater than zero")
+            if order.time_in_force == 'gtt' and order.expire_at <= book.clock():
+                raise ValueError(f"Order {order_id} has expired")
+            # Cancel and replace, so the modified order goes to the back of its new level
+            book.cancel_order(order_id)
+            order.modify(price=price, quantity=quantity)
+            order.status = 'pending'
+            try:
+                book.add_order(order)
+            except Exception as e:
+                # The order is out of the book now; say so rather than reject, which would mean nothing changed
+                del self.orders[order_id]
+                connection.send({'type': 'cancelled', 'id': order_id, 'reason': str(e)})
+                return
+            connection.send({'type': 'modified', 'id': order_id})
+
+    def _owned_order(self, book, order_id, connection):
+        # The order may have filled, or belong to another client, since the request was routed
+        resting = self.orders.get(order_id)
+        if resting is None or resting[1] is not connection:
+            return None
+        return book.orders_by_id.get(order_id) or book.stops.orders_by_id.get(order_id)
+
+
+class GatewayClient:
+    def __init__(self, reader, writer):
+        """
+        Initialize a new GatewayClient object. Use GatewayClient.connect() to create one.
+
+        Args:
+            reader (asyncio.StreamReader): The connection's stream reader.
+            writer (asyncio.StreamWriter): The connection's stream writer.
+        """
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=9000):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    def _write(self, message):
+        self.writer.write(json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n')
+
+    def new_order(self, order_id, symbol, price, quantity, side, order_type='limit', stop_price=None,
+                  display_quantity=None):
+        message = {'type': 'new', 'id': order_id, 'symbol': symbol, 'price': price,
+                   'qty': quantity, 'side': side, 'order_type': order_type}
+        if stop_price is not None:
+            message['stop_price'] = stop_price
+        if display_quantity is not None:
+            message['display_qty'] = display_quantity
+        self._write(message)
+
+    def cancel(self, order_id):
+        self._write({'type': 'cancel', 'id': order_id})
+
+    def modify(self, order_id, price=None, quantity=None):
+        message = {'type': 'modify', 'id': order_id}
+        if price is not None:
+            message['price'] = price
+        if quantity is not None:
+            message['qty'] = quantity
+        self._write(message)
+
+    async def drain(self):
+        await self.writer.drain()
+
+    async def read_message(self):
+        """Return the next message from the gateway, or None once the connection is closed."""
+        line = await self.reader.readline()
+        return json.loads(line) if line else None
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the asyncio order-entry gateway.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--max-batch", type=int, default=512)
+    parser.add_argument("--max-in-flight", type=int, default=1024)
+    args = parser.parse_args()
+
+    logging.basicConfig(filename='gateway.log', level=logging.INFO, format='%(asctime)s %(message)s')
+    gateway = OrderGateway(args.host, args.port, args.max_batch, args.max_in_flight)
+    try:
+        asyncio.run(gateway.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
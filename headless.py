@@ -0,0 +1,223 @@
+"""
+This module is the headless entry point: it runs the matching engine without the GUI.
+
+It imports only the engine modules, so it starts in milliseconds and needs
+none of PyQt5, matplotlib, pandas, redis or bcrypt.
+
+Run the engine on generated orders (one book per symbol), optionally
+recording the event stream:
+
+    python headless.py run --orders 100000 --symbols AAPL MSFT --record events.csv
+
+Replay a recorded event stream:
+
+    python headless.py replay events.csv
+
+Event files are CSV with the columns in EVENT_COLUMNS. The action is "add"
+(all columns used; stop_price and display_quantity only for stop and iceberg
+orders, expire_at only for "gtt" orders, and these, time_in_force (default
+"gtc") and owner may be empty or absent), "cancel" (order_id and symbol
+used) or "match" (symbol used, or empty to match every book).
+"""
+
+import argparse
+import csv
+import logging
+import random
+import time
+
+from order import Order
+from order_book import OrderBook, generate_realistic_order
+from price_feed import PriceStore, RandomWalkFeed
+
+EVENT_COLUMNS = ["action", "timestamp", "order_id", "symbol", "price", "quantity", "side", "order_type", "stop_price",
+                 "display_quantity", "time_in_force", "expire_at", "owner"]
+
+
+class HeadlessEngine:
+    def __init__(self, instrumented=False, snapshot=None, tape=None):
+        """
+        Initialize a new HeadlessEngine object holding one OrderBook per symbol.
+
+        Args:
+            instrumented (bool, optional): Create the books with instrumentation. Defaults to False.
+            snapshot (str, optional): Prefix of shared memory segments to publish each book to,
+                named '<prefix>-<symbol>'. Defaults to None.
+            tape (str, optional): Directory to record every fill to as trade tape files. Defaults to None.
+        """
+        self.instrumented = instrumented
+        self.snapshot = snapshot
+        self.tape = tape
+        self.books = {}  # Symbol -> OrderBook
+        self.events = 0
+        self.fills = 0
+        self.rejected = 0
+
+    def book(self, symbol):
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook(instrumented=self.instrumented)
+            if self.snapshot:
+                book.enable_snapshot(f"{self.snapshot}-{symbol}")
+            if self.tape:
+                book.enable_trade_tape(self.tape)
+        return book
+
+    def add(self, order):
+        self.events += 1
+        try:
+            self.book(order.symbol).add_order(order)
+        except ValueError as e:
+            self.rejected += 1
+            logging.warning(f"Order {order.order_id} rejected: {e}")
+
+    def cancel(self, symbol, order_id):
+        self.events += 1
+        return self.book(symbol).cancel_order(order_id)
+
+    def match(self, symbol=None):
+        self.events += 1
+        books = [self.book(symbol)] if symbol else list(self.books.values())
+        for book in books:
+            self.fills += len(book.match_orders())
+
+    def apply(self, event):
+        """Apply one event given as a dictionary with the EVENT_COLUMNS keys."""
+        action = event["action"]
+        if action == "add":
+            stop_price = event.get("stop_price")
+            display_quantity = event.get("display_quantity")
+            expire_at = event.get("expire_at")
+            self.add(Order(int(event["timestamp"]), event["order_id"], event["symbol"], float(event["price"]),
+                           int(event["quantity"]), event["side"], event["order_type"] or "limit",
+                           float(stop_price) if stop_price else None,
+                           int(display_quantity) if display_quantity else None,
+                           event.get("time_in_force") or "gtc",
+                           float(expire_at) if expire_at else None,
+                           event.get("owner") or None))
+        elif action == "cancel":
+            self.cancel(event["symbol"], event["order_id"])
+        elif action == "match":
+            self.match(event["symbol"] or None)
+        else:
+            raise ValueError(f"Unknown event action {action!r}")
+
+    def summary(self):
+        """Return the event, fill and rejection counts and the resting orders and last price per symbol."""
+        return {
+            "events": self.events,
+            "fills": self.fills,
+            "rejected": self.rejected,
+            "books": {symbol: {"bids": len(book.bids), "asks": len(book.asks),
+                               "last_matched_price": book.last_matched_price}
+                      for symbol, book in self.books.items()},
+        }
+
+    def close(self):
+        for book in self.books.values():
+            book.disable_snapshot()
+            book.disable_trade_tape()
+
+
+def generate_events(symbols, orders, match_every, seed=None):
+    """
+    Generate an event stream of realistic orders with a match of every book after each match_every adds.
+
+    Orders are priced around a seeded random walk of reference prices that
+    takes one step per match, so a seed reproduces the same stream.
+
+    Yields:
+        dict: Events with the EVENT_COLUMNS keys.
+    """
+    if seed is not None:
+        random.seed(seed)
+    prices = PriceStore()
+    feed = RandomWalkFeed(symbols, seed=seed)
+    feed.poll(prices)
+    for index in range(1, orders + 1):
+        symbol = random.choice(symbols)
+        order = generate_realistic_order(str(index), symbol, prices.get(symbol))
+        yield {"action": "add", "timestamp": order.timestamp, "order_id": order.order_id, "symbol": symbol,
+               "price": round(order.price, 2), "quantity": order.quantity, "side": order.side,
+               "order_type": order.order_type, "stop_price": "", "display_quantity": "",
+               "time_in_force": order.time_in_force, "expire_at": order.expire_at or "", "owner": order.owner or ""}
+        if index % match_every == 0:
+            feed.poll(prices)
+            yield {"action": "match", "timestamp": order.timestamp, "order_id": "", "symbol": "",
+                   "price": "", "quantity": "", "side": "", "order_type": "", "stop_price": "",
+                   "display_quantity": "", "time_in_force": "", "expire_at": "", "owner": ""}
+
+
+def read_events(filename):
+    with open(filename, newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def run_events(engine, events, record=None):
+    """Apply a stream of events, optionally writing each one to a CSV file, and return the elapsed seconds."""
+    writer = None
+    f = None
+    if record:
+        f = open(record, "w", newline="")
+        writer = csv.DictWriter(f, fieldnames=EVENT_COLUMNS)
+        writer.writeheader()
+    try:
+        start = time.perf_counter()
+        for event in events:
+            if writer is not None:
+                writer.writerow(event)
+            engine.apply(event)
+        engine.match()
+        return time.perf_counter() - start
+    finally:
+        if f is not None:
+            f.close()
+
+
+def main(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--instrumented", action="store_true", help="Record and print latency statistics")
+    common.add_argument("--snapshot", help="Publish each book to shared memory segments named <prefix>-<symbol>")
+    common.add_argument("--tape", help="Record every fill to trade tape files in this directory")
+    common.add_argument("--log-level", default="WARNING", help="Level for order_book.log. Defaults to WARNING.")
+
+    parser = argparse.ArgumentParser(description="Run the order book engine without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", parents=[common], help="Run the engine on generated orders")
+    run_parser.add_argument("--orders", type=int, default=100000)
+    run_parser.add_argument("--symbols", nargs="+", default=['AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA'])
+    run_parser.add_argument("--match-every", type=int, default=10)
+    run_parser.add_argument("--seed", type=int)
+    run_parser.add_argument("--record", help="Write the generated events to this CSV file for replay")
+
+    replay_parser = commands.add_parser("replay", parents=[common], help="Replay a recorded CSV event stream")
+    replay_parser.add_argument("events", help="CSV file of events")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(filename='order_book.log', level=args.log_level.upper(), format='%(asctime)s %(message)s')
+
+    engine = HeadlessEngine(instrumented=args.instrumented, snapshot=args.snapshot, tape=args.tape)
+    try:
+        if args.command == "run":
+            events = generate_events(args.symbols, args.orders, args.match_every, args.seed)
+            elapsed = run_events(engine, events, args.record)
+        else:
+            elapsed = run_events(engine, read_events(args.events))
+
+        summary = engine.summary()
+        print(f"{summary['events']} events in {elapsed:.3f} s ({summary['events'] / elapsed:,.0f} events/s), "
+              f"{summary['fills']} fills, {summary['rejected']} rejected")
+        for symbol, book in summary["books"].items():
+            print(f"  {symbol:<8} bids={book['bids']:<8} asks={book['asks']:<8} "
+                  f"last={book['last_matched_price']}")
+            if args.instrumented:
+                for name, stats in engine.books[symbol].stats()["latency_ns"].items():
+                    if stats["count"]:
+                        print(f"    {name:<14} n={stats['count']:<8} p50={stats['p50']:>8} ns  p99={stats['p99']:>8} ns")
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
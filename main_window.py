@@ -2,55 +2,90 @@
 This module contains the main GUI class for the Order Book application.
 """
 
+import os
 import sys
 import random
 import time
-import threading
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QLabel, 
-    QPushButton, QWidget, QTreeWidget, QTreeWidgetItem, QLineEdit, 
-    QComboBox, QSpinBox, QMessageBox, QSplitter, QDialog, QToolBar, QAction
+    QPushButton, QWidget, QTreeView, QLineEdit, 
+    QComboBox, QSpinBox, QMessageBox, QSplitter, QToolBar, QAction, QInputDialog
 )
-from PyQt5.QtCore import Qt, QTimer, QMutex, QMutexLocker
+from PyQt5.QtCore import Qt, QTimer, QMutex, QMutexLocker, pyqtSignal
 
-# Import the Order and OrderBook classes from the order module
-from order import Order
+# Import the OrderBook class from the order_book module
 from order_book import OrderBook
+from risk import RiskManager
 
 # Import the functions for fetching current prices and generating realistic orders
 from order_book import fetch_current_prices, generate_realistic_order
+from price_feed import PriceStore, feed_from_env
 
 # Import the CustomOrderDialog class from the custom_order_dialog module
 from custom_order_dialog import CustomOrderDialog
+from mass_cancel_dialog import MassCancelDialog
+
+# Import the virtualized model behind the buy and sell order views
+from order_table_model import OrderTableModel
+
+# Import the user store and its persistent repository
+from auth import SELF_SERVICE_ROLES, UserStore
+from user_repository import SQLiteUserRepository
 
 # Import the logging module for debugging and error handling
 import logging
 
-# Import the redis module for accessing the Redis database
-import redis
-
 # Import the excel_exporter module for exporting data to Excel
 import excel_exporter
 
 # Create a logger for the main_window module
 logger = logging.getLogger(__name__)
 
-redis_client = redis.StrictRedis(host='localhost', port=6379, db=0)
+# Number of price levels per side drawn in the order distribution chart
+CHART_DEPTH_LEVELS = 50
+
+# Default cap on GUI refreshes per second, overridden by CLOB_GUI_FPS
+DEFAULT_MAX_FPS = 30
+
+# Upper bound of the quantity filter spin boxes
+MAX_FILTER_QUANTITY = 1_000_000_000
+
+# Redis client, created on first use so importing this module does not load redis or connect
+_redis_client = None
+
+
+def get_redis_client():
+    """Return the shared Redis client, importing redis and creating the client on first use."""
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.StrictRedis(host='localhost', port=6379, db=0)
+    return _redis_client
+
 
 class OrderBookGUI(QMainWindow):
+    # Emitted from a bcrypt worker thread with (username, future); delivered on the GUI thread
+    login_finished = pyqtSignal(str, object)
+
     def __init__(self):
         """
         Initialize the OrderBookGUI class.
 
         This constructor initializes the following attributes:
         - order_book: an instance of the OrderBook class
+        - risk_manager: the pre-trade risk checks applied to user orders and cancels
         - order_id_counter: a counter for generating unique order IDs
         - symbols: a list of financial symbols
-        - current_prices: a dictionary of current prices for the symbols
+        - price_store: the latest reference price of each symbol, used by the order generators and risk checks
+        - price_feed: the feed publishing reference prices, selected by CLOB_PRICE_FEED
         - mutex: a QMutex object for thread synchronization
+        - active_filter: the price and quantity bounds kept applied across refreshes, or None
+        - changes: the book's change counter, read to redraw only the slices that changed
+        - refreshed_count: the change count the widgets were last drawn at
+        - view_dirty: slices to redraw for reasons outside the book, such as a new symbol or reference price
+        - refresh_interval: the minimum seconds between refreshes, from CLOB_GUI_FPS
+        - user_store: the persistent user store, separate from the order book
+        - current_user: the logged-in user, or None
 
         It also sets up the user interface, starts the auto-update timer, and configures logging.
         """
@@ -59,25 +94,55 @@ class OrderBookGUI(QMainWindow):
         # Set the window title
         self.setWindowTitle("Order Book Ladder")
 
-        # Initialize the order book
-        self.order_book = OrderBook()
-
-        # Initialize the order ID counter
-        self.order_id_counter = 1
+        # Initialize the order book, with self-trade prevention when CLOB_STP names a mode
+        self.order_book = OrderBook(self_trade_prevention=os.environ.get("CLOB_STP") or None)
 
         # Initialize the list of financial symbols
         self.symbols = ['AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA']
 
-        # Fetch the current prices for the symbols
-        self.current_prices = fetch_current_prices(self.symbols)
+        # Start the reference price feed; symbols it has no tick for yet get a random starting price
+        self.price_store = PriceStore()
+        self.price_feed = feed_from_env(self.symbols)
+        self.price_feed.poll(self.price_store)
+        fetch_current_prices(self.symbols, self.price_store)
+
+        self.risk_manager = RiskManager(self.order_book, reference_prices=self.price_store)
+
+        # Publish the book to shared memory for monitoring processes when CLOB_SNAPSHOT names a segment
+        if os.environ.get("CLOB_SNAPSHOT"):
+            self.order_book.enable_snapshot(os.environ["CLOB_SNAPSHOT"])
+
+        # Record every fill to trade tape files when CLOB_TAPE names a directory
+        if os.environ.get("CLOB_TAPE"):
+            self.order_book.enable_trade_tape(os.environ["CLOB_TAPE"])
+
+        # Initialize the order ID counter
+        self.order_id_counter = 1
 
         # Initialize the mutex for thread synchronization
         self.mutex = QMutex()
 
+        # Initialize the live filter bounds (None while no filter is applied)
+        self.active_filter = None
+
+        # Track book changes so refreshes redraw only what changed, at most CLOB_GUI_FPS times a second
+        self.changes = self.order_book.track_changes()
+        self.refreshed_count = -1
+        self.view_dirty = set()
+        self.refresh_pending = False
+        self.last_refresh = 0.0
+        self.refresh_interval = 1 / max(float(os.environ.get("CLOB_GUI_FPS") or DEFAULT_MAX_FPS), 1)
+
+        # Initialize the user store (users load lazily from CLOB_USER_DB) and the logged-in user
+        self.user_store = UserStore(repository=SQLiteUserRepository.from_env())
+        self.current_user = None
+        self.session_token = None
+        self.login_finished.connect(self.on_login_finished)
+
         # Initialize the user interface
         self.init_ui()
 
-        # Start the auto-update timer
+        # Start polling for changes to refresh
         self.start_auto_update()
 
         # Configure logging
@@ -103,6 +168,20 @@ class OrderBookGUI(QMainWindow):
         # Create the toolbar and add it to the main layout
         self.create_toolbar()
 
+        # Create the header widgets: symbol selector, last price and the order ID used for cancels
+        self.symbol_input = QComboBox()
+        self.symbol_input.addItems(self.symbols)
+        self.symbol_input.currentTextChanged.connect(lambda _: self.mark_dirty("trades"))
+        self.price_label = QLabel("")
+        self.order_id_input = QLineEdit()
+        self.order_id_input.setPlaceholderText("Order ID to cancel")
+
+        # Create the session price labels shown below the order views
+        self.low_label = QLabel("Low: N/A")
+        self.high_label = QLabel("High: N/A")
+        self.open_label = QLabel("Open: N/A")
+        self.prev_close_label = QLabel("Prev Close: N/A")
+
         # Create the header layout
         self.header_layout = QHBoxLayout()
         main_layout.addLayout(self.header_layout)
@@ -120,13 +199,13 @@ class OrderBookGUI(QMainWindow):
         main_layout.addLayout(self.bottom_layout)
 
         # Create the filter layout and add it to the main layout
-        self.create_filter_layout()
+        self.create_filter_layout(main_layout)
 
         # Create the statistics layout and add it to the main layout
-        self.create_statistics_layout()
+        self.create_statistics_layout(main_layout)
 
         # Create the chart layout and add it to the main layout
-        self.create_chart_layout()
+        self.create_chart_layout(main_layout)
 
         # Create the status label and add it to the main layout
         self.status_label = QLabel("")
@@ -137,6 +216,7 @@ class OrderBookGUI(QMainWindow):
         self.header_layout.addWidget(QLabel("Symbol"))
         self.header_layout.addWidget(self.symbol_input)
         self.header_layout.addWidget(self.price_label)
+        self.header_layout.addWidget(self.order_id_input)
 
         self.bottom_layout.addWidget(self.low_label)
         self.bottom_layout.addWidget(self.high_label)
@@ -164,6 +244,26 @@ class OrderBookGUI(QMainWindow):
         match_orders_action.triggered.connect(self.match_orders)
         toolbar.addAction(match_orders_action)
 
+        # Add a call auction action that uncrosses the book at one clearing price
+        run_auction_action = QAction("Run Auction", self)
+        run_auction_action.triggered.connect(self.run_auction)
+        toolbar.addAction(run_auction_action)
+
+        # Add an action cancelling every open order of the logged-in user
+        cancel_my_orders_action = QAction("Cancel My Orders", self)
+        cancel_my_orders_action.triggered.connect(self.cancel_my_orders)
+        toolbar.addAction(cancel_my_orders_action)
+
+        # Add a mass cancel action filtering by symbol, side, owner and price band
+        mass_cancel_action = QAction("Mass Cancel", self)
+        mass_cancel_action.triggered.connect(self.mass_cancel)
+        toolbar.addAction(mass_cancel_action)
+
+        # Add an end session action that expires every day order at once
+        end_session_action = QAction("End Session", self)
+        end_session_action.triggered.connect(self.end_session)
+        toolbar.addAction(end_session_action)
+
         # Add a cancel order action
         cancel_order_action = QAction("Cancel Order", self)
         cancel_order_action.triggered.connect(self.cancel_order)
@@ -179,10 +279,136 @@ class OrderBookGUI(QMainWindow):
         add_custom_order_action.triggered.connect(self.open_custom_order_dialog)
         toolbar.addAction(add_custom_order_action)
 
+        # Add a login action
+        login_action = QAction("Login", self)
+        login_action.triggered.connect(self.open_login_dialog)
+        toolbar.addAction(login_action)
+
+        # Add a register action that creates a user and logs them in
+        register_action = QAction("Register", self)
+        register_action.triggered.connect(self.open_register_dialog)
+        toolbar.addAction(register_action)
+
+        # Add a checkable profiling action, already checked if CLOB_PROFILE started a session
+        self.profiling_action = QAction("Profiling", self)
+        self.profiling_action.setCheckable(True)
+        self.profiling_action.setChecked(self.order_book.is_profiling())
+        self.profiling_action.toggled.connect(self.toggle_profiling)
+        toolbar.addAction(self.profiling_action)
+
+    def open_login_dialog(self):
+        """
+        Ask for a username and password and verify them without blocking the GUI.
+
+        The bcrypt check runs on the user store's worker pool; its result comes
+        back through the login_finished signal, so the event loop and the
+        auto-update timer keep running while the login is verified.
+        """
+        username, ok = QInputDialog.getText(self, "Login", "Username:")
+        if not ok or not username:
+            return
+        password, ok = QInputDialog.getText(self, "Login", "Password:", QLineEdit.Password)
+        if not ok:
+            return
+        self.status_label.setText(f"Logging in {username}...")
+        future = self.user_store.login_async(username, password)
+        future.add_done_callback(lambda done: self.login_finished.emit(username, done))
+
+    def open_register_dialog(self):
+        """
+        Ask for a username, password and role, register the user and log them in without blocking the GUI.
+
+        Only the self-service roles (trader or viewer) can be chosen; admins
+        are created with "python auth.py add-user NAME --role admin" or
+        promoted by another admin. Hashing and the login run on the user
+        store's worker pool; the result comes back through the login_finished
+        signal like a normal login.
+        """
+        username, ok = QInputDialog.getText(self, "Register", "Username:")
+        if not ok or not username:
+            return
+        password, ok = QInputDialog.getText(self, "Register", "Password:", QLineEdit.Password)
+        if not ok:
+            return
+        role, ok = QInputDialog.getItem(self, "Register", "Role:", list(SELF_SERVICE_ROLES), 0, False)
+        if not ok:
+            return
+        try:
+            # The username is reserved before this returns, so a taken name is rejected here
+            future = self.user_store.register_async(username, password, role)
+        except ValueError as e:
+            self.show_error("Failed to register", str(e))
+            return
+        self.status_label.setText(f"Registering {username}...")
+
+        def registered(done):
+            # Runs on the worker pool; a failed registration is reported by on_login_finished
+            if done.exception() is not None:
+                self.login_finished.emit(username, done)
+                return
+            login = self.user_store.login_async(username, password)
+            login.add_done_callback(lambda finished: self.login_finished.emit(username, finished))
+
+        future.add_done_callback(registered)
+
+    def on_login_finished(self, username, future):
+        """
+        Handle the result of a login started by open_login_dialog.
+
+        Args:
+            username (str): The username that was checked.
+            future (concurrent.futures.Future): The finished login, resolving to a session token or None.
+        """
+        try:
+            token = future.result()
+            if token is None:
+                self.status_label.setText("Login failed")
+                self.show_error("Login failed", f"Invalid username or password for {username}")
+                return
+            self.session_token = token
+            self.current_user = self.user_store.validate_session(token)
+            self.status_label.setText(f"Logged in as {username} ({self.current_user.role})")
+        except Exception as e:
+            self.show_error("Failed to log in", str(e))
+            logging.error(f"Failed to log in: {e}")
+
+    def toggle_profiling(self, checked):
+        """
+        Start or stop a profiling session on the order book.
+
+        While a session runs, matching, GUI refreshes and Excel exports are
+        profiled. When it is stopped, a memory snapshot is taken if memory
+        tracing was enabled and the written files are listed in a message box.
+
+        Args:
+            checked (bool): Whether the profiling action is now checked.
+        """
+        try:
+            if checked:
+                if not self.order_book.is_profiling():
+                    self.order_book.start_profiling()
+                self.status_label.setText("Profiling started")
+            else:
+                written = []
+                if self.order_book.profiler.trace_memory:
+                    written.append(self.order_book.snapshot_memory())
+                written.extend(self.order_book.stop_profiling())
+                QMessageBox.information(self, "Profiling", "Profile written to:\n" + "\n".join(written))
+        except Exception as e:
+            self.show_error("Failed to toggle profiling", str(e))
+            logging.error(f"Failed to toggle profiling: {e}")
+
     def create_treeview(self, label):
-        tree = QTreeWidget()
-        tree.setColumnCount(4)  # Add an extra column for execution time
-        tree.setHeaderLabels([label, "Orders", "Qty", "Exec Time"])
+        """
+        Create a tree view for one side of the book backed by an OrderTableModel.
+
+        Uniform row heights let the view lay out and scroll without asking the
+        model for rows it does not paint.
+        """
+        tree = QTreeView()
+        tree.setRootIsDecorated(False)
+        tree.setUniformRowHeights(True)
+        tree.setModel(OrderTableModel(label))
         return tree
 
     def create_filter_layout(self, layout):
@@ -200,6 +426,9 @@ class OrderBookGUI(QMainWindow):
         self.max_price_input = QLineEdit()
         self.min_qty_input = QSpinBox()
         self.max_qty_input = QSpinBox()
+        self.min_qty_input.setRange(0, MAX_FILTER_QUANTITY)
+        self.max_qty_input.setRange(0, MAX_FILTER_QUANTITY)
+        self.max_qty_input.setValue(MAX_FILTER_QUANTITY)
         
         # Add labels and input fields to the filter layout
         filter_layout.addWidget(QLabel("Min Price"))
@@ -215,6 +444,11 @@ class OrderBookGUI(QMainWindow):
         apply_filter_button = QPushButton("Apply Filter")
         apply_filter_button.clicked.connect(self.apply_filter)
         filter_layout.addWidget(apply_filter_button)
+
+        # Create a button to clear the live filter
+        clear_filter_button = QPushButton("Clear Filter")
+        clear_filter_button.clicked.connect(self.clear_filter)
+        filter_layout.addWidget(clear_filter_button)
         
         # Add the filter layout to the main layout
         layout.addLayout(filter_layout)
@@ -255,6 +489,10 @@ class OrderBookGUI(QMainWindow):
         Args:
             layout (QVBoxLayout): The layout to add the chart layout to.
         """
+        # matplotlib is imported when the window is built, not when this module is imported
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+
         # Create a figure and axes for the chart
         self.fig, self.ax = plt.subplots()  # Create a figure and axes
         
@@ -269,11 +507,15 @@ class OrderBookGUI(QMainWindow):
         Adds either one buy and one sell order or a random order to the order book.
         """
         try:
+            # Advance the reference prices, which moves the price label's change
+            self.price_feed.poll(self.price_store)
+            self.view_dirty.add("trades")
+
             # Decide whether to add one buy and one sell order or a random order
             if random.random() <= 0.9:
                 # Generate one buy and one sell order
                 symbol = self.symbol_input.currentText()  # Get the selected symbol
-                current_price = self.current_prices[symbol]
+                current_price = self.price_store.get(symbol)
 
                 # Generate a buy order
                 buy_order = generate_realistic_order(f'{self.order_id_counter}', symbol, current_price)
@@ -295,7 +537,7 @@ class OrderBookGUI(QMainWindow):
                 self.order_id_counter += 1
                 logging.info(f"Random order added: {order}")
 
-            self.update_gui()
+            self.schedule_refresh()
         except Exception as e:
             # Handle any exceptions that occur during the order addition process
             self.show_error("Failed to add random order", str(e))
@@ -307,7 +549,7 @@ class OrderBookGUI(QMainWindow):
 
         This method attempts to cancel an order by calling the `cancel_order` method of the `order_book` object with the provided order ID. If the cancellation is successful, a message box is displayed with the result. The result is also logged using the `logging` module.
 
-        After the order is successfully cancelled, the corresponding order entry is deleted from the Redis database using the `redis_client.delete` method. Finally, the GUI is updated by calling the `update_gui` method.
+        After the order is successfully cancelled, the corresponding order entry is deleted from the Redis database using the client returned by `get_redis_client()`. Finally, a GUI refresh is scheduled by calling the `schedule_refresh` method.
 
         If any exception occurs during the cancellation process, an error message box is displayed with the error message. The error is also logged using the `logging` module.
 
@@ -321,8 +563,8 @@ class OrderBookGUI(QMainWindow):
             # Get the order ID from the input field
             order_id = self.order_id_input.text()
 
-            # Call the `cancel_order` method of the `order_book` object with the order ID
-            result = self.order_book.cancel_order(order_id)
+            # Cancel through the risk manager, which checks the user may cancel this order
+            result = self.risk_manager.cancel_order(order_id, self.current_user)
 
             # Display a message box with the result
             QMessageBox.information(self, "Cancel Order", result)
@@ -331,10 +573,10 @@ class OrderBookGUI(QMainWindow):
             logging.info(result)
 
             # Delete the corresponding order entry from the Redis database
-            redis_client.delete(f"order:{order_id}")
+            get_redis_client().delete(f"order:{order_id}")
 
             # Update the GUI
-            self.update_gui()
+            self.schedule_refresh()
         except Exception as e:
             # Display an error message box with the error message
             self.show_error("Failed to cancel order", str(e))
@@ -342,6 +584,27 @@ class OrderBookGUI(QMainWindow):
             # Log the error
             logging.error(f"Failed to cancel order: {e}")
 
+    def cancel_my_orders(self):
+        """
+        Cancel every open order of the logged-in user in one bulk operation and update the GUI.
+        """
+        try:
+            cancelled = self.risk_manager.cancel_all(self.current_user)
+            QMessageBox.information(self, "Cancel My Orders", f"{cancelled} orders cancelled.")
+            self.schedule_refresh()
+        except Exception as e:
+            self.show_error("Failed to cancel orders", str(e))
+            logging.error(f"Failed to cancel orders: {e}")
+
+    def mass_cancel(self):
+        """
+        Open the mass cancel dialog, then report how many orders it cancelled and update the GUI.
+        """
+        dialog = MassCancelDialog(self.risk_manager, self.symbols, self.current_user)
+        if dialog.exec_():
+            QMessageBox.information(self, "Mass Cancel", f"{dialog.cancelled} orders cancelled.")
+        self.schedule_refresh()
+
     def match_orders(self):
         """
         Match orders in the order book and update the GUI.
@@ -368,70 +631,112 @@ class OrderBookGUI(QMainWindow):
                     logging.info(f"Matched {qty} units between buy order {buy.order_id} and sell order {sell.order_id}")
 
             # Update the GUI
-            self.update_gui()
+            self.schedule_refresh()
         except Exception as e:
             # Handle any exceptions that occur during the order matching process
             self.show_error("Failed to match orders", str(e))
             logging.error(f"Failed to match orders: {e}")
 
+    def run_auction(self):
+        """
+        Uncross the order book in one call auction and update the GUI.
+
+        Every crossing order trades at a single clearing price that maximizes
+        the executed volume; see OrderBook.run_auction().
+        """
+        try:
+            matched = self.order_book.run_auction()
+            if not matched:
+                logging.info("Auction: book not crossed, nothing executed.")
+            else:
+                volume = sum(qty for _, _, qty in matched)
+                logging.info(f"Auction executed {volume} units at {self.order_book.last_matched_price} "
+                             f"in {len(matched)} fills")
+            self.schedule_refresh()
+        except Exception as e:
+            self.show_error("Failed to run auction", str(e))
+            logging.error(f"Failed to run auction: {e}")
+
+    def end_session(self):
+        """
+        Expire every resting day order in one bulk operation and update the GUI.
+        """
+        try:
+            expired = self.order_book.end_session()
+            logging.info(f"Session ended, {expired} day orders expired")
+            self.schedule_refresh()
+        except Exception as e:
+            self.show_error("Failed to end session", str(e))
+            logging.error(f"Failed to end session: {e}")
+
     def open_custom_order_dialog(self):
         """
         Open the custom order dialog and update the GUI.
 
         This function creates a new instance of the CustomOrderDialog class
-        using the current order book and symbol list. It then displays the
+        using the risk manager, the logged-in user and the symbol list, so
+        custom orders pass the pre-trade risk checks. It then displays the
         dialog and updates the GUI after the dialog is closed.
 
         Raises:
             Exception: If there is an error creating the dialog or updating the GUI.
         """
         # Create a new instance of the CustomOrderDialog class
-        dialog = CustomOrderDialog(self.order_book, self.symbols)
+        dialog = CustomOrderDialog(self.order_book, self.symbols, self.risk_manager, self.current_user)
 
         # Display the dialog and wait for it to be closed
         dialog.exec_()
 
         # Update the GUI after the dialog is closed
-        self.update_gui()
+        self.schedule_refresh()
 
     def apply_filter(self):
         """
         Apply the filter to the buy and sell orders in the order book and update the GUI.
 
-        This function retrieves the minimum and maximum price and quantity values from the input fields.
-        It then filters the buy and sell orders in the order book based on the price and quantity ranges.
-        The filtered orders are stored in separate lists and used to update the buy and sell trees in the GUI.
+        This function retrieves the minimum and maximum price and quantity values from the input fields;
+        an empty price field means no bound. The bounds are kept as the live filter, so every later
+        refresh shows the filtered orders until the filter is cleared. The filtering itself is done
+        by OrderBook.filter_orders, which uses the book's price levels and quantity index instead of
+        scanning every order.
 
         Raises:
             Exception: If there is an error retrieving the input values or applying the filter.
         """
         try:
             # Retrieve the minimum and maximum price values from the input fields
-            min_price = float(self.min_price_input.text())
-            max_price = float(self.max_price_input.text())
+            min_price_text = self.min_price_input.text().strip()
+            max_price_text = self.max_price_input.text().strip()
+            min_price = float(min_price_text) if min_price_text else None
+            max_price = float(max_price_text) if max_price_text else None
 
             # Retrieve the minimum and maximum quantity values from the input fields
             min_qty = self.min_qty_input.value()
             max_qty = self.max_qty_input.value()
 
-            # Filter the buy orders based on the price and quantity ranges
-            filtered_buy_orders = [order for _, _, order in self.order_book.buy_orders
-                                   if min_price <= order.price <= max_price and min_qty <= order.quantity <= max_qty]
-
-            # Filter the sell orders based on the price and quantity ranges
-            filtered_sell_orders = [order for _, _, order in self.order_book.sell_orders
-                                    if min_price <= order.price <= max_price and min_qty <= order.quantity <= max_qty]
-
-            # Update the buy tree with the filtered buy orders
-            self.update_tree(self.buy_tree, filtered_buy_orders)
-
-            # Update the sell tree with the filtered sell orders
-            self.update_tree(self.sell_tree, filtered_sell_orders)
+            # Keep the bounds applied across refreshes
+            self.active_filter = {
+                "min_price": min_price,
+                "max_price": max_price,
+                "min_quantity": min_qty,
+                "max_quantity": max_qty,
+            }
+
+            # Update the buy and sell trees with the filtered orders
+            self.update_tree(self.buy_tree, "buy")
+            self.update_tree(self.sell_tree, "sell")
+            self.status_label.setText("Filter applied")
         except Exception as e:
             # Handle any exceptions that occur during the filter application process
             self.show_error("Failed to apply filter", str(e))
             logging.error(f"Failed to apply filter: {e}")
 
+    def clear_filter(self):
+        """Clear the live filter and show the whole book again."""
+        self.active_filter = None
+        self.update_tree(self.buy_tree, "buy")
+        self.update_tree(self.sell_tree, "sell")
+
     def export_to_excel(self):
         """
         Export the matched orders to an Excel file.
@@ -449,7 +754,8 @@ class OrderBookGUI(QMainWindow):
             matched_orders = self.order_book.get_order_history()
 
             # Export the matched orders to an Excel file
-            result = excel_exporter.export_orders_to_excel(matched_orders)
+            with self.order_book.profiler.section("export"):
+                result = excel_exporter.export_orders_to_excel(matched_orders)
 
             # Display a success message with the result
             QMessageBox.information(self, "Export to Excel", result)
@@ -472,70 +778,118 @@ class OrderBookGUI(QMainWindow):
         # Get the selected symbol
         symbol = self.symbol_input.currentText()
 
-        # Get the current price for the selected symbol
-        current_price = self.current_prices[symbol]
+        # Get the reference price for the selected symbol
+        current_price = self.price_store.get(symbol)
 
         # Generate a random order with a new order ID
         return generate_realistic_order(f'{self.order_id_counter}', symbol, current_price)
 
+    def mark_dirty(self, *slices):
+        """
+        Mark slices of the view to redraw for a reason the book does not know about and schedule a refresh.
+
+        Args:
+            *slices (str): Names from BookChanges.SLICES: "levels", "stats" or "trades".
+        """
+        self.view_dirty.update(slices)
+        self.schedule_refresh()
+
+    def schedule_refresh(self):
+        """
+        Schedule one refresh on the next frame if the book or the view changed since the last one.
+
+        Any number of calls before the refresh runs share it, and the refresh is
+        delayed so refreshes run at most CLOB_GUI_FPS times a second.
+        """
+        if self.refresh_pending:
+            return
+        if self.changes.change_count == self.refreshed_count and not self.view_dirty:
+            return
+        self.refresh_pending = True
+        wait = self.last_refresh + self.refresh_interval - time.monotonic()
+        QTimer.singleShot(max(int(wait * 1000), 0), self.update_gui)
+
     def update_gui(self):
         """
         Update the GUI with the current state of the order book.
 
         This function acquires a lock on the GUI mutex to ensure that no other
-        thread is modifying the GUI at the same time. It then retrieves the
-        current state of the order book using the `get_order_book` method of
-        the `OrderBook` class. It updates the buy and sell trees with the
-        current state of the buy and sell orders. It also updates the stock
-        information, statistics, and chart. Finally, it sets the status label
-        to indicate that the GUI has been updated successfully.
+        thread is modifying the GUI at the same time. It then asks the book's
+        change counter which slices changed since the last refresh and redraws
+        only their widgets: the buy and sell trees and the chart for "levels",
+        the statistics for "stats" and the price label for "trades". Finally,
+        it sets the status label to indicate that the GUI has been updated
+        successfully.
 
         If any exception occurs during this process, it displays an error
         message and logs the details of the exception.
         """
+        self.refresh_pending = False
+        self.last_refresh = time.monotonic()
         try:
             # Acquire the GUI mutex lock to ensure exclusive access to the GUI
-            with QMutexLocker(self.mutex):
-                # Retrieve the current state of the order book
-                order_book_state = self.order_book.get_order_book()
-
-                # Update the buy tree with the current state of the buy orders
-                self.update_tree(self.buy_tree, order_book_state['buy_orders'])
-                # Update the sell tree with the current state of the sell orders
-                self.update_tree(self.sell_tree, order_book_state['sell_orders'])
-
-                # Update the stock information
-                self.update_stock_info()
-                # Update the statistics
-                self.update_statistics()
-                # Update the chart
-                self.update_chart()
+            with QMutexLocker(self.mutex), self.order_book.profiler.section("gui_refresh"):
+                # Collect the slices changed in the book since the last refresh and those marked by the view
+                change_count = self.changes.change_count
+                dirty = self.changes.dirty(self.refreshed_count) | self.view_dirty
+                book_changed = change_count != self.refreshed_count
+                self.refreshed_count = change_count
+                self.view_dirty = set()
+
+                if "levels" in dirty:
+                    # Point the buy and sell trees at the book; they fetch only the rows they paint
+                    self.update_tree(self.buy_tree, "buy")
+                    self.update_tree(self.sell_tree, "sell")
+                    # Update the chart
+                    self.update_chart()
+                if "stats" in dirty:
+                    # Update the statistics
+                    self.update_statistics()
+                if "trades" in dirty:
+                    # Update the stock information
+                    self.update_stock_info()
+
+                if book_changed:
+                    # Publish adds and cancels since the last match to any snapshot readers
+                    self.order_book.publish_snapshot()
 
                 # Set the status label to indicate GUI update success
                 self.status_label.setText("Order Book Updated")
                 # Log a success message
-                logging.info("GUI updated successfully")
+                logging.info(f"GUI updated: {', '.join(sorted(dirty)) or 'nothing'} changed")
         except Exception as e:
             # Display an error message if any exception occurs
             self.show_error("Failed to update GUI", str(e))
             # Log the details of the exception
             logging.error(f"Failed to update GUI: {e}")
 
-    def update_tree(self, tree, orders):
-        tree.clear()
-        for order in orders:
-            item = QTreeWidgetItem([str(order.price), str(len(orders)), str(order.quantity), f"{order.execution_time:.4f} s" if order.execution_time else "N/A"])
-            tree.addTopLevelItem(item)
+    def update_tree(self, tree, side):
+        """
+        Show one side of the order book in a tree view.
+
+        With a live filter applied, only the orders inside its bounds are shown.
+
+        Args:
+            tree (QTreeView): The tree view to update.
+            side (str): The side of the book to show ("buy" or "sell").
+        """
+        if self.active_filter is not None:
+            tree.model().set_orders(self.order_book.filter_orders(side, **self.active_filter))
+            return
+        tree.model().set_source(
+            self.order_book.count_orders(side),
+            lambda start, limit: list(self.order_book.iter_orders(side, start, limit))
+        )
 
     def update_stock_info(self):
         """
         Update the stock information on the GUI.
 
-        This function retrieves the last matched price from the order book and calculates the current price,
-        price change, and percentage change compared to the current price for the selected symbol. It then
-        updates the GUI label with the current price and its change information. The label color is set
-        to green if the price change is positive and red if it is negative. Finally, it updates the current
-        price for the selected symbol in the `self.current_prices` dictionary.
+        This function retrieves the last matched price from the order book and calculates the price
+        change and percentage change compared to the reference price of the selected symbol. It then
+        updates the GUI label with the last price and its change information. The label color is set
+        to green if the price change is positive and red if it is negative. The reference price comes
+        from the price feed and is not overwritten by matches.
         """
         # Check if last matched price is available
         if self.order_book.last_matched_price is not None:
@@ -545,36 +899,30 @@ class OrderBookGUI(QMainWindow):
             # Calculate the current price as the last matched price
             current_price = last_price
             
-            # Calculate the price change and percentage change
-            price_change = current_price - self.current_prices[self.symbol_input.currentText()]
-            percent_change = (price_change / self.current_prices[self.symbol_input.currentText()]) * 100
+            # Calculate the price change and percentage change against the reference price
+            reference_price = self.price_store.get(self.symbol_input.currentText())
+            price_change = current_price - reference_price
+            percent_change = (price_change / reference_price) * 100
             
             # Update the GUI label with the current price and its change information
             self.price_label.setText(f"{current_price:.2f}  {price_change:.2f} ({percent_change:.2f}%)")
             self.price_label.setStyleSheet("color: green;" if price_change >= 0 else "color: red;")
-            
-            # Update the current price for the selected symbol
-            self.current_prices[self.symbol_input.currentText()] = current_price
 
     def update_statistics(self):
         """
         Update the statistics on the GUI.
 
-        This function calculates the total number of buy and sell orders, the average buy price,
-        and the average sell price. It then updates the GUI labels with the corresponding values.
+        This function reads the total number of buy and sell orders, the average buy price,
+        and the average sell price, which the book keeps up to date as orders come and go.
+        It then updates the GUI labels with the corresponding values.
         """
-        # Calculate the total number of buy and sell orders
-        buy_orders = [order for _, _, order in self.order_book.buy_orders]
-        sell_orders = [order for _, _, order in self.order_book.sell_orders]
+        # Read the total number of buy and sell orders
+        total_buy_orders = len(self.order_book.bids)
+        total_sell_orders = len(self.order_book.asks)
 
-        total_buy_orders = len(buy_orders)
-        total_sell_orders = len(sell_orders)
-
-        # Calculate the average buy price and average sell price
-        avg_buy_price = (sum(order.price for order in buy_orders) / total_buy_orders
-                         if total_buy_orders else 0)
-        avg_sell_price = (sum(order.price for order in sell_orders) / total_sell_orders
-                          if total_sell_orders else 0)
+        # Read the average buy price and average sell price
+        avg_buy_price = self.order_book.bids.average_price()
+        avg_sell_price = self.order_book.asks.average_price()
 
         # Update the GUI labels with the corresponding values
         self.total_buy_orders_label.setText(str(total_buy_orders))
@@ -584,22 +932,22 @@ class OrderBookGUI(QMainWindow):
 
     def update_chart(self):
         """
-        Update the chart on the GUI with the latest buy and sell orders.
+        Update the chart on the GUI with the best buy and sell price levels.
 
-        This function retrieves the latest buy and sell orders from the order book,
-        extracts the prices and quantities of each order, and plots them on the chart.
-        If any error occurs during the process, an error message is displayed and logged.
+        This function retrieves the aggregated depth of the best CHART_DEPTH_LEVELS
+        levels on each side, extracts their prices and total quantities, and plots
+        them on the chart. If any error occurs during the process, an error message
+        is displayed and logged.
         """
         try:
-            # Retrieve the latest buy and sell orders from the order book
-            buy_orders = [order for _, _, order in self.order_book.buy_orders]
-            sell_orders = [order for _, _, order in self.order_book.sell_orders]
+            # Retrieve the best buy and sell levels from the order book
+            depth = self.order_book.get_depth(levels=CHART_DEPTH_LEVELS)
 
-            # Extract the prices and quantities of each order
-            buy_prices = [order.price for order in buy_orders]
-            buy_quantities = [order.quantity for order in buy_orders]
-            sell_prices = [order.price for order in sell_orders]
-            sell_quantities = [order.quantity for order in sell_orders]
+            # Extract the prices and total quantities of each level
+            buy_prices = [price for price, _, _ in depth["bids"]]
+            buy_quantities = [quantity for _, quantity, _ in depth["bids"]]
+            sell_prices = [price for price, _, _ in depth["asks"]]
+            sell_quantities = [quantity for _, quantity, _ in depth["asks"]]
 
             # Plot the buy and sell orders on the chart
             self.plot_orders(buy_prices, buy_quantities, sell_prices, sell_quantities)
@@ -644,22 +992,34 @@ class OrderBookGUI(QMainWindow):
         """
         Start the auto-update timer.
 
-        This function creates a QTimer object and connects its timeout signal to
-        the update_gui method. The timer is set to update the GUI every 5
-        seconds.
+        This function creates a QTimer object that fires once per frame at the
+        CLOB_GUI_FPS cap. Each tick expires GTT orders that have run out and
+        schedules a refresh, which does nothing unless the book or the view
+        changed, so an idle book is never redrawn.
         """
         # Create a QTimer object
         timer = QTimer(self)
 
-        # Connect the timeout signal of the timer to the update_gui method
-        timer.timeout.connect(self.update_gui)
+        # Connect the timeout signal of the timer to the change poll
+        timer.timeout.connect(self.poll_changes)
+
+        # Start the timer with one tick per frame
+        timer.start(max(int(self.refresh_interval * 1000), 1))
 
-        # Start the timer with a timeout interval of 5000 milliseconds (5 seconds)
-        timer.start(5000)
+    def poll_changes(self):
+        """Expire GTT orders whose time has passed and refresh if anything changed."""
+        self.order_book.expire_orders()
+        self.schedule_refresh()
 
     def show_error(self, title, message):
         QMessageBox.critical(self, title, message)
 
+    def closeEvent(self, event):
+        # Remove the shared memory snapshot segment, if one was published, and close the trade tape
+        self.order_book.disable_snapshot()
+        self.order_book.disable_trade_tape()
+        super().closeEvent(event)
+
 # If this script is run directly (i.e., not imported as a module), create a
 # QApplication object and instantiate the OrderBookGUI class.
 # 
@@ -0,0 +1,83 @@
+import logging
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QComboBox, QPushButton, QMessageBox
+
+ANY = "Any"  # Combo box entry meaning the filter is not applied
+
+
+class MassCancelDialog(QDialog):
+    def __init__(self, risk_manager, symbol_list, user=None):
+        """
+        Initializes a new instance of the MassCancelDialog class.
+
+        Args:
+            risk_manager (RiskManager): Cancels the orders after checking the user may cancel them.
+            symbol_list (list): The list of symbols.
+            user (User, optional): The logged-in user cancelling the orders. Defaults to None.
+        """
+        super().__init__()
+
+        self.risk_manager = risk_manager
+        self.symbol_list = symbol_list
+        self.user = user
+        self.cancelled = 0  # Orders cancelled by the last mass cancel
+
+        self.init_ui()
+
+    def init_ui(self):
+        """
+        Initializes the user interface for the mass cancel dialog.
+        """
+        self.setWindowTitle("Mass Cancel")
+        layout = QVBoxLayout()
+        form_layout = QHBoxLayout()
+
+        # Every filter left empty or at "Any" is not applied
+        self.symbol_input = QComboBox()
+        self.symbol_input.addItems([ANY] + list(self.symbol_list))
+        self.side_input = QComboBox()
+        self.side_input.addItems([ANY, "buy", "sell"])
+        self.owner_input = QLineEdit()  # Defaults to the logged-in user
+        if self.user is not None:
+            self.owner_input.setText(self.user.username)
+        self.min_price_input = QLineEdit()
+        self.max_price_input = QLineEdit()
+
+        form_layout.addWidget(QLabel("Symbol"))
+        form_layout.addWidget(self.symbol_input)
+        form_layout.addWidget(QLabel("Side"))
+        form_layout.addWidget(self.side_input)
+        form_layout.addWidget(QLabel("Owner"))
+        form_layout.addWidget(self.owner_input)
+        form_layout.addWidget(QLabel("Min Price"))
+        form_layout.addWidget(self.min_price_input)
+        form_layout.addWidget(QLabel("Max Price"))
+        form_layout.addWidget(self.max_price_input)
+
+        cancel_button = QPushButton("Cancel Orders")
+        cancel_button.clicked.connect(self.mass_cancel)
+        form_layout.addWidget(cancel_button)
+
+        layout.addLayout(form_layout)
+        self.setLayout(layout)
+
+    def mass_cancel(self):
+        """
+        Cancels every order matching the filters and closes the dialog, or shows why it failed.
+        """
+        try:
+            symbol = self.symbol_input.currentText()
+            side = self.side_input.currentText()
+            self.cancelled = self.risk_manager.mass_cancel(
+                self.user,
+                symbol=None if symbol == ANY else symbol,
+                side=None if side == ANY else side,
+                owner=self.owner_input.text().strip() or None,
+                min_price=float(self.min_price_input.text()) if self.min_price_input.text() else None,
+                max_price=float(self.max_price_input.text()) if self.max_price_input.text() else None
+            )
+            self.accept()
+
+        except ValueError as e:
+            # Invalid prices and risk rejections are both ValueErrors
+            logging.error(f"Mass cancel rejected: {e}")
+            QMessageBox.critical(self, "Error", f"Mass cancel rejected: {e}")
@@ -0,0 +1,196 @@
+"""
+This module contains the latency instrumentation used by the OrderBook class.
+
+Timings are taken with time.perf_counter_ns() and recorded into HDR-style
+log-linear histograms, so recording a sample is a handful of integer
+operations and a list increment regardless of how many samples were seen.
+"""
+
+import os
+import time
+
+
+class LatencyHistogram:
+    def __init__(self, significant_bits=5, max_value_bits=40):
+        """
+        Initialize a new LatencyHistogram object.
+
+        Values below 2 ** significant_bits are counted exactly; above that each
+        power of two is split into 2 ** (significant_bits - 1) linear
+        sub-buckets, so with the default of 5 bits a bucket is never wider than
+        1/16 of the values it holds.
+
+        Args:
+            significant_bits (int): Number of bits of precision kept per value.
+            max_value_bits (int): Values at or above 2 ** max_value_bits are clamped
+                into the last bucket (2 ** 40 ns is roughly 18 minutes).
+        """
+        self.significant_bits = significant_bits
+        self.half_count = 1 << (significant_bits - 1)
+        self.max_value = (1 << max_value_bits) - 1
+        self.counts = [0] * self._index(self.max_value) + [0]
+        self.count = 0
+        self.total = 0
+        self.min = self.max_value
+        self.max = 0
+
+    def _index(self, value):
+        exponent = value.bit_length() - self.significant_bits
+        if exponent < 0:
+            exponent = 0
+        return exponent * self.half_count + (value >> exponent)
+
+    def _bucket_value(self, index):
+        """Return the highest value that falls into the bucket at the given index."""
+        exponent = index // self.half_count - 1
+        if exponent < 0:
+            exponent = 0
+        return ((index - exponent * self.half_count + 1) << exponent) - 1
+
+    def record(self, value):
+        """Record a single non-negative integer sample."""
+        if value > self.max_value:
+            value = self.max_value
+        # Inlined _index(): this is the hot path
+        exponent = value.bit_length() - self.significant_bits
+        if exponent < 0:
+            exponent = 0
+        self.counts[exponent * self.half_count + (value >> exponent)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percentile):
+        """
+        Return the value at the given percentile.
+
+        Args:
+            percentile (float): Percentile between 0 and 100.
+
+        Returns:
+            int: Upper bound of the bucket holding the requested rank, capped
+            at the largest recorded value, or 0 if the histogram is empty.
+        """
+        if not self.count:
+            return 0
+        rank = max(1, int(round(percentile / 100.0 * self.count)))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self._bucket_value(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0
+        self.min = self.max_value
+        self.max = 0
+
+    def summary(self):
+        """Return a dictionary with the count, mean, min, max and common percentiles in nanoseconds."""
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "min": self.min if self.count else 0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p99.9": self.percentile(99.9),
+        }
+
+
+class BookMetrics:
+    # Operations timed by the OrderBook; "order_latency" is arrival-to-fill per order
+    HISTOGRAMS = ("add", "cancel", "match", "fill", "order_latency")
+    COUNTERS = ("orders_added", "orders_rejected", "orders_cancelled", "cancel_misses",
+                "match_passes", "fills", "filled_quantity", "stops_triggered",
+                "orders_expired", "self_trades_prevented", "mass_cancels")
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self):
+        """
+        Initialize a new BookMetrics object.
+
+        This holds one LatencyHistogram per timed operation and a dictionary of
+        plain integer counters.
+        """
+        self.histograms = {name: LatencyHistogram() for name in self.HISTOGRAMS}
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.started_at = time.time()
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.started_at = time.time()
+
+    def stats(self):
+        """
+        Return a snapshot of all counters and latency summaries.
+
+        Returns:
+            dict: A dictionary with "counters", "latency_ns" (one summary per
+            histogram) and "uptime_s".
+        """
+        return {
+            "counters": dict(self.counters),
+            "latency_ns": {name: histogram.summary() for name, histogram in self.histograms.items()},
+            "uptime_s": time.time() - self.started_at,
+        }
+
+    def to_prometheus(self, prefix="clob"):
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Counters are exported as counters and each histogram as a summary with
+        quantiles, _sum and _count in seconds.
+
+        Args:
+            prefix (str, optional): Metric name prefix. Defaults to "clob".
+
+        Returns:
+            str: The exposition text.
+        """
+        lines = []
+        for name, value in self.counters.items():
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, histogram in self.histograms.items():
+            metric = f"{prefix}_{name}_latency_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for quantile in self.QUANTILES:
+                value = histogram.percentile(quantile * 100) / 1e9
+                lines.append(f'{metric}{{quantile="{quantile}"}} {value:.9f}')
+            lines.append(f"{metric}_sum {histogram.total / 1e9:.9f}")
+            lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump_prometheus(self, filename, prefix="clob"):
+        """
+        Write the Prometheus text exposition to a file.
+
+        The file is written to a temporary name and renamed into place, so a
+        node_exporter textfile collector never reads a partial file.
+
+        Args:
+            filename (str): Path of the .prom file to write.
+            prefix (str, optional): Metric name prefix. Defaults to "clob".
+
+        Returns:
+            str: The filename that was written.
+        """
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, "w") as f:
+            f.write(self.to_prometheus(prefix))
+        os.replace(tmp_filename, filename)
+        return filename
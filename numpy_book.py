@@ -0,0 +1,639 @@
+"""
+This module contains an OrderBook backend that keeps resting orders in NumPy structured arrays.
+
+Every resting order occupies a slot in one structured array with the fields
+in ORDER_DTYPE (sequence id, side, price in ticks, remaining quantity,
+arrival time and status). Each side keeps an index array of slots sorted by
+priority (best price, then arrival) and a parallel array of sort keys, so
+bulk operations run as vectorized NumPy code instead of loops over Order
+objects:
+
+- matching crosses the whole overlapping part of the book at once from the
+  cumulative quantities of both sides (see NumpyOrderBook.cross()),
+- a call auction (see NumpyOrderBook.run_auction()) reads the demand and
+  supply curves from cumulative sums over the crossed orders, picks the
+  clearing tick with one np.lexsort and allocates each side with one more
+  cumulative sum,
+- depth is aggregated with np.add.reduceat over the sorted index,
+- price ranges are sliced out of the index with np.searchsorted and
+  quantity bounds applied as a mask.
+
+New orders are appended to a per-side pending list and merged into the
+sorted index in one np.insert when the side is next read. Cancelled and
+filled orders are only marked dead (quantity 0). Dead entries at the front
+of an index (the filled orders) are sliced off on the next read, and the
+rest are dropped when dead entries outnumber live ones; only then are their
+slots handed back to the free list, so a slot is never referenced twice.
+
+Prices are stored as whole ticks of tick_size. For prices on the tick grid
+the book behaves like OrderBook: the same fills in the same order, the same
+history records and the same depth. It logs one line per match pass rather
+than one per fill, and has no instrumentation, profiling or snapshots.
+"""
+
+import logging
+import math
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from auction import ALLOCATIONS, AuctionResult
+from order import Order
+
+ORDER_DTYPE = np.dtype([
+    ("id", np.int64),  # Arrival sequence number, the time priority within a price
+    ("side", np.int8),  # 1 for buy, -1 for sell
+    ("tick", np.int64),  # Price in ticks
+    ("qty", np.int64),  # Remaining quantity; 0 once the order is dead
+    ("ts", np.int64),  # Arrival time from time.perf_counter_ns()
+    ("status", np.int8),  # One of the STATUS_* values
+])
+
+STATUS_FREE = 0
+STATUS_RESTING = 1
+STATUS_FILLED = 2
+STATUS_CANCELLED = 3
+
+
+def _pair(buy_cumulative, sell_cumulative, total):
+    """
+    Split the first total units of two cumulative quantity curves into fills.
+
+    A fill ends wherever either curve steps, so the fills are the union of
+    both sides' cumulative quantities up to total.
+
+    Returns:
+        tuple: Arrays (buy positions, sell positions, fill starts, fill ends) into the curves.
+    """
+    ends = np.sort(np.concatenate((buy_cumulative[buy_cumulative <= total],
+                                   sell_cumulative[sell_cumulative <= total])))
+    ends = ends[np.concatenate(([ends[0] > 0], ends[1:] != ends[:-1]))]  # Unique, positive
+    starts = np.concatenate(([0], ends[:-1]))
+    return (np.searchsorted(buy_cumulative, starts, side="right"),
+            np.searchsorted(sell_cumulative, starts, side="right"), starts, ends)
+
+
+class NumpyBookSide:
+    def __init__(self, book, side):
+        """
+        Initialize a new NumpyBookSide object.
+
+        Args:
+            book (NumpyOrderBook): The book owning the order arrays.
+            side (str): The side held by this object ("buy" or "sell").
+        """
+        self.book = book
+        self.side = side
+        self.sign = 1 if side == "buy" else -1
+        self.index = np.empty(0, dtype=np.int64)  # Slots in priority order, possibly including dead ones
+        self.keys = np.empty(0, dtype=np.int64)  # -sign * tick of each index entry, ascending
+        self.pending = []  # Slots added since the index was last merged, in arrival order
+        self.order_count = 0
+        self.dead = 0  # Dead slots still present in the index
+        self.price_total = 0.0  # Sum of resting order prices, for the average price
+
+    def __len__(self):
+        return self.order_count
+
+    def __bool__(self):
+        return self.order_count > 0
+
+    def average_price(self):
+        """Return the average price of the resting orders in O(1), or 0 if the side is empty."""
+        return self.price_total / self.order_count if self.order_count else 0.0
+
+    def sorted_index(self):
+        """
+        Merge the pending slots into the index and return it.
+
+        New orders always come after existing orders at the same price, so each
+        one is inserted at np.searchsorted(keys, key, 'right'); one np.insert
+        places the whole batch.
+        """
+        if self.pending:
+            orders = self.book.orders
+            slots = np.array(self.pending, dtype=np.int64)
+            self.pending = []
+            keys = -self.sign * orders["tick"][slots]
+            order = np.argsort(keys, kind="stable")  # Stable keeps arrival order within a price
+            slots, keys = slots[order], keys[order]
+            positions = np.searchsorted(self.keys, keys, side="right")
+            self.index = np.insert(self.index, positions, slots)
+            self.keys = np.insert(self.keys, positions, keys)
+        if self.dead:
+            self._trim_front()
+            if self.dead > max(1024, self.order_count):
+                self._compact()
+        return self.index
+
+    def _trim_front(self):
+        # Filled orders die at the front of the index; slicing them off keeps the best price at index[0]
+        index, quantities = self.index, self.book.orders["qty"]
+        start, size = 0, 64
+        while start < len(index):
+            live = np.flatnonzero(quantities[index[start:start + size]] > 0)
+            if len(live):
+                start += int(live[0])
+                break
+            start += size
+            size *= 4
+        start = min(start, len(index))
+        if start:
+            dropped = index[:start]
+            self.index = index[start:]
+            self.keys = self.keys[start:]
+            self.dead -= start
+            self.book._release(dropped)
+
+    def _compact(self):
+        live = self.book.orders["qty"][self.index] > 0
+        dropped = self.index[~live]
+        self.index = self.index[live]
+        self.keys = self.keys[live]
+        self.dead = 0
+        self.book._release(dropped)
+
+    def live_index(self):
+        """Return the slots of the resting orders in priority order."""
+        index = self.sorted_index()
+        return index[self.book.orders["qty"][index] > 0]
+
+    def best_tick(self):
+        """Return the tick of the best resting order, or None if the side is empty."""
+        if not self.order_count:
+            return None
+        # sorted_index() trims dead entries from the front, so the best order is first
+        return int(self.book.orders["tick"][self.sorted_index()[0]])
+
+    def range_slice(self, min_tick=None, max_tick=None):
+        """Return the index entries with ticks inside [min_tick, max_tick], in priority order."""
+        index = self.sorted_index()
+        if self.sign > 0:
+            low = 0 if max_tick is None else np.searchsorted(self.keys, -max_tick, side="left")
+            high = len(index) if min_tick is None else np.searchsorted(self.keys, -min_tick, side="right")
+        else:
+            low = 0 if min_tick is None else np.searchsorted(self.keys, min_tick, side="left")
+            high = len(index) if max_tick is None else np.searchsorted(self.keys, max_tick, side="right")
+        return index[low:high]
+
+    def depth(self, levels=None):
+        """
+        Return the aggregated depth of the best levels, vectorized over the sorted index.
+
+        Args:
+            levels (int, optional): Number of levels to return. Defaults to all.
+
+        Returns:
+            list: (price, total quantity, order count) tuples, best price first.
+        """
+        index = self.sorted_index()
+        if not self.order_count or levels == 0:
+            return []
+        keys = self.keys
+        # Aggregate a growing prefix of the index until it holds enough live levels
+        end = len(index) if levels is None else min(len(index), 4 * levels + 64)
+        while True:
+            if end < len(index):
+                end = int(np.searchsorted(keys, keys[end - 1], side="right"))  # Finish the last level
+            quantities = self.book.orders["qty"][index[:end]]
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(keys[:end])) + 1))
+            level_quantities = np.add.reduceat(quantities, starts)
+            counts = np.add.reduceat((quantities > 0).astype(np.int64), starts)
+            live = counts > 0  # Levels holding only dead entries are skipped
+            if levels is None or end == len(index) or np.count_nonzero(live) >= levels:
+                break
+            end *= 4
+        starts, level_quantities, counts = starts[live], level_quantities[live], counts[live]
+        if levels is not None:
+            starts, level_quantities, counts = starts[:levels], level_quantities[:levels], counts[:levels]
+        # Dead entries keep their Order until released, so any entry gives the level's price
+        objects = self.book.objects
+        return [(objects[slot].price, quantity, count)
+                for slot, quantity, count in zip(index[starts].tolist(), level_quantities.tolist(), counts.tolist())]
+
+
+class NumpyOrderBook:
+    def __init__(self, tick_size=0.01, capacity=1024):
+        """
+        Initialize a new NumpyOrderBook object.
+
+        Args:
+            tick_size (float, optional): Price increment; prices are stored as whole ticks.
+                Defaults to 0.01.
+            capacity (int, optional): Initial number of order slots; the arrays double when
+                full. Defaults to 1024.
+        """
+        self.tick_size = tick_size
+        self.orders = np.zeros(capacity, dtype=ORDER_DTYPE)  # One slot per order
+        self.objects = [None] * capacity  # Slot -> Order, so callers get the same objects back
+        self.free = list(range(capacity - 1, -1, -1))  # Reusable slots, lowest on top
+        self.bids = NumpyBookSide(self, "buy")
+        self.asks = NumpyBookSide(self, "sell")
+        self.slot_by_id = {}  # Resting order ID -> slot
+        self.order_history = deque()  # Matched trades, most recent first, as in OrderBook
+        self.last_matched_price = None
+        self.listeners = []  # BookListener objects notified of adds, cancels and fills
+        self.digest = None  # StateDigest, created by the first state_digest() call
+        self.sequence = 0
+
+        logging.basicConfig(
+            filename='order_book.log',
+            level=logging.INFO,
+            format='%(asctime)s %(message)s'
+        )
+
+    @property
+    def orders_by_id(self):
+        """Resting orders by order ID, built on demand for compatibility with OrderBook."""
+        objects = self.objects
+        return {order_id: objects[slot] for order_id, slot in self.slot_by_id.items()}
+
+    def _side(self, side) -> NumpyBookSide:
+        if side == "buy":
+            return self.bids
+        if side == "sell":
+            return self.asks
+        raise ValueError("Side must be either 'buy' or 'sell'")
+
+    def _tick(self, price):
+        return int(round(price / self.tick_size))
+
+    def _allocate(self):
+        if not self.free:
+            # Double the arrays; new slots are free
+            capacity = len(self.orders)
+            self.orders = np.concatenate((self.orders, np.zeros(capacity, dtype=ORDER_DTYPE)))
+            self.objects.extend([None] * capacity)
+            self.free = list(range(2 * capacity - 1, capacity - 1, -1))
+        return self.free.pop()
+
+    def _release(self, slots):
+        # Called for dead slots once no index refers to them any more
+        self.orders["status"][slots] = STATUS_FREE
+        objects = self.objects
+        for slot in slots.tolist():
+            objects[slot] = None
+        self.free.extend(slots[::-1].tolist())
+
+    def validate_order(self, order):
+        if not (math.isfinite(order.price) and math.isfinite(order.quantity)):
+            raise ValueError("Price and quantity must be finite numbers")
+        if order.price <= 0 or order.quantity <= 0:
+            raise ValueError("Price and quantity must be greater than zero")
+        if order.side not in ["buy", "sell"]:
+            raise ValueError("Side must be either 'buy' or 'sell'")
+        if order.order_id in self.slot_by_id:
+            raise ValueError(f"Order ID {order.order_id} is already in the book")
+        if order.order_type not in ("limit", "market") or order.hidden_quantity:
+            raise ValueError("NumpyOrderBook only holds limit and market orders, without hidden quantity")
+
+    def add_order(self, order):
+        """
+        Adds the given order to the book.
+
+        Args:
+            order (Order): The order to be added to the book.
+
+        Raises:
+            ValueError: If the order is invalid or its ID is already in the book.
+        """
+        try:
+            self.validate_order(order)
+        except ValueError as e:
+            logging.error(f"Error adding order: {order}. Error: {str(e)}")
+            raise
+        order.arrival_ns = time.perf_counter_ns()
+        side = self._side(order.side)
+        slot = self._allocate()
+        self.sequence += 1
+        self.orders[slot] = (self.sequence, side.sign, self._tick(order.price), order.quantity,
+                             order.arrival_ns, STATUS_RESTING)
+        self.objects[slot] = order
+        self.slot_by_id[order.order_id] = slot
+        side.pending.append(slot)
+        side.order_count += 1
+        side.price_total += order.price
+        logging.info(f"Added order: {order}")
+        for listener in self.listeners:
+            listener.order_added(order)
+
+    def _kill(self, side, slot, status):
+        order = self.objects[slot]
+        self.orders["qty"][slot] = 0
+        self.orders["status"][slot] = status
+        del self.slot_by_id[order.order_id]
+        side.order_count -= 1
+        side.dead += 1
+        side.price_total = side.price_total - order.price if side.order_count else 0.0
+
+    def cancel_order(self, order_id):
+        """
+        Cancels an order by its ID.
+
+        Returns:
+            str: "Order <id> cancelled." or "Order <id> not found.".
+        """
+        slot = self.slot_by_id.get(order_id)
+        if slot is None:
+            logging.warning(f"Order {order_id} not found.")
+            return f"Order {order_id} not found."
+        order = self.objects[slot]
+        self._kill(self._side(order.side), slot, STATUS_CANCELLED)
+        order.cancel()
+        logging.info(f"Order {order_id} cancelled.")
+        for listener in self.listeners:
+            listener.order_cancelled(order)
+        return f"Order {order_id} cancelled."
+
+    def cross(self):
+        """
+        Compute and apply every fill of the crossed part of the book in one vectorized pass.
+
+        Only bids priced at or above the best ask and asks priced at or below
+        the best bid can trade. Walking both in priority order, fills happen at
+        the union of the two sides' cumulative quantities; matching stops at
+        the first fill whose bid tick is below its ask tick, exactly where
+        OrderBook's loop would stop.
+
+        The candidates are taken in growing prefixes, so a pass that fills a
+        few orders does not pay for every order inside the crossed price range.
+
+        Returns:
+            tuple: Arrays (buy slots, sell slots, quantities) of the fills in execution order.
+        """
+        empty = np.empty(0, dtype=np.int64)
+        best_bid, best_ask = self.bids.best_tick(), self.asks.best_tick()
+        if best_bid is None or best_ask is None or best_bid < best_ask:
+            return empty, empty, empty
+
+        orders = self.orders
+        quantities, ticks = orders["qty"], orders["tick"]
+        all_buys = self.bids.range_slice(min_tick=best_ask)
+        all_sells = self.asks.range_slice(max_tick=best_bid)
+        size = 64
+        while True:
+            buys, sells = all_buys[:size], all_sells[:size]
+            buy_cumulative = np.cumsum(quantities[buys])
+            sell_cumulative = np.cumsum(quantities[sells])
+            total = min(buy_cumulative[-1], sell_cumulative[-1])
+
+            buy_positions, sell_positions, starts, ends = _pair(buy_cumulative, sell_cumulative, total)
+            buy_slots, sell_slots = buys[buy_positions], sells[sell_positions]
+
+            crossed = ticks[buy_slots] >= ticks[sell_slots]
+            if not crossed.all():
+                stop = int(np.argmin(crossed))
+                buy_slots, sell_slots, starts, ends = buy_slots[:stop], sell_slots[:stop], starts[:stop], ends[:stop]
+                break
+            # Prices never stopped the crossing: done only if the side that ran out was not cut short
+            buys_ran_out = buy_cumulative[-1] <= sell_cumulative[-1]
+            if len(buys if buys_ran_out else sells) == len(all_buys if buys_ran_out else all_sells):
+                break
+            size *= 4
+        fills = ends - starts
+
+        # Apply the fills to the quantity column, one scatter per side
+        np.subtract.at(quantities, buy_slots, fills)
+        np.subtract.at(quantities, sell_slots, fills)
+        return buy_slots, sell_slots, fills
+
+    def match_orders(self) -> List[Tuple[Order, Order, int]]:
+        """
+        Matches crossing buy and sell orders and returns the fills, as OrderBook.match_orders.
+
+        The crossing is computed by cross(); this method then updates the Order
+        objects, history and listeners fill by fill so callers see the same
+        results as with the object backend.
+
+        Returns:
+            A list of (buy_order, sell_order, quantity) tuples in execution order.
+        """
+        buy_slots, sell_slots, quantities = self.cross()
+        if not len(quantities):
+            return []
+        matched = self._record_fills(buy_slots, sell_slots, quantities)
+        logging.info(f"Matched {len(matched)} fills for {int(quantities.sum())} units")
+        return matched
+
+    def _record_fills(self, buy_slots, sell_slots, quantities, price=None):
+        # Bring the Order objects, history and listeners up to date with fills already
+        # applied to the quantity column; each fill trades at price, or the sell order's price
+        matched = []
+        objects, history, listeners = self.objects, self.order_history, self.listeners
+        now = int(time.time())
+        fill_ns = time.perf_counter_ns()
+        for buy_slot, sell_slot, quantity in zip(buy_slots.tolist(), sell_slots.tolist(), quantities.tolist()):
+            buy_order, sell_order = objects[buy_slot], objects[sell_slot]
+            buy_order.quantity -= quantity
+            sell_order.quantity -= quantity
+            fill_price = sell_order.price if price is None else price
+            history.appendleft({
+                "buy_order_id": str(buy_order.order_id),
+                "sell_order_id": str(sell_order.order_id),
+                "symbol": buy_order.symbol,
+                "quantity": quantity,
+                "price": fill_price,
+                "timestamp": now,
+                "buy_owner": buy_order.owner,
+                "sell_owner": sell_order.owner,
+            })
+            self.last_matched_price = fill_price
+            if not buy_order.quantity:
+                self._kill(self.bids, buy_slot, STATUS_FILLED)
+            if not sell_order.quantity:
+                self._kill(self.asks, sell_slot, STATUS_FILLED)
+            buy_order.execute((fill_ns - buy_order.arrival_ns) / 1e9)
+            sell_order.execute((fill_ns - sell_order.arrival_ns) / 1e9)
+            matched.append((buy_order, sell_order, quantity))
+            for listener in listeners:
+                listener.orders_matched(buy_order, sell_order, quantity, fill_price)
+        return matched
+
+    def _auction_candidates(self):
+        # Live slots of both sides inside the crossed range, in priority order, or None if not crossed
+        best_bid, best_ask = self.bids.best_tick(), self.asks.best_tick()
+        if best_bid is None or best_ask is None or best_bid < best_ask:
+            return None
+        quantities = self.orders["qty"]
+        buys = self.bids.range_slice(min_tick=best_ask)
+        sells = self.asks.range_slice(max_tick=best_bid)
+        return buys[quantities[buys] > 0], sells[quantities[sells] > 0]
+
+    def indicative_auction(self) -> Optional[AuctionResult]:
+        """
+        Returns the price and volume a call auction would execute now, as OrderBook.indicative_auction().
+
+        The demand and supply curves are cumulative sums over the crossed
+        orders: buys are in descending price order, so np.cumsum gives the
+        quantity bid at or above each price, and sells in ascending order give
+        the quantity offered at or below it. Both are read at every crossed
+        tick with np.searchsorted, and the tick with the most executable
+        volume wins, with OrderBook's tie-breaks (smallest imbalance, then
+        closest to the last matched price, then the lower price).
+
+        Returns:
+            AuctionResult: The clearing price, volume, demand and supply, or None if the book is not crossed.
+        """
+        candidates = self._auction_candidates()
+        if candidates is None:
+            return None
+        buys, sells = candidates
+        orders = self.orders
+        buy_ticks, sell_ticks = orders["tick"][buys], orders["tick"][sells]
+        buy_cumulative = np.cumsum(orders["qty"][buys])
+        sell_cumulative = np.cumsum(orders["qty"][sells])
+
+        # Ascending candidate ticks and the first order at each, which gives the level's price
+        ticks, first = np.unique(np.concatenate((buy_ticks, sell_ticks)), return_index=True)
+        # Buy ticks descend, so the bids priced >= tick are the prefix before the first lower tick
+        demand = np.concatenate(([0], buy_cumulative))[np.searchsorted(-buy_ticks, -ticks, side="right")]
+        supply = np.concatenate(([0], sell_cumulative))[np.searchsorted(sell_ticks, ticks, side="right")]
+        volume = np.minimum(demand, supply)
+
+        objects, slots = self.objects, np.concatenate((buys, sells))[first]
+        prices = np.array([objects[slot].price for slot in slots.tolist()])
+        reference = self.last_matched_price
+        distance = np.abs(prices - reference) if reference is not None else np.zeros(len(ticks))
+        # np.lexsort sorts by the last key first and is stable, so full ties keep the lowest tick
+        best = int(np.lexsort((distance, np.abs(demand - supply), -volume))[0])
+        if not volume[best]:
+            return None
+        return AuctionResult(float(prices[best]), int(volume[best]), int(demand[best]), int(supply[best]))
+
+    def _auction_allocation(self, side, tick, volume, allocation):
+        """
+        Allocate an auction volume to one side's orders priced at or better than tick, as auction.allocate().
+
+        Under FIFO each order, in priority order, gets what is left of the
+        volume after the orders ahead of it, a clip of one cumulative sum.
+        Under pro-rata the levels ahead of the marginal level fill in full and
+        the marginal level's orders share the rest in proportion to their size.
+
+        Returns:
+            tuple: Arrays (slots, quantities) in priority order, omitting orders allocated nothing.
+        """
+        orders = self.orders
+        slots = side.range_slice(*((tick, None) if side.sign > 0 else (None, tick)))
+        slots = slots[orders["qty"][slots] > 0]
+        quantities = orders["qty"][slots]
+        cumulative = np.cumsum(quantities)
+        shares = np.clip(volume - (cumulative - quantities), 0, quantities)
+        if allocation == "pro_rata" and cumulative[-1] > volume:
+            ticks = orders["tick"][slots]
+            marginal_tick = ticks[np.searchsorted(cumulative, volume, side="right")]
+            marginal = ticks == marginal_tick
+            ahead = int(np.argmax(marginal))
+            remaining = volume - (int(cumulative[ahead - 1]) if ahead else 0)
+            level = quantities[marginal]
+            share = level * remaining // level.sum()
+            # Rounding lots go one at a time to the oldest orders that can take one
+            can_take = share < level
+            share += can_take & (np.cumsum(can_take) <= remaining - share.sum())
+            shares[marginal] = share
+        allocated = shares > 0
+        return slots[allocated], shares[allocated]
+
+    def run_auction(self, allocation="fifo") -> List[Tuple[Order, Order, int]]:
+        """
+        Uncrosses the book in one call auction at a single clearing price, as OrderBook.run_auction().
+
+        The clearing price comes from indicative_auction() and each side's
+        allocation from _auction_allocation(); the two allocations are paired
+        in priority order from their cumulative sums, as cross() pairs fills,
+        and applied with one scatter per side. Every fill trades at the
+        clearing price.
+
+        Args:
+            allocation (str, optional): How the marginal price level of the side with
+                surplus quantity is shared: "fifo" (time priority) or "pro_rata". Defaults to "fifo".
+
+        Returns:
+            List[Tuple[Order, Order, int]]: The (buy order, sell order, quantity) fills.
+
+        Raises:
+            ValueError: If the allocation method is unknown.
+        """
+        if allocation not in ALLOCATIONS:
+            raise ValueError(f"Allocation must be one of {', '.join(ALLOCATIONS)}")
+        result = self.indicative_auction()
+        if result is None:
+            return []
+        tick = self._tick(result.price)
+        buy_slots, buy_shares = self._auction_allocation(self.bids, tick, result.volume, allocation)
+        sell_slots, sell_shares = self._auction_allocation(self.asks, tick, result.volume, allocation)
+
+        buy_positions, sell_positions, starts, ends = _pair(np.cumsum(buy_shares), np.cumsum(sell_shares),
+                                                            result.volume)
+        buy_slots, sell_slots, fills = buy_slots[buy_positions], sell_slots[sell_positions], ends - starts
+        quantities = self.orders["qty"]
+        np.subtract.at(quantities, buy_slots, fills)
+        np.subtract.at(quantities, sell_slots, fills)
+
+        matched = self._record_fills(buy_slots, sell_slots, fills, result.price)
+        logging.info(f"Auction uncrossed {result.volume} units at {result.price} in {len(matched)} fills "
+                     f"({allocation}, imbalance {result.imbalance})")
+        return matched
+
+    def get_order_book(self) -> Dict[str, List[Order]]:
+        return {"buy_orders": list(self.iter_orders("buy")), "sell_orders": list(self.iter_orders("sell"))}
+
+    def count_orders(self, side) -> int:
+        return len(self._side(side))
+
+    def get_depth(self, levels=10) -> Dict[str, List[Tuple[float, int, int]]]:
+        """Returns (price, total quantity, order count) of the best levels per side, best first."""
+        return {"bids": self.bids.depth(levels), "asks": self.asks.depth(levels)}
+
+    def iter_orders(self, side, start=0, limit=None) -> Iterator[Order]:
+        live = self._side(side).live_index()
+        window = live[start:] if limit is None else live[start:start + limit]
+        objects = self.objects
+        return (objects[slot] for slot in window.tolist())
+
+    def _tick_bounds(self, min_price, max_price):
+        # Include every tick whose price lies inside the bounds
+        min_tick = None if min_price is None else int(np.ceil(min_price / self.tick_size - 1e-9))
+        max_tick = None if max_price is None else int(np.floor(max_price / self.tick_size + 1e-9))
+        return min_tick, max_tick
+
+    def filter_orders(self, side, min_price=None, max_price=None, min_quantity=None,
+                      max_quantity=None) -> List[Order]:
+        """
+        Returns one side's resting orders inside the price and quantity bounds, in priority order.
+
+        The price range is sliced from the sorted index and the quantity bounds
+        applied as one vectorized mask.
+        """
+        slots = self._side(side).range_slice(*self._tick_bounds(min_price, max_price))
+        quantities = self.orders["qty"][slots]
+        mask = quantities > 0
+        if min_quantity is not None:
+            mask &= quantities >= min_quantity
+        if max_quantity is not None:
+            mask &= quantities <= max_quantity
+        objects = self.objects
+        return [objects[slot] for slot in slots[mask].tolist()]
+
+    def get_orders_in_range(self, side, min_price=None, max_price=None, limit=None) -> List[Order]:
+        orders = self.filter_orders(side, min_price, max_price)
+        return orders if limit is None else orders[:limit]
+
+    def get_order_history(self):
+        return list(self.order_history)
+
+    def state_digest(self) -> str:
+        """Returns a digest of the open orders and fills, as OrderBook.state_digest()."""
+        if self.digest is None:
+            from state_digest import StateDigest
+            self.digest = StateDigest.from_book(self)
+            self.add_listener(self.digest)
+        return self.digest.hexdigest()
+
+    def add_listener(self, listener):
+        """Registers a BookListener to be notified of adds, cancels and fills."""
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
@@ -1,7 +1,8 @@
 from datetime import datetime
 
 class Order:
-    def __init__(self, timestamp, order_id, symbol, price, quantity, side, order_type='limit'):
+    def __init__(self, timestamp, order_id, symbol, price, quantity, side, order_type='limit', stop_price=None,
+                 display_quantity=None, time_in_force='gtc', expire_at=None, owner=None):
         """
         Initialize an Order object.
 
@@ -12,7 +13,17 @@ class Order:
             price (float): The price of the symbol at which the order is placed.
             quantity (int): The quantity of the symbol to be traded.
             side (str): The side of the order ("buy" or "sell").
-            order_type (str, optional): The type of the order ("limit" or "market", default is "limit").
+            order_type (str, optional): The type of the order ("limit", "market", "stop" or "stop_limit",
+                default is "limit"). A triggered stop becomes a market order and a stop-limit a limit
+                order; either way the order trades no worse than its price.
+            stop_price (float, optional): The trade price that triggers a stop or stop-limit order.
+            display_quantity (int, optional): For an iceberg order, the size of the displayed clip.
+                Only the clip is in quantity and visible in the book; the rest waits in
+                hidden_quantity and refills the clip each time it is filled.
+            time_in_force (str, optional): How long the order rests: "gtc" (until cancelled, the
+                default), "day" (until the order book's session ends) or "gtt" (until expire_at).
+            expire_at (float, optional): The expiry time of a "gtt" order in seconds since the epoch.
+            owner (str, optional): The username of the order's owner, set from the authenticated session.
         """
         
         # Initialize the timestamp of the order creation
@@ -27,24 +38,50 @@ class Order:
         # Initialize the price of the symbol at which the order is placed
         self.price = price
         
-        # Initialize the quantity of the symbol to be traded
-        self.quantity = quantity
+        # Initialize the displayed clip of an iceberg order (None for a fully displayed order)
+        self.display_quantity = display_quantity
+
+        # Initialize the displayed quantity to be traded and the hidden reserve behind it
+        if display_quantity is not None and display_quantity < quantity:
+            self.quantity = display_quantity
+            self.hidden_quantity = quantity - display_quantity
+        else:
+            self.quantity = quantity
+            self.hidden_quantity = 0
         
         # Initialize the side of the order ("buy" or "sell")
         self.side = side
         
-        # Initialize the type of the order ("limit" or "market", default is "limit")
+        # Initialize the type of the order ("limit", "market", "stop" or "stop_limit", default is "limit")
         self.order_type = order_type
+
+        # Initialize the trigger price of a stop or stop-limit order (None for other types)
+        self.stop_price = stop_price
         
+        # Initialize the time in force ("gtc", "day" or "gtt") and the expiry time of a "gtt" order
+        self.time_in_force = time_in_force
+        self.expire_at = expire_at
+
+        # Initialize the owner of the order (None for orders not sent by a logged-in user)
+        self.owner = owner
+
         # Initialize the execution time of the order as None (not executed yet)
         self.execution_time = None
+
+        # Initialize the monotonic arrival time in nanoseconds, stamped by the order book
+        self.arrival_ns = None
         
         # Initialize the status of the order as "pending" (not yet executed or cancelled)
         self.status = 'pending'
 
     def __repr__(self):
         return (f"Order(timestamp={self.timestamp}, order_id={self.order_id}, symbol={self.symbol}, price={self.price}, "
-                f"quantity={self.quantity}, side={self.side}, order_type={self.order_type}, execution_time={self.execution_time}, status={self.status})")
+                f"quantity={self.quantity}, side={self.side}, order_type={self.order_type}, stop_price={self.stop_price}, hidden_quantity={self.hidden_quantity}, execution_time={self.execution_time}, status={self.status})")
+
+    @property
+    def total_quantity(self):
+        """The remaining quantity including the hidden reserve of an iceberg order."""
+        return self.quantity + self.hidden_quantity
 
     def is_valid(self):
         """Validate the order details."""
@@ -52,14 +89,21 @@ class Order:
             return False
         if self.side not in ["buy", "sell"]:
             return False
-        if self.order_type not in ["limit", "market"]:
+        if self.order_type not in ["limit", "market", "stop", "stop_limit"]:
+            return False
+        if self.order_type in ["stop", "stop_limit"] and not (self.stop_price and self.stop_price > 0):
+            return False
+        if self.time_in_force not in ["gtc", "day", "gtt"]:
+            return False
+        if self.time_in_force == "gtt" and self.expire_at is None:
             return False
         return True
 
     def update_quantity(self, quantity):
-        """Update the order quantity."""
+        """Update the order quantity, splitting it into a clip and a reserve for an iceberg order."""
         if quantity > 0:
-            self.quantity = quantity
+            self.quantity = min(quantity, self.display_quantity or quantity)
+            self.hidden_quantity = quantity - self.quantity
         else:
             raise ValueError("Quantity must be greater than zero")
 
@@ -68,7 +112,7 @@ class Order:
         Set the execution time for the order and update its status.
 
         Args:
-            execution_time (float): The time taken to execute the order in seconds.
+            execution_time (float): The time from the order's arrival in the book to the fill, in seconds.
         """
         # Update the status and execution time in a single assignment
         self.status, self.execution_time = 'fulfilled', execution_time
@@ -77,6 +121,10 @@ class Order:
         """Cancel the order."""
         self.status = 'canceled'
 
+    def expire(self):
+        """Mark the order as expired by its time in force."""
+        self.status = 'expired'
+
     def modify(self, price=None, quantity=None):
         """Modify the order."""
         if price:
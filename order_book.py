@@ -1,37 +1,171 @@
-import heapq
 import time
 import logging
+import math
 import random
+from heapq import heappop, heappush
 from collections import deque
-from typing import Dict, List, Tuple, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from order import Order
-from user import User
+from book_side import BookSide
+from auction import ALLOCATIONS, AuctionResult, allocate, clearing_price
+from trigger_book import STOP_ORDER_TYPES, TriggerBook
+from metrics import BookMetrics
+from profiling import SessionProfiler
+
+class BookListener:
+    """
+    Base class for objects notified of order book events.
+
+    Subclasses override the callbacks they need. Callbacks run synchronously
+    on the thread changing the book, after the book has been updated, so they
+    must be cheap.
+    """
+
+    def order_added(self, order):
+        """Called after an order has been added to the book."""
+
+    def order_cancelled(self, order):
+        """Called after a resting order has been cancelled; order.quantity is what was left."""
+
+    def orders_matched(self, buy_order, sell_order, quantity, price):
+        """Called after each fill; the orders' quantities are already reduced."""
+
+    def order_reduced(self, order, quantity):
+        """Called after self-trade prevention takes quantity off an order without a fill."""
+
+    def orders_cancelled(self, orders):
+        """Called once after a mass cancel with every order it removed; defaults to order_cancelled() for each."""
+        for order in orders:
+            self.order_cancelled(order)
+
+
+class BookChanges(BookListener):
+    """
+    Counts the changes to an order book and which slices of its state each one touched.
+
+    The slices are "levels" (the resting orders and price levels), "stats"
+    (order counts and average prices) and "trades" (fills, the last matched
+    price and the history). Every add, cancel, fill and reduction increments
+    change_count and stamps the slices it touched with the new count, so any
+    number of readers can each remember the count they last saw and ask
+    dirty() what changed since. Adding or cancelling a dormant stop changes
+    no slice.
+    """
+
+    SLICES = ("levels", "stats", "trades")
 
-class OrderBook:
     def __init__(self):
+        self.change_count = 0
+        self.versions = dict.fromkeys(self.SLICES, 0)  # Slice -> change_count when it last changed
+
+    def dirty(self, since):
+        """
+        Returns the slices changed after the given change count.
+
+        Args:
+            since (int): A change_count read earlier; -1 means every slice.
+
+        Returns:
+            set: Names from SLICES.
+        """
+        return {name for name, version in self.versions.items() if version > since}
+
+    def _touch(self, order=None, trades=False):
+        self.change_count += 1
+        count = self.change_count
+        versions = self.versions
+        if order is None or order.order_type not in STOP_ORDER_TYPES:
+            versions["levels"] = versions["stats"] = count
+        if trades:
+            versions["trades"] = count
+
+    def order_added(self, order):
+        self._touch(order)
+
+    def order_cancelled(self, order):
+        self._touch(order)
+
+    def orders_matched(self, buy_order, sell_order, quantity, price):
+        self._touch(trades=True)
+
+    def order_reduced(self, order, quantity):
+        self._touch()
+
+    def orders_cancelled(self, orders):
+        # One change for the whole mass cancel
+        if any(order.order_type not in STOP_ORDER_TYPES for order in orders):
+            self._touch()
+        elif orders:
+            self.change_count += 1
+
+
+SELF_TRADE_PREVENTION = ("cancel_newest", "cancel_oldest", "decrement_both")
+
+
+class OrderBook:
+    def __init__(self, instrumented=False, clock=time.time, self_trade_prevention=None):
         """
         Initializes a new instance of the OrderBook class.
 
+        Args:
+            instrumented (bool, optional): Whether to record latency histograms and
+                counters for add, cancel, match and fill. Defaults to False.
+            clock (callable, optional): Returns the current time in seconds since the
+                epoch, for expiring "gtt" orders. Defaults to time.time.
+            self_trade_prevention (str, optional): What to do when two orders of the same
+                owner would match: "cancel_newest", "cancel_oldest" or "decrement_both"
+                (take the smaller quantity off both without a trade). Defaults to None,
+                which lets them trade.
+
+        Raises:
+            ValueError: If self_trade_prevention is not one of the modes above.
+
         This constructor initializes the following attributes:
 
-        - buy_orders: A list to store buy orders.
-        - sell_orders: A list to store sell orders.
+        - bids: A BookSide holding the resting buy orders by price level.
+        - asks: A BookSide holding the resting sell orders by price level.
+        - orders_by_id: A dictionary mapping each resting order ID to its order.
         - order_history: A deque to store the history of orders.
         - last_matched_price: A variable to store the last matched price.
-        - users: A list to store users.
-        - current_user: A variable to store the current user.
+        - metrics: A BookMetrics object when instrumented, otherwise None.
+        - profiler: A SessionProfiler, started at once if CLOB_PROFILE is set.
+        - listeners: A list of BookListener objects notified of adds, cancels and fills.
+        - snapshot: A BookSnapshotWriter publishing to shared memory after each match, or None.
+        - tape: A TradeTapeWriter appending every fill to memory-mapped trade tape files, or None.
+        - digest: A StateDigest kept up to date on every add, cancel and fill once state_digest() is called.
+        - changes: A BookChanges counting changes and the slices they touched once track_changes() is called.
+        - stops: A TriggerBook holding dormant stop and stop-limit orders until a trade triggers them.
+        - expiry_buckets, expiry_times: "gtt" orders bucketed by the second they expire in,
+          and a heap of those seconds.
+        - day_orders: The "day" orders, expired together by end_session().
+        - orders_by_owner: Each owner's resting and dormant orders by order ID.
 
         It also sets up logging with a filename 'order_book.log', level INFO,
         and a format of '%(asctime)s %(message)s'.
 
         """
         # Initialize attributes
-        self.buy_orders = []  # List to store buy orders
-        self.sell_orders = []  # List to store sell orders
+        self.bids = BookSide("buy")  # Resting buy orders, best (highest) price first
+        self.asks = BookSide("sell")  # Resting sell orders, best (lowest) price first
+        self.orders_by_id = {}  # Resting orders by order ID, for O(1) cancel lookup
         self.order_history = deque()  # Deque to store the history of orders
         self.last_matched_price = None  # Variable to store the last matched price
-        self.users = []  # List to store users
-        self.current_user = None  # Variable to store the current user
+        self.metrics = BookMetrics() if instrumented else None  # Latency histograms and counters
+        self.profiler = SessionProfiler.from_env()  # Opt-in profiler shared with the GUI and exporter
+        self.listeners = []  # BookListener objects notified of adds, cancels and fills
+        self.snapshot = None  # Shared memory publisher for readers in other processes
+        self.tape = None  # TradeTapeWriter persisting fills, or None
+        self.digest = None  # StateDigest, created by the first state_digest() call
+        self.changes = None  # BookChanges, created by the first track_changes() call
+        self.stops = TriggerBook()  # Dormant stop orders keyed by stop price
+        self.clock = clock
+        self.expiry_buckets = {}  # Expiry second -> "gtt" orders expiring in it
+        self.expiry_times = []  # Heap of the seconds in expiry_buckets
+        self.day_orders = {}  # "day" orders by order ID, in arrival order
+        self.orders_by_owner = {}  # Owner -> {order ID: order} of their open orders
+        if self_trade_prevention not in (None,) + SELF_TRADE_PREVENTION:
+            raise ValueError(f"Self-trade prevention must be one of {', '.join(SELF_TRADE_PREVENTION)}")
+        self.self_trade_prevention = self_trade_prevention
 
         # Set up logging
         logging.basicConfig(
@@ -53,25 +187,45 @@ class OrderBook:
         Returns:
             None
         """
+        metrics = self.metrics
+        start_ns = time.perf_counter_ns()
         try:
             # Validate the order before adding it to the order book.
             self.validate_order(order)
 
-            # Determine the heap to push the order into based on the order side.
-            if order.side == "buy":
-                heap = self.buy_orders
+            # Stamp the arrival time used for the arrival-to-fill latency.
+            order.arrival_ns = start_ns
+
+            if order.order_type in STOP_ORDER_TYPES:
+                # Park the stop in the trigger book until a trade reaches its stop price.
+                self.stops.add(order)
             else:
-                heap = self.sell_orders
+                # Append the order to the back of its price level on its side of the book.
+                self._side(order.side).add(order)
+                self.orders_by_id[order.order_id] = order
 
-            # Push the order into the heap with the price and timestamp as the key.
-            heapq.heappush(heap, (order.price, order.timestamp, order))
+            if order.time_in_force == "gtt":
+                self._schedule_expiry(order)
+            elif order.time_in_force == "day":
+                self.day_orders[order.order_id] = order
+            if order.owner is not None:
+                self.orders_by_owner.setdefault(order.owner, {})[order.order_id] = order
 
             # Log the successful addition of the order.
             logging.info(f"Added order: {order}")
 
+            for listener in self.listeners:
+                listener.order_added(order)
+
+            if metrics is not None:
+                metrics.histograms["add"].record(time.perf_counter_ns() - start_ns)
+                metrics.counters["orders_added"] += 1
+
         except Exception as e:
             # Log the error caused by failure to add the order.
             logging.error(f"Error adding order: {order}. Error: {str(e)}")
+            if metrics is not None:
+                metrics.counters["orders_rejected"] += 1
             raise
 
     def cancel_order(self, order_id):
@@ -96,62 +250,330 @@ class OrderBook:
             >>> order_book.cancel_order("2")
             "Order 2 not found."
         """
-        # Iterate over the buy and sell order lists
-        for order_list in [self.buy_orders, self.sell_orders]:
-            # Iterate over the orders in the order list
-            for index, (_, _, order) in enumerate(order_list):
-                # Check if the order ID matches the given order ID
-                if order.order_id == order_id:
-                    # Cancel the order
-                    order.cancel()
+        start_ns = time.perf_counter_ns()
 
-                    # Remove the order from the order list
-                    order_list.pop(index)
+        # Look up the resting order by its ID and remove it from the book
+        order = self._detach(order_id)
+        if order is not None:
+            order.cancel()
 
-                    # Rebuild the heap to maintain the heap property
-                    heapq.heapify(order_list)
+            # Log the cancellation of the order
+            logging.info(f"Order {order_id} cancelled.")
 
-                    # Log the cancellation of the order
-                    logging.info(f"Order {order_id} cancelled.")
+            for listener in self.listeners:
+                listener.order_cancelled(order)
 
-                    # Return a success message
-                    return f"Order {order_id} cancelled."
+            if self.metrics is not None:
+                self.metrics.histograms["cancel"].record(time.perf_counter_ns() - start_ns)
+                self.metrics.counters["orders_cancelled"] += 1
+
+            # Return a success message
+            return f"Order {order_id} cancelled."
 
         # If the order is not found, log a warning and return an error message
         logging.warning(f"Order {order_id} not found.")
+        if self.metrics is not None:
+            self.metrics.histograms["cancel"].record(time.perf_counter_ns() - start_ns)
+            self.metrics.counters["cancel_misses"] += 1
         return f"Order {order_id} not found."
 
+    def _detach(self, order_id):
+        # The fast removal shared by cancel and expiry: O(1) lookup, then the order's own level
+        order = self.orders_by_id.pop(order_id, None)
+        if order is not None:
+            self._side(order.side).remove(order)
+        else:
+            # Dormant stops are removed straight from the trigger book
+            order = self.stops.cancel(order_id)
+        if order is not None:
+            if order.time_in_force == "day":
+                self.day_orders.pop(order_id, None)
+            if order.owner is not None:
+                self._unown(order)
+        return order
+
+    def _unown(self, order):
+        owned = self.orders_by_owner[order.owner]
+        del owned[order.order_id]
+        if not owned:
+            del self.orders_by_owner[order.owner]
+
+    def cancel_all_for_owner(self, owner) -> int:
+        """
+        Cancels every open order of one owner, including dormant stops.
+
+        Args:
+            owner (str): The owner, e.g. a username.
+
+        Returns:
+            int: The number of orders cancelled.
+        """
+        return self.mass_cancel(owner=owner)
+
+    def mass_cancel(self, symbol=None, side=None, owner=None, min_price=None, max_price=None) -> int:
+        """
+        Cancels every open order matching all of the given filters in one bulk operation.
+
+        With an owner the candidates come straight from the per-owner index.
+        Otherwise the price levels inside the band are cut out of each side
+        whole (see BookSide.detach_range), or, with a symbol, each affected level
+        is rebuilt once without the cancelled orders. Dormant stops are not on
+        a price level yet, so they are only cancelled when no price band is
+        given. Listeners get one orders_cancelled() call and one line is logged
+        for the whole batch.
+
+        Args:
+            symbol (str, optional): Only cancel orders for this symbol. Defaults to any symbol.
+            side (str, optional): Only cancel "buy" or "sell" orders. Defaults to both sides.
+            owner (str, optional): Only cancel this owner's orders. Defaults to any owner.
+            min_price (float, optional): Lowest limit price to cancel. Defaults to no bound.
+            max_price (float, optional): Highest limit price to cancel. Defaults to no bound.
+
+        Returns:
+            int: The number of orders cancelled.
+
+        Raises:
+            ValueError: If side is given and is not "buy" or "sell".
+        """
+        sides = [self._side(side)] if side is not None else [self.bids, self.asks]
+        banded = min_price is not None or max_price is not None
+        resting = []
+        stops = []
+        if owner is not None:
+            for order in self.orders_by_owner.get(owner, {}).values():
+                if (symbol is not None and order.symbol != symbol) or (side is not None and order.side != side):
+                    continue
+                if self.orders_by_id.get(order.order_id) is order:
+                    if (min_price is None or order.price >= min_price) and \
+                            (max_price is None or order.price <= max_price):
+                        resting.append(order)
+                elif not banded:
+                    stops.append(order)
+            by_side = {"buy": [], "sell": []}
+            for order in resting:
+                by_side[order.side].append(order)
+            self.bids.remove_orders(by_side["buy"])
+            self.asks.remove_orders(by_side["sell"])
+        else:
+            for book_side in sides:
+                if symbol is None:
+                    resting.extend(book_side.detach_range(min_price, max_price))
+                else:
+                    matching = [order for level in book_side.levels_in_range(min_price, max_price)
+                                for order in level.orders if order.symbol == symbol]
+                    book_side.remove_orders(matching)
+                    resting.extend(matching)
+                if not banded:
+                    stops.extend(order for order in self.stops.iter_orders(book_side.side)
+                                 if symbol is None or order.symbol == symbol)
+        self.stops.cancel_orders(stops)
+
+        cancelled = resting + stops
+        orders_by_id = self.orders_by_id
+        for order in resting:
+            del orders_by_id[order.order_id]
+        for order in cancelled:
+            if order.time_in_force == "day":
+                self.day_orders.pop(order.order_id, None)
+            if order.owner is not None:
+                self._unown(order)
+            order.cancel()
+        for listener in self.listeners:
+            listener.orders_cancelled(cancelled)
+        if self.metrics is not None:
+            self.metrics.counters["orders_cancelled"] += len(cancelled)
+            self.metrics.counters["mass_cancels"] += 1
+        filters = ", ".join(f"{name}={value}" for name, value in (
+            ("symbol", symbol), ("side", side), ("owner", owner), ("min_price", min_price), ("max_price", max_price))
+            if value is not None)
+        logging.info(f"Mass cancel ({filters or 'all orders'}): cancelled {len(cancelled)} orders")
+        self.publish_snapshot()
+        return len(cancelled)
+
+    def _is_resting(self, order):
+        return self.orders_by_id.get(order.order_id) is order or self.stops.orders_by_id.get(order.order_id) is order
+
+    def _schedule_expiry(self, order):
+        # Orders expiring in the same second share a bucket, so scheduling is
+        # O(1) for all but the first order of each second
+        second = math.floor(order.expire_at)
+        bucket = self.expiry_buckets.get(second)
+        if bucket is None:
+            bucket = self.expiry_buckets[second] = []
+            heappush(self.expiry_times, second)
+        bucket.append(order)
+
+    def expire_orders(self, now=None) -> int:
+        """
+        Expires the "gtt" orders whose expiry time has passed.
+
+        This is called at the start of every match pass and is O(1) when nothing
+        is due. Due orders are removed through the same path as cancel_order();
+        orders filled or cancelled since they were scheduled are skipped, so
+        they never have to be unscheduled.
+
+        Args:
+            now (float, optional): The current time in seconds since the epoch. Defaults to the book's clock.
+
+        Returns:
+            int: The number of orders expired.
+        """
+        times = self.expiry_times
+        if not times:
+            return 0
+        now = self.clock() if now is None else now
+        expired = 0
+        not_due = []  # Orders later in the current second
+        while times and times[0] <= now:
+            for order in self.expiry_buckets.pop(heappop(times)):
+                if not self._is_resting(order):
+                    continue
+                if order.expire_at > now:
+                    not_due.append(order)
+                    continue
+                self._detach(order.order_id)
+                self._expired(order)
+                expired += 1
+        for order in not_due:
+            self._schedule_expiry(order)
+        if expired:
+            logging.info(f"Expired {expired} GTT orders")
+        return expired
+
+    def end_session(self) -> int:
+        """
+        Expires every resting "day" order in one bulk operation.
+
+        Resting day orders are removed from each affected price level in a
+        single pass per level (see BookSide.remove_orders) instead of one
+        cancel each, and one line is logged for the whole batch.
+
+        Returns:
+            int: The number of orders expired.
+        """
+        by_side = {"buy": [], "sell": []}
+        stops = []
+        orders_by_id = self.orders_by_id
+        for order_id, order in self.day_orders.items():
+            if orders_by_id.get(order_id) is order:
+                del orders_by_id[order_id]
+                by_side[order.side].append(order)
+            elif self.stops.orders_by_id.get(order_id) is order:
+                self.stops.cancel(order_id)
+                stops.append(order)
+            else:
+                continue
+            if order.owner is not None:
+                self._unown(order)
+        self.day_orders = {}
+        self.bids.remove_orders(by_side["buy"])
+        self.asks.remove_orders(by_side["sell"])
+
+        expired = by_side["buy"] + by_side["sell"] + stops
+        for order in expired:
+            self._expired(order)
+        logging.info(f"Session ended: expired {len(expired)} day orders")
+        self.publish_snapshot()
+        return len(expired)
+
+    def _expired(self, order):
+        order.expire()
+        for listener in self.listeners:
+            listener.order_cancelled(order)
+        if self.metrics is not None:
+            self.metrics.counters["orders_expired"] += 1
+
     def match_orders(self) -> List[Tuple[Order, Order, int]]:
         """
         Matches buy and sell orders based on quantity and price, updates order quantities,
         creates matched orders, logs the match, and returns a list of matched orders.
 
+        Due "gtt" orders are expired first (see expire_orders()). Stops
+        triggered by the pass's trades are moved into the book in
+        activation order and matched in a further pass, repeated until no
+        more stops trigger or nothing trades.
+
         Returns:
             A list of tuples containing the matched orders, their quantities,
             and the timestamp of the match.
         """
+        with self.profiler.section("match"):
+            self.expire_orders()
+            matched = self._match_orders()
+            fills = matched
+            while fills and self.stops:
+                # Every fill trades at the sell order's price
+                prices = [sell_order.price for _, sell_order, _ in fills]
+                if not self._activate_stops(max(prices), min(prices)):
+                    break
+                fills = self._match_orders()
+                matched.extend(fills)
+        if self.snapshot is not None:
+            self.snapshot.publish(self)
+        if self.tape is not None:
+            self.tape.flush()
+        return matched
+
+    def _activate_stops(self, high, low):
+        """
+        Moves the stops triggered by trades between low and high into the book.
+
+        Each triggered order becomes a market (stop) or limit (stop-limit) order
+        and joins the back of its price level with a new arrival time.
+
+        Returns:
+            int: The number of stops activated.
+        """
+        triggered = self.stops.pop_triggered(high, low)
+        for order in triggered:
+            order.order_type = STOP_ORDER_TYPES[order.order_type]
+            order.arrival_ns = time.perf_counter_ns()
+            self._side(order.side).add(order)
+            self.orders_by_id[order.order_id] = order
+            logging.info(f"Stop order {order.order_id} triggered at stop price {order.stop_price}")
+        if triggered and self.metrics is not None:
+            self.metrics.counters["stops_triggered"] += len(triggered)
+        return len(triggered)
+
+    def _match_orders(self) -> List[Tuple[Order, Order, int]]:
         # Initialize an empty list to store the matched orders
         matched: List[Tuple[Order, Order, int]] = []
 
-        # Print a starting message
-        print("Starting order matching...")
+        metrics = self.metrics
+        perf_counter_ns = time.perf_counter_ns
+        pass_start_ns = perf_counter_ns()
 
-        # Continue matching orders until there are no more buy or sell orders,
-        # or the best buy order's price is greater than the best sell order's price
-        while self.buy_orders and self.sell_orders and -self.buy_orders[0][0] >= self.sell_orders[0][0]:
-            # Print a message for each iteration
-            print("Matching orders...")
+        logging.debug("Starting order matching...")
 
-            # Get the first buy and sell orders
-            buy_price, _, buy_order = self.buy_orders[0]
-            sell_price, _, sell_order = self.sell_orders[0]
+        bids, asks = self.bids, self.asks
+
+        # Continue matching orders until there are no more buy or sell orders,
+        # or the best buy price is below the best sell price
+        while bids and asks:
+            buy_level = bids.best()
+            sell_level = asks.best()
+            if buy_level.price < sell_level.price:
+                break
+
+            fill_start_ns = perf_counter_ns()
+
+            # Get the oldest buy and sell orders at the best levels
+            buy_order = buy_level.orders[0]
+            sell_order = sell_level.orders[0]
+            sell_price = sell_level.price
+
+            # Self-trade prevention is one comparison per fill
+            if self.self_trade_prevention is not None and buy_order.owner is not None \
+                    and buy_order.owner == sell_order.owner:
+                self._prevent_self_trade(buy_level, buy_order, sell_level, sell_order)
+                continue
 
             # Calculate the quantity to match between the buy and sell orders
             matched_quantity = min(buy_order.quantity, sell_order.quantity)
 
-            # Update the quantities of the buy and sell orders
-            buy_order.quantity -= matched_quantity
-            sell_order.quantity -= matched_quantity
+            # Update the quantities of the buy and sell orders, their levels and indexes
+            bids.fill(buy_level, buy_order, matched_quantity)
+            asks.fill(sell_level, sell_order, matched_quantity)
 
             # Create a dictionary to represent the matched order
             matched_order = {
@@ -159,8 +581,10 @@ class OrderBook:
                 "sell_order_id": str(sell_order.order_id),
                 "symbol": buy_order.symbol,
                 "quantity": matched_quantity,
-                "price": int(sell_price),
+                "price": sell_price,
                 "timestamp": int(time.time()),
+                "buy_owner": buy_order.owner,
+                "sell_owner": sell_order.owner,
             }
 
             # Add the matched order to the order history
@@ -169,23 +593,32 @@ class OrderBook:
             # Update the last matched price
             self.last_matched_price = sell_price
 
-            # If the buy order has remaining quantity, push it back into the buy orders heap
-            if buy_order.quantity:
-                heapq.heappush(self.buy_orders, (-buy_price, buy_order.timestamp, buy_order))
-            # Otherwise, remove the buy order from the heap
-            else:
-                heapq.heappop(self.buy_orders)
-
-            # If the sell order has remaining quantity, push it back into the sell orders heap
-            if sell_order.quantity:
-                heapq.heappush(self.sell_orders, (sell_price, sell_order.timestamp, sell_order))
-            # Otherwise, remove the sell order from the heap
-            else:
-                heapq.heappop(self.sell_orders)
-
-            # Execute the buy and sell orders
-            buy_order.execute(0)
-            sell_order.execute(0)
+            # A partially filled order keeps its place at the front of its level;
+            # an iceberg whose clip is filled is refilled at the back of its level,
+            # and only fully filled orders are removed from the book.
+            if not buy_order.quantity:
+                if buy_order.hidden_quantity:
+                    bids.replenish(buy_level, buy_order)
+                else:
+                    bids.pop_best_order()
+                    del self.orders_by_id[buy_order.order_id]
+                    if buy_order.owner is not None:
+                        self._unown(buy_order)
+            if not sell_order.quantity:
+                if sell_order.hidden_quantity:
+                    asks.replenish(sell_level, sell_order)
+                else:
+                    asks.pop_best_order()
+                    del self.orders_by_id[sell_order.order_id]
+                    if sell_order.owner is not None:
+                        self._unown(sell_order)
+
+            # Execute the buy and sell orders with their arrival-to-fill latency in seconds
+            fill_ns = perf_counter_ns()
+            buy_latency_ns = fill_ns - buy_order.arrival_ns if buy_order.arrival_ns is not None else 0
+            sell_latency_ns = fill_ns - sell_order.arrival_ns if sell_order.arrival_ns is not None else 0
+            buy_order.execute(buy_latency_ns / 1e9)
+            sell_order.execute(sell_latency_ns / 1e9)
 
             # Log the match
             logging.info(
@@ -196,94 +629,530 @@ class OrderBook:
             # Add the matched order to the list of matched orders
             matched.append((buy_order, sell_order, matched_quantity))
 
-            # Print a message for each iteration
-            print("Orders matched.")
+            for listener in self.listeners:
+                listener.orders_matched(buy_order, sell_order, matched_quantity, sell_price)
+
+            if metrics is not None:
+                metrics.histograms["fill"].record(perf_counter_ns() - fill_start_ns)
+                metrics.histograms["order_latency"].record(buy_latency_ns)
+                metrics.histograms["order_latency"].record(sell_latency_ns)
+                metrics.counters["fills"] += 1
+                metrics.counters["filled_quantity"] += matched_quantity
+
+        if metrics is not None:
+            metrics.histograms["match"].record(perf_counter_ns() - pass_start_ns)
+            metrics.counters["match_passes"] += 1
 
-        # Print a completion message
-        print("Order matching completed.")
+        logging.debug("Order matching completed.")
 
         # Return the list of matched orders
         return matched
 
+    def indicative_auction(self) -> Optional[AuctionResult]:
+        """
+        Returns the price and volume a call auction would execute now, without trading.
+
+        Returns:
+            AuctionResult: The clearing price, volume, demand and supply, or None if the book is not crossed.
+        """
+        return clearing_price(self.bids, self.asks, self.last_matched_price)
+
+    def run_auction(self, allocation="fifo") -> List[Tuple[Order, Order, int]]:
+        """
+        Uncrosses the book in one call auction at a single clearing price.
+
+        The clearing price maximizes the executed volume over the aggregated
+        demand and supply curves (see auction.py). The volume is allocated to
+        each side's eligible orders in one sweep and the two allocations are
+        paired in priority order, so every fill trades at the clearing price.
+        Fills are recorded and reported to listeners as in match_orders(), but
+        the price levels are settled once per side after the sweep, so
+        listeners see the orders' reduced quantities before the levels.
+        One aggregate line is logged per auction. Stops triggered by the
+        clearing price join the book for the next match pass. Only displayed
+        quantity takes part; iceberg clips refilled by the auction trade in
+        the next match pass.
+
+        Args:
+            allocation (str, optional): How the marginal price level of the side with
+                surplus quantity is shared: "fifo" (time priority) or "pro_rata". Defaults to "fifo".
+
+        Returns:
+            List[Tuple[Order, Order, int]]: The (buy order, sell order, quantity) fills.
+
+        Raises:
+            ValueError: If the allocation method is unknown.
+        """
+        with self.profiler.section("match"):
+            self.expire_orders()
+            matched = self._run_auction(allocation)
+            if matched and self.stops:
+                # Triggered stops join the book for the next pass
+                self._activate_stops(self.last_matched_price, self.last_matched_price)
+        if self.snapshot is not None:
+            self.snapshot.publish(self)
+        if self.tape is not None:
+            self.tape.flush()
+        return matched
+
+    def _run_auction(self, allocation) -> List[Tuple[Order, Order, int]]:
+        matched: List[Tuple[Order, Order, int]] = []
+        metrics = self.metrics
+        perf_counter_ns = time.perf_counter_ns
+        pass_start_ns = perf_counter_ns()
+
+        if allocation not in ALLOCATIONS:
+            raise ValueError(f"Allocation must be one of {', '.join(ALLOCATIONS)}")
+
+        bids, asks = self.bids, self.asks
+        result = clearing_price(bids, asks, self.last_matched_price)
+        if result is None:
+            return matched
+        price = result.price
+        buy_fills = allocate(bids, price, result.volume, allocation)
+        sell_fills = allocate(asks, price, result.volume, allocation)
+
+        history = self.order_history
+        orders_by_id = self.orders_by_id
+        timestamp = int(time.time())
+        fill_ns = perf_counter_ns()
+        buy_index = sell_index = 0
+        _, buy_order, buy_left = buy_fills[0]
+        _, sell_order, sell_left = sell_fills[0]
+        while True:
+            # Reduce the orders only; the levels and indexes are settled once per side below
+            matched_quantity = min(buy_left, sell_left)
+            buy_order.quantity -= matched_quantity
+            sell_order.quantity -= matched_quantity
+            buy_left -= matched_quantity
+            sell_left -= matched_quantity
+
+            history.appendleft({
+                "buy_order_id": str(buy_order.order_id),
+                "sell_order_id": str(sell_order.order_id),
+                "symbol": buy_order.symbol,
+                "quantity": matched_quantity,
+                "price": price,
+                "timestamp": timestamp,
+                "buy_owner": buy_order.owner,
+                "sell_owner": sell_order.owner,
+            })
+
+            if not buy_order.total_quantity:
+                del orders_by_id[buy_order.order_id]
+                if buy_order.owner is not None:
+                    self._unown(buy_order)
+            if not sell_order.total_quantity:
+                del orders_by_id[sell_order.order_id]
+                if sell_order.owner is not None:
+                    self._unown(sell_order)
+
+            buy_latency_ns = fill_ns - buy_order.arrival_ns if buy_order.arrival_ns is not None else 0
+            sell_latency_ns = fill_ns - sell_order.arrival_ns if sell_order.arrival_ns is not None else 0
+            buy_order.execute(buy_latency_ns / 1e9)
+            sell_order.execute(sell_latency_ns / 1e9)
+
+            matched.append((buy_order, sell_order, matched_quantity))
+            for listener in self.listeners:
+                listener.orders_matched(buy_order, sell_order, matched_quantity, price)
+
+            if metrics is not None:
+                metrics.histograms["order_latency"].record(buy_latency_ns)
+                metrics.histograms["order_latency"].record(sell_latency_ns)
+
+            # Both allocations sum to the auction volume, so they run out together
+            if not buy_left:
+                buy_index += 1
+                if buy_index == len(buy_fills):
+                    break
+                _, buy_order, buy_left = buy_fills[buy_index]
+            if not sell_left:
+                sell_index += 1
+                _, sell_order, sell_left = sell_fills[sell_index]
+
+        bids.settle(buy_fills)
+        asks.settle(sell_fills)
+        self.last_matched_price = price
+        logging.info(f"Auction uncrossed {result.volume} units at {price} in {len(matched)} fills "
+                     f"({allocation}, imbalance {result.imbalance})")
+
+        if metrics is not None:
+            metrics.histograms["match"].record(perf_counter_ns() - pass_start_ns)
+            metrics.counters["match_passes"] += 1
+            metrics.counters["fills"] += len(matched)
+            metrics.counters["filled_quantity"] += result.volume
+        return matched
+
+    def _prevent_self_trade(self, buy_level, buy_order, sell_level, sell_order):
+        """
+        Stops two orders of the same owner at the front of the best levels from trading.
+
+        Depending on self.self_trade_prevention, the newer or older of the two
+        is cancelled, or the smaller quantity is taken off both without a trade
+        and whichever order runs out is cancelled.
+        """
+        mode = self.self_trade_prevention
+        if mode == "decrement_both":
+            quantity = min(buy_order.quantity, sell_order.quantity)
+            for side, level, order in ((self.bids, buy_level, buy_order), (self.asks, sell_level, sell_order)):
+                side.fill(level, order, quantity)
+                for listener in self.listeners:
+                    listener.order_reduced(order, quantity)
+                if not order.quantity:
+                    if order.hidden_quantity:
+                        side.replenish(level, order)
+                    else:
+                        self._cancel_best(side, order)
+        else:
+            buy_is_newer = buy_order.arrival_ns > sell_order.arrival_ns
+            if (mode == "cancel_newest") == buy_is_newer:
+                self._cancel_best(self.bids, buy_order)
+            else:
+                self._cancel_best(self.asks, sell_order)
+        logging.info(f"Self-trade prevented ({mode}) between buy order {buy_order.order_id} "
+                     f"and sell order {sell_order.order_id} of {buy_order.owner}")
+        if self.metrics is not None:
+            self.metrics.counters["self_trades_prevented"] += 1
+
+    def _cancel_best(self, side, order):
+        # Cancel the order at the front of a side's best level
+        side.pop_best_order()
+        del self.orders_by_id[order.order_id]
+        if order.time_in_force == "day":
+            self.day_orders.pop(order.order_id, None)
+        self._unown(order)
+        order.cancel()
+        for listener in self.listeners:
+            listener.order_cancelled(order)
+
     def get_order_book(self) -> Dict[str, List[Order]]:
         """
         Returns a dictionary representation of the order book.
 
+        This copies every resting order; views that only show part of the book
+        should use get_depth(), iter_orders() or get_orders_in_range() instead.
+
         Returns:
             Dict[str, List[Order]]: A dictionary with keys "buy_orders" and "sell_orders",
-            each containing a list of Order objects.
+            each containing a list of Order objects in priority order.
         """
         return {
-            "buy_orders": [order for _, _, order in self.buy_orders],
-            "sell_orders": [order for _, _, order in self.sell_orders]
+            "buy_orders": list(self.bids.iter_orders()),
+            "sell_orders": list(self.asks.iter_orders())
         }
 
+    def _side(self, side) -> BookSide:
+        if side == "buy":
+            return self.bids
+        if side == "sell":
+            return self.asks
+        raise ValueError("Side must be either 'buy' or 'sell'")
+
+    def count_orders(self, side) -> int:
+        """Returns the number of resting orders on the given side ("buy" or "sell")."""
+        return len(self._side(side))
+
+    def get_depth(self, levels=10) -> Dict[str, List[Tuple[float, int, int]]]:
+        """
+        Returns the aggregated depth of the best price levels on each side.
+
+        Only the requested levels are visited, so the cost depends on the number
+        of levels asked for rather than the size of the book.
+
+        Args:
+            levels (int, optional): Number of levels per side. Defaults to 10.
+
+        Returns:
+            Dict[str, List[Tuple[float, int, int]]]: A dictionary with keys "bids" and
+            "asks", each a list of (price, total quantity, order count), best first.
+        """
+        return {"bids": self.bids.depth(levels), "asks": self.asks.depth(levels)}
+
+    def iter_orders(self, side, start=0, limit=None) -> Iterator[Order]:
+        """
+        Iterates over one side's resting orders in priority order.
+
+        Levels before the start offset are skipped as a whole, so fetching a page
+        only walks the levels overlapping it. The book must not be modified while
+        the iterator is in use.
+
+        Args:
+            side (str): "buy" or "sell".
+            start (int, optional): Number of orders to skip. Defaults to 0.
+            limit (int, optional): Maximum number of orders to return. Defaults to all.
+
+        Returns:
+            Iterator[Order]: The orders, best price and oldest first.
+        """
+        return self._side(side).iter_orders(start, limit)
+
+    def filter_orders(self, side, min_price=None, max_price=None, min_quantity=None, max_quantity=None) -> List[Order]:
+        """
+        Returns one side's resting orders inside the given price and quantity bounds.
+
+        Price bounds are served by bisecting the sorted price levels and quantity
+        bounds by the side's quantity index, starting from whichever yields fewer
+        candidates, so a filter costs about as much as the rows it could return
+        rather than a scan of the book.
+
+        Args:
+            side (str): "buy" or "sell".
+            min_price (float, optional): Lowest price to include. Defaults to no bound.
+            max_price (float, optional): Highest price to include. Defaults to no bound.
+            min_quantity (int, optional): Lowest remaining quantity to include. Defaults to no bound.
+            max_quantity (int, optional): Highest remaining quantity to include. Defaults to no bound.
+
+        Returns:
+            List[Order]: The matching orders in priority order.
+        """
+        return self._side(side).filter_orders(min_price, max_price, min_quantity, max_quantity)
+
+    def get_orders_in_range(self, side, min_price=None, max_price=None, limit=None) -> List[Order]:
+        """
+        Returns one side's resting orders with prices in [min_price, max_price].
+
+        The price bounds are found by bisecting the sorted price levels, so levels
+        outside the range are never visited.
+
+        Args:
+            side (str): "buy" or "sell".
+            min_price (float, optional): Lowest price to include. Defaults to no bound.
+            max_price (float, optional): Highest price to include. Defaults to no bound.
+            limit (int, optional): Maximum number of orders to return. Defaults to all.
+
+        Returns:
+            List[Order]: The matching orders in priority order.
+        """
+        orders = []
+        for level in self._side(side).levels_in_range(min_price, max_price):
+            orders.extend(level.orders)
+            if limit is not None and len(orders) >= limit:
+                return orders[:limit]
+        return orders
+
     def get_order_history(self):
         return list(self.order_history)
 
-    def validate_order(self, order):
-        if order.price <= 0 or order.quantity <= 0:
-            raise ValueError("Price and quantity must be greater than zero")
-        if order.side not in ["buy", "sell"]:
-            raise ValueError("Side must be either 'buy' or 'sell'")
+    def add_listener(self, listener):
+        """Registers a BookListener to be notified of adds, cancels and fills."""
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def enable_instrumentation(self):
+        """Start recording latency histograms and counters, keeping any already collected."""
+        if self.metrics is None:
+            self.metrics = BookMetrics()
+
+    def disable_instrumentation(self):
+        """Stop recording latency histograms and counters and drop the collected data."""
+        self.metrics = None
+
+    def stats(self):
+        """
+        Returns a snapshot of the order book's counters and latency histograms.
 
-    def add_user(self, username, password, role):
+        Returns:
+            dict: The BookMetrics.stats() snapshot plus the current book depth, or
+            just the depth with "instrumented" set to False if instrumentation is off.
         """
-        Adds a new user to the system with the specified username, password, and role.
+        snapshot = self.metrics.stats() if self.metrics is not None else {}
+        snapshot["instrumented"] = self.metrics is not None
+        snapshot["resting_buy_orders"] = len(self.bids)
+        snapshot["resting_sell_orders"] = len(self.asks)
+        snapshot["dormant_stops"] = len(self.stops)
+        return snapshot
+
+    def dump_prometheus(self, filename='order_book.prom'):
+        """
+        Writes the collected metrics to a file in the Prometheus text format.
 
-        Parameters:
-            username (str): The username of the new user.
-            password (str): The password of the new user.
-            role (str): The role of the new user, which must be 'admin', 'trader', or 'viewer'.
+        Args:
+            filename (str, optional): Path of the file to write. Defaults to 'order_book.prom'.
 
         Returns:
-            None
+            str: The filename that was written.
+
+        Raises:
+            RuntimeError: If instrumentation is not enabled.
         """
-        if role not in ["admin", "trader", "viewer"]:
-            raise ValueError("Role must be either 'admin', 'trader', or 'viewer']")
-        user = User(username, password, role)
-        self.users.append(user)
-        logging.info(f"User added: {user}")
+        if self.metrics is None:
+            raise RuntimeError("Instrumentation is not enabled")
+        return self.metrics.dump_prometheus(filename)
 
-    def authenticate_user(self, username, password):
+    def start_profiling(self, mode="cprofile", trace_memory=False, output_dir=None):
         """
-        Authenticates a user with the given username and password.
+        Starts a profiling session covering matching and any GUI or export sections.
 
         Args:
-            username (str): The username of the user.
-            password (str): The password of the user.
+            mode (str, optional): "cprofile" for deterministic profiling or "sampling"
+                for collapsed stack samples. Defaults to "cprofile".
+            trace_memory (bool, optional): Whether to trace allocations so that
+                snapshot_memory() can be used. Defaults to False.
+            output_dir (str, optional): Directory for the profile files. Defaults to
+                the profiler's current directory ('profiles').
+        """
+        if output_dir is not None:
+            self.profiler.output_dir = output_dir
+        self.profiler.start(mode=mode, trace_memory=trace_memory)
+
+    def stop_profiling(self):
+        """
+        Stops the profiling session and writes its files.
 
         Returns:
-            bool: True if the user is authenticated successfully, False otherwise.
-        """
-        # Iterate through the list of users
-        for user in self.users:
-            # Check if the username and password match
-            if user.username == username and user.check_password(password):
-                # Set the current user to the authenticated user
-                self.current_user = user
-                # Log the successful authentication
-                logging.info(f"User authenticated: {user}")
-                # Return True to indicate successful authentication
-                return True
-        # Log the failed authentication attempt
-        logging.warning(f"Authentication failed for user: {username}")
-        # Return False to indicate failed authentication
-        return False
-
-    def get_current_user_role(self):
-        return self.current_user.role if self.current_user else None
-
-def fetch_current_prices(symbols):
+            list: Paths of the files written, empty if no session was running.
+        """
+        return self.profiler.stop()
+
+    def is_profiling(self):
+        return self.profiler.enabled
+
+    def snapshot_memory(self):
+        """
+        Writes a tracemalloc report of memory growth along with the sizes of the book structures.
+
+        Returns:
+            str: Path of the report that was written.
+        """
+        return self.profiler.snapshot_memory(context={
+            "buy_orders": len(self.bids),
+            "sell_orders": len(self.asks),
+            "buy_levels": len(self.bids.levels),
+            "sell_levels": len(self.asks.levels),
+            "order_history": len(self.order_history),
+        })
+
+    def enable_snapshot(self, name=None, depth=10, trades=50):
+        """
+        Starts publishing the book to a shared memory segment after every match pass.
+
+        Readers in other processes attach with book_snapshot.BookSnapshotReader(name).
+
+        Args:
+            name (str, optional): Name of the segment. Defaults to a random name.
+            depth (int, optional): Number of price levels published per side. Defaults to 10.
+            trades (int, optional): Number of recent trades published. Defaults to 50.
+
+        Returns:
+            str: The name of the segment.
+        """
+        if self.snapshot is None:
+            # Imported here so the book itself loads without multiprocessing.shared_memory
+            from book_snapshot import BookSnapshotWriter
+            self.snapshot = BookSnapshotWriter(name, depth, trades)
+            self.snapshot.publish(self)
+        return self.snapshot.name
+
+    def publish_snapshot(self):
+        """Publishes the current state now, e.g. after adds or cancels with no match pass."""
+        if self.snapshot is not None:
+            self.snapshot.publish(self)
+
+    def disable_snapshot(self):
+        """Stops publishing and removes the shared memory segment."""
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+
+    def state_digest(self) -> str:
+        """
+        Returns a digest of the book's open orders and of its fills in execution order.
+
+        The first call scans the book once and registers a StateDigest
+        listener; from then on the digest is updated in O(1) per add, cancel
+        and fill, and each call is O(1). Fills before the first call are not
+        part of the trade digest.
+
+        Returns:
+            str: A 32-character hex digest; two books agree exactly when their states match.
+        """
+        if self.digest is None:
+            # Imported here so the book itself loads without hashlib
+            from state_digest import StateDigest
+            self.digest = StateDigest.from_book(self)
+            self.add_listener(self.digest)
+        return self.digest.hexdigest()
+
+    def track_changes(self):
+        """
+        Returns the book's change counter, registering it as a listener on the first call.
+
+        Readers such as the GUI compare changes.change_count with the count they
+        last saw, and call changes.dirty(count) for the slices (levels, stats,
+        trades) to redraw, instead of redrawing everything on a timer.
+
+        Returns:
+            BookChanges: The same object on every call.
+        """
+        if self.changes is None:
+            self.changes = BookChanges()
+            self.add_listener(self.changes)
+        return self.changes
+
+    def enable_trade_tape(self, directory, index_interval=1024):
+        """
+        Starts appending every fill to trade tape files under a directory, flushed after every match pass.
+
+        Read the tapes with trade_tape.TradeTapeReader(directory).
+
+        Args:
+            directory (str): The tape directory, created if needed.
+            index_interval (int, optional): Records between sparse index entries. Defaults to 1024.
+        """
+        if self.tape is None:
+            # Imported here so the book itself loads without the tape module
+            from trade_tape import TradeTapeWriter
+            self.tape = TradeTapeWriter(directory, index_interval)
+            self.add_listener(self.tape)
+
+    def disable_trade_tape(self):
+        """Stops recording fills and closes the tape files."""
+        if self.tape is not None:
+            self.remove_listener(self.tape)
+            self.tape.close()
+            self.tape = None
+
+    def validate_order(self, order):
+        if not (math.isfinite(order.price) and math.isfinite(order.quantity)):
+            raise ValueError("Price and quantity must be finite numbers")
+        if order.price <= 0 or order.quantity <= 0:
+            raise ValueError("Price and quantity must be greater than zero")
+        if order.side not in ["buy", "sell"]:
+            raise ValueError("Side must be either 'buy' or 'sell'")
+        if order.order_id in self.orders_by_id or order.order_id in self.stops:
+            raise ValueError(f"Order ID {order.order_id} is already in the book")
+        if order.stop_price is not None and not math.isfinite(order.stop_price):
+            raise ValueError("Stop price must be a finite number")
+        if order.order_type in STOP_ORDER_TYPES and not (order.stop_price and order.stop_price > 0):
+            raise ValueError("Stop orders need a stop price greater than zero")
+        if order.display_quantity is not None and order.display_quantity <= 0:
+            raise ValueError("Display quantity must be greater than zero")
+        if order.time_in_force not in ("gtc", "day", "gtt"):
+            raise ValueError("Time in force must be 'gtc', 'day' or 'gtt'")
+        if order.time_in_force == "gtt" and (order.expire_at is None or not math.isfinite(order.expire_at)
+                                             or order.expire_at <= self.clock()):
+            raise ValueError("GTT orders need an expiry time in the future")
+
+def fetch_current_prices(symbols, store=None):
     """
     Fetches the current prices for a list of symbols.
 
     Args:
         symbols (list): A list of symbols for which to fetch the current prices.
+        store (PriceStore, optional): Reference prices kept up to date by a price feed. Symbols it
+            has no price for yet are given a random starting price, stored so later calls agree.
+            Defaults to None, which draws a fresh random price for every symbol.
 
     Returns:
-        dict: A dictionary mapping each symbol to its current price, which is a random float between 100 and 500.
+        dict: A dictionary mapping each symbol to its current price; random prices are between 100 and 500.
     """
+    if store is not None:
+        for symbol in symbols:
+            if symbol not in store:
+                store.update(symbol, random.uniform(100, 500))
+        return store.prices_for(symbols)
     prices = {}
     for symbol in symbols:
         prices[symbol] = random.uniform(100, 500)
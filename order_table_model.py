@@ -0,0 +1,89 @@
+"""
+This module contains the virtualized table model behind the GUI's buy and sell order views.
+"""
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+
+class OrderTableModel(QAbstractTableModel):
+    HEADERS = ["Order ID", "Qty", "Exec Time"]
+
+    def __init__(self, label, window_size=200):
+        """
+        Initialize a new OrderTableModel object.
+
+        The model never holds the whole side of the book. It reports the total
+        row count so the view can size its scrollbar, and when the view asks
+        for a row outside the cached window it fetches a new window of
+        window_size orders around that row. Views only request the rows they
+        paint, so a refresh costs one window fetch regardless of book size.
+
+        Args:
+            label (str): Header text of the price column, e.g. "Buy Orders".
+            window_size (int, optional): Number of orders fetched at a time. Defaults to 200.
+        """
+        super().__init__()
+        self.headers = [label] + self.HEADERS
+        self.window_size = window_size
+        self._count = 0
+        self._fetch = None
+        self._window_start = 0
+        self._window = []
+
+    def set_source(self, count, fetch):
+        """
+        Replace the rows shown by the model.
+
+        Args:
+            count (int): Total number of rows.
+            fetch (callable): fetch(start, limit) returning a list of up to limit
+                orders starting at row start.
+        """
+        self.beginResetModel()
+        self._count = count
+        self._fetch = fetch
+        self._window_start = 0
+        self._window = []
+        self.endResetModel()
+
+    def set_orders(self, orders):
+        """Show a list of orders that has already been materialized."""
+        self.set_source(len(orders), lambda start, limit: orders[start:start + limit])
+
+    def order_at(self, row):
+        """Return the order at the given row, fetching a new window if it is not cached."""
+        offset = row - self._window_start
+        if not 0 <= offset < len(self._window):
+            # Start the window a little above the row so scrolling up stays cached too
+            self._window_start = max(0, row - self.window_size // 4)
+            self._window = self._fetch(self._window_start, self.window_size)
+            offset = row - self._window_start
+            if offset >= len(self._window):
+                return None
+        return self._window[offset]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        order = self.order_at(index.row())
+        if order is None:
+            return None
+        column = index.column()
+        if column == 0:
+            return f"{order.price:.2f}"
+        if column == 1:
+            return str(order.order_id)
+        if column == 2:
+            return str(order.quantity)
+        return f"{order.execution_time:.4f} s" if order.execution_time else "N/A"
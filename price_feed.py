@@ -0,0 +1,223 @@
+"""
+This module provides reference prices: feeds producing price ticks and a store holding the latest price per symbol.
+
+A feed publishes ticks into a PriceStore with poll(). Two feeds are provided:
+
+- RandomWalkFeed: a deterministic simulated geometric random walk per
+  symbol, so a seed reproduces the same prices on every run.
+- ReplayFeed: replays a recorded tick file (CSV with timestamp, symbol and
+  price columns, or Parquet with the same columns). The file is memory
+  mapped and read one tick at a time, so it is never loaded or parsed as a
+  whole.
+
+The PriceStore is a plain dictionary of the latest price by symbol, so
+reading a reference price is a single dictionary lookup however often the
+order generators and risk checks ask. Subscribers are called on every
+update, for all symbols or for one.
+
+Select a feed with CLOB_PRICE_FEED (see feed_from_env): a path to a tick
+file replays it; anything else, or nothing, runs the random walk.
+"""
+
+import csv
+import math
+import mmap
+import os
+import random
+
+TICK_COLUMNS = ["timestamp", "symbol", "price"]  # Columns of a tick file
+
+
+class PriceStore:
+    def __init__(self):
+        """Initialize a new PriceStore object with no prices and no subscribers."""
+        self.prices = {}  # Symbol -> latest price
+        self.timestamps = {}  # Symbol -> timestamp of the latest price
+        self.subscribers = {}  # Symbol, or None for every symbol -> list of callbacks
+
+    def __contains__(self, symbol):
+        return symbol in self.prices
+
+    def get(self, symbol, default=None):
+        """Return the latest price of a symbol, or default if it has none yet."""
+        return self.prices.get(symbol, default)
+
+    def prices_for(self, symbols):
+        """Return a dictionary of the latest price of each of the given symbols that has one."""
+        prices = self.prices
+        return {symbol: prices[symbol] for symbol in symbols if symbol in prices}
+
+    def update(self, symbol, price, timestamp=None):
+        """
+        Store the latest price of a symbol and call its subscribers.
+
+        Args:
+            symbol (str): The symbol.
+            price (float): The new price.
+            timestamp (float, optional): When the price was observed. Defaults to None.
+        """
+        self.prices[symbol] = price
+        self.timestamps[symbol] = timestamp
+        if self.subscribers:
+            for callback in self.subscribers.get(symbol, ()):
+                callback(symbol, price, timestamp)
+            for callback in self.subscribers.get(None, ()):
+                callback(symbol, price, timestamp)
+
+    def subscribe(self, callback, symbol=None):
+        """
+        Call callback(symbol, price, timestamp) on every update of a symbol.
+
+        Args:
+            callback (callable): The function to call.
+            symbol (str, optional): The symbol to follow. Defaults to every symbol.
+        """
+        self.subscribers.setdefault(symbol, []).append(callback)
+
+    def unsubscribe(self, callback, symbol=None):
+        """Stop calling a callback registered with subscribe() for the same symbol."""
+        callbacks = self.subscribers.get(symbol, [])
+        callbacks.remove(callback)
+        if not callbacks:
+            del self.subscribers[symbol]
+
+
+class RandomWalkFeed:
+    def __init__(self, symbols, seed=None, start_prices=None, volatility=0.001, tick_size=0.01):
+        """
+        Initialize a new RandomWalkFeed object.
+
+        Args:
+            symbols (list): The symbols to simulate.
+            seed (int, optional): Seed of the feed's own random generator. Defaults to None (not reproducible).
+            start_prices (dict, optional): Starting price by symbol. Defaults to a price between 100
+                and 500 drawn from the seeded generator.
+            volatility (float, optional): Standard deviation of each step's log return. Defaults to 0.001.
+            tick_size (float, optional): Prices are rounded to this increment. Defaults to 0.01.
+        """
+        self.symbols = list(symbols)
+        self.random = random.Random(seed)
+        self.volatility = volatility
+        self.tick_size = tick_size
+        self.decimals = max(0, math.ceil(-math.log10(tick_size)))  # Trims float noise off rounded prices
+        start_prices = start_prices or {}
+        self.prices = {symbol: start_prices.get(symbol) or round(self.random.uniform(100, 500), 2)
+                       for symbol in self.symbols}
+        self.steps = 0
+
+    def poll(self, store, steps=1):
+        """
+        Advance every symbol by the given number of steps and publish the final prices.
+
+        Args:
+            store (PriceStore): The store to publish to.
+            steps (int, optional): Random-walk steps to take. Defaults to 1.
+
+        Returns:
+            int: The number of ticks published (one per symbol).
+        """
+        gauss = self.random.gauss
+        sigma = self.volatility * math.sqrt(steps)  # Steps of independent log returns add up in variance
+        tick_size, decimals = self.tick_size, self.decimals
+        self.steps += steps
+        for symbol, price in self.prices.items():
+            price = max(tick_size, round(round(price * math.exp(gauss(0.0, sigma)) / tick_size) * tick_size, decimals))
+            self.prices[symbol] = price
+            store.update(symbol, price, self.steps)
+        return len(self.prices)
+
+
+class ReplayFeed:
+    def __init__(self, filename, batch=100):
+        """
+        Initialize a new ReplayFeed object replaying a tick file from its start.
+
+        Files ending in .parquet are read with pyarrow, which is only imported
+        for them; any other file is read as CSV with a TICK_COLUMNS header.
+
+        Args:
+            filename (str): The tick file.
+            batch (int, optional): Ticks published by a poll() given neither limit nor until. Defaults to 100.
+        """
+        self.filename = filename
+        self.batch = batch
+        self.ticks = self._read_parquet() if filename.endswith(".parquet") else self._read_csv()
+        self.pending = None  # Tick read past the end of the last poll
+        self.exhausted = False
+
+    def _read_csv(self):
+        with open(self.filename, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                columns = data.readline().decode().strip().split(",")
+                if columns != TICK_COLUMNS:
+                    raise ValueError(f"Tick file {self.filename} must have the columns {', '.join(TICK_COLUMNS)}")
+                for line in iter(data.readline, b""):
+                    timestamp, symbol, price = line.split(b",")
+                    yield float(timestamp), symbol.decode(), float(price)
+
+    def _read_parquet(self):
+        import pyarrow.parquet as pq
+
+        # memory_map reads the column pages straight from the mapped file
+        table = pq.read_table(self.filename, columns=TICK_COLUMNS, memory_map=True)
+        for batch in table.to_batches():
+            yield from zip(*(batch.column(name).to_pylist() for name in TICK_COLUMNS))
+
+    def poll(self, store, limit=None, until=None):
+        """
+        Publish the next ticks of the file.
+
+        Args:
+            store (PriceStore): The store to publish to.
+            limit (int, optional): Most ticks to publish. Defaults to the feed's batch size,
+                or to no limit when until is given.
+            until (float, optional): Only publish ticks with timestamps up to this one. Defaults to no bound.
+
+        Returns:
+            int: The number of ticks published; 0 once the file is exhausted.
+        """
+        if limit is None and until is None:
+            limit = self.batch
+        published = 0
+        while limit is None or published < limit:
+            tick = self.pending
+            self.pending = None
+            if tick is None:
+                tick = next(self.ticks, None)
+                if tick is None:
+                    self.exhausted = True
+                    break
+            if until is not None and tick[0] > until:
+                self.pending = tick
+                break
+            timestamp, symbol, price = tick
+            store.update(symbol, price, timestamp)
+            published += 1
+        return published
+
+
+def write_ticks(filename, ticks):
+    """
+    Write ticks to a CSV tick file that ReplayFeed can replay.
+
+    Args:
+        filename (str): The file to write.
+        ticks (iterable): (timestamp, symbol, price) tuples in time order.
+    """
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(TICK_COLUMNS)
+        writer.writerows(ticks)
+
+
+def feed_from_env(symbols, seed=None):
+    """
+    Create the feed selected by CLOB_PRICE_FEED: a ReplayFeed when it names a
+    tick file, otherwise a RandomWalkFeed over the given symbols.
+    """
+    filename = os.environ.get("CLOB_PRICE_FEED")
+    if filename and os.path.exists(filename):
+        return ReplayFeed(filename)
+    return RandomWalkFeed(symbols, seed=seed)
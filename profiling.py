@@ -0,0 +1,279 @@
+"""
+This module contains the opt-in session profiler used by the order book, the GUI and the exporter.
+
+Profiling is off by default. It can be switched on at runtime through
+OrderBook.start_profiling(), the "Profiling" toolbar action in OrderBookGUI,
+or at startup with the CLOB_PROFILE environment variable:
+
+- CLOB_PROFILE=cprofile (or 1): deterministic cProfile, written as a .pstats file.
+- CLOB_PROFILE=sampling: a background thread samples the stacks of threads inside
+  a profiled section and writes collapsed stacks for flamegraph.pl or speedscope.
+- CLOB_PROFILE_DIR: output directory, defaults to "profiles".
+- CLOB_PROFILE_TRACEMALLOC=1: also trace allocations so memory snapshots can be taken.
+
+cProfile, pstats and tracemalloc are imported when a session needs them,
+so importing the order book does not pay for them.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+# Shared no-op context returned by section() while profiling is off
+_NO_PROFILE = nullcontext()
+
+
+class SessionProfiler:
+    def __init__(self, output_dir='profiles', sample_interval=0.005):
+        """
+        Initialize a new SessionProfiler object.
+
+        Args:
+            output_dir (str, optional): Directory the profile files are written to. Defaults to 'profiles'.
+            sample_interval (float, optional): Seconds between stack samples in sampling mode. Defaults to 0.005.
+        """
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.enabled = False
+        self.mode = None
+        self.session_id = None
+        self.trace_memory = False
+
+        self._profile = None
+        self._profile_thread = None  # Thread id with cProfile switched on, if any
+        self._local = threading.local()  # Per-thread section nesting depth
+        self._lock = threading.Lock()  # Guards _profile_thread and the section totals
+        self._active = {}  # thread id -> stack of section names currently entered
+        self._samples = Counter()
+        self._sampler = None
+        self._stop_event = threading.Event()
+        self._section_calls = Counter()
+        self._section_ns = defaultdict(int)
+        self._memory_baseline = None
+        self._memory_snapshots = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create a profiler configured from the CLOB_PROFILE* environment variables.
+
+        An unknown CLOB_PROFILE mode is logged as a warning and leaves profiling
+        off, so a typo in the environment cannot stop an order book being created.
+
+        Returns:
+            SessionProfiler: A profiler that is already started if CLOB_PROFILE names a valid mode.
+        """
+        profiler = cls(output_dir=os.environ.get("CLOB_PROFILE_DIR", "profiles"))
+        mode = os.environ.get("CLOB_PROFILE", "").strip().lower()
+        if mode and mode not in ("0", "false", "off"):
+            mode = "cprofile" if mode in ("1", "true", "on") else mode
+            if mode not in PROFILE_MODES:
+                logging.warning(f"Ignoring CLOB_PROFILE={mode!r}: profile mode must be one of {PROFILE_MODES}")
+                return profiler
+            profiler.start(mode=mode, trace_memory=os.environ.get("CLOB_PROFILE_TRACEMALLOC") == "1")
+        return profiler
+
+    def start(self, mode="cprofile", trace_memory=False):
+        """
+        Start a new profiling session.
+
+        Args:
+            mode (str, optional): "cprofile" or "sampling". Defaults to "cprofile".
+            trace_memory (bool, optional): Whether to start tracemalloc for memory snapshots. Defaults to False.
+
+        Raises:
+            ValueError: If the mode is unknown.
+            RuntimeError: If a session is already running.
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Profile mode must be one of {PROFILE_MODES}")
+        if self.enabled:
+            raise RuntimeError("Profiling session already running")
+
+        self.mode = mode
+        self.session_id = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+        self._samples.clear()
+        self._section_calls.clear()
+        self._section_ns.clear()
+        self._memory_snapshots = 0
+
+        if mode == "cprofile":
+            import cProfile
+            self._profile = cProfile.Profile()
+        else:
+            self._stop_event.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="clob-profiler", daemon=True)
+            self._sampler.start()
+
+        self.trace_memory = trace_memory
+        if trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+            self._memory_baseline = tracemalloc.take_snapshot()
+
+        self.enabled = True
+        logging.info(f"Profiling session {self.session_id} started in {mode} mode")
+
+    def stop(self):
+        """
+        Stop the running session and write its profile files.
+
+        Returns:
+            list: Paths of the files written for the session.
+        """
+        if not self.enabled:
+            return []
+        self.enabled = False
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, self.session_id)
+        written = []
+
+        if self.mode == "cprofile":
+            self._profile.dump_stats(f"{base}.pstats")
+            written.append(f"{base}.pstats")
+            import io
+            import pstats
+            report = io.StringIO()
+            # pstats refuses an empty profile, as left by a session with no profiled sections
+            if self._section_calls:
+                pstats.Stats(self._profile, stream=report).sort_stats("cumulative").print_stats(50)
+            with open(f"{base}.txt", "w") as f:
+                f.write(report.getvalue())
+            written.append(f"{base}.txt")
+            self._profile = None
+        else:
+            self._stop_event.set()
+            self._sampler.join()
+            self._sampler = None
+            with open(f"{base}.collapsed", "w") as f:
+                for stack, count in self._samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            written.append(f"{base}.collapsed")
+
+        with open(f"{base}-sections.txt", "w") as f:
+            f.write(f"{'section':<20}{'calls':>10}{'total_s':>14}{'mean_ms':>12}\n")
+            for name, calls in self._section_calls.most_common():
+                total_s = self._section_ns[name] / 1e9
+                f.write(f"{name:<20}{calls:>10}{total_s:>14.6f}{total_s / calls * 1000:>12.3f}\n")
+        written.append(f"{base}-sections.txt")
+
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.stop()
+            self._memory_baseline = None
+            self.trace_memory = False
+
+        logging.info(f"Profiling session {self.session_id} written to {written}")
+        return written
+
+    def section(self, name):
+        """
+        Return a context manager that profiles the enclosed block under the given name.
+
+        While profiling is off this returns a shared no-op context, so callers
+        can wrap hot paths unconditionally.
+
+        Args:
+            name (str): The section name, e.g. "match", "gui_refresh" or "export".
+        """
+        if not self.enabled:
+            return _NO_PROFILE
+        return self._profiled_section(name)
+
+    @contextmanager
+    def _profiled_section(self, name):
+        thread_id = threading.get_ident()
+        sections = self._active.setdefault(thread_id, [])
+        sections.append(name)
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        # cProfile only follows the thread that enabled it, so it is switched on
+        # by a thread's outermost section and left alone by nested ones. One
+        # Profile cannot run in two threads at once; a thread entering while
+        # another has it on is timed but not profiled.
+        profile = None
+        if depth == 0 and self._profile is not None:
+            with self._lock:
+                if self._profile_thread is None:
+                    self._profile_thread = thread_id
+                    profile = self._profile
+        local.depth = depth + 1
+        if profile is not None:
+            profile.enable()
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed_ns = time.perf_counter_ns() - start_ns
+            if profile is not None:
+                profile.disable()
+            with self._lock:
+                self._section_ns[name] += elapsed_ns
+                self._section_calls[name] += 1
+                if profile is not None:
+                    self._profile_thread = None
+            local.depth = depth
+            sections.pop()
+            if not sections:
+                del self._active[thread_id]
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.sample_interval):
+            frames = sys._current_frames()
+            for thread_id, sections in list(self._active.items()):
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id or not sections:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(sections[0])
+                self._samples[";".join(reversed(stack))] += 1
+
+    def snapshot_memory(self, context=None, limit=25):
+        """
+        Write the allocation growth since the session started to a text file.
+
+        Args:
+            context (dict, optional): Extra "name: value" lines written at the top of the
+                report, such as the sizes of the order book structures.
+            limit (int, optional): Number of source lines to report. Defaults to 25.
+
+        Returns:
+            str: Path of the report that was written.
+
+        Raises:
+            RuntimeError: If the session was not started with trace_memory=True.
+        """
+        if not (self.enabled and self.trace_memory):
+            raise RuntimeError("Memory tracing is not enabled for this profiling session")
+
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        self._memory_snapshots += 1
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        filename = os.path.join(self.output_dir, f"{self.session_id}-memory-{self._memory_snapshots}.txt")
+        with open(filename, "w") as f:
+            f.write(f"traced: {current / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB\n")
+            for name, value in (context or {}).items():
+                f.write(f"{name}: {value}\n")
+            f.write(f"\nTop {limit} allocation sites by growth since session start:\n")
+            for stat in snapshot.compare_to(self._memory_baseline, "lineno")[:limit]:
+                f.write(f"{stat}\n")
+        return filename
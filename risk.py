@@ -0,0 +1,334 @@
+"""
+This module contains the pre-trade risk checks run in front of OrderBook.add_order.
+
+A RiskManager sits between the callers (GUI, Streamlit app, benchmarks) and
+the order book. Before an order reaches the book it checks the user's role,
+the order size, a price band around a reference price, the user's open
+order count, the user's worst-case position in the order's symbol and an
+order rate limit.
+
+Every check is O(1): the RiskManager registers as a BookListener and keeps
+per-user counters (open orders and a token bucket) and per-user, per-symbol
+exposures (open buy and sell quantity and net position) up to date as
+orders are added, filled and cancelled, so nothing is recomputed by
+scanning the book. Positions are kept per symbol because quantities of
+different instruments do not offset: long AAPL and short MSFT is not flat.
+"""
+
+import logging
+import time
+
+from order_book import BookListener
+
+# Actions each role may perform; 'cancel_any' allows cancelling other users' orders
+ROLE_PERMISSIONS = {
+    'admin': frozenset({'trade', 'cancel', 'cancel_any'}),
+    'trader': frozenset({'trade', 'cancel'}),
+    'viewer': frozenset(),
+}
+
+
+class RiskRejected(ValueError):
+    def __init__(self, reason, message):
+        """
+        Raised when an order or cancel fails a pre-trade risk check.
+
+        Args:
+            reason (str): Short machine-readable reason, e.g. 'max_order_quantity'.
+            message (str): Human-readable description of the failure.
+        """
+        super().__init__(message)
+        self.reason = reason
+
+
+class RiskLimits:
+    def __init__(self, max_order_quantity=10_000, price_band=0.10, max_open_orders=1_000,
+                 max_position=100_000, max_orders_per_second=100.0, burst=None):
+        """
+        Initialize a new RiskLimits object. A limit of None disables that check.
+
+        Args:
+            max_order_quantity (int, optional): Largest quantity of a single order. Defaults to 10,000.
+            price_band (float, optional): Largest allowed distance from the reference price, as a
+                fraction of it. Not checked until there is a reference price. Defaults to 0.10.
+            max_open_orders (int, optional): Most resting orders per user. Defaults to 1,000.
+            max_position (int, optional): Largest absolute net position a user could reach in one
+                symbol if all of their resting orders on one side of it filled. Defaults to 100,000.
+            max_orders_per_second (float, optional): Sustained order rate per user. Defaults to 100.
+            burst (int, optional): Orders a user may send at once before the rate applies.
+                Defaults to max_orders_per_second.
+        """
+        self.max_order_quantity = max_order_quantity
+        self.price_band = price_band
+        self.max_open_orders = max_open_orders
+        self.max_position = max_position
+        self.max_orders_per_second = max_orders_per_second
+        self.burst = burst if burst is not None else max_orders_per_second
+
+
+class SymbolExposure:
+    __slots__ = ("open_buy_quantity", "open_sell_quantity", "position")
+
+    def __init__(self):
+        self.open_buy_quantity = 0  # Remaining quantity of resting buy orders in the symbol
+        self.open_sell_quantity = 0  # Remaining quantity of resting sell orders in the symbol
+        self.position = 0  # Net filled quantity in the symbol, bought minus sold
+
+    def __repr__(self):
+        return (f"SymbolExposure(open_buy_quantity={self.open_buy_quantity}, "
+                f"open_sell_quantity={self.open_sell_quantity}, position={self.position})")
+
+
+class UserRiskState:
+    __slots__ = ("open_orders", "exposures", "tokens", "last_refill")
+
+    def __init__(self, tokens, now):
+        self.open_orders = 0  # Resting orders in the book, across symbols
+        self.exposures = {}  # Symbol -> SymbolExposure
+        self.tokens = tokens  # Token bucket for the rate limit
+        self.last_refill = now
+
+    def exposure(self, symbol):
+        """Return the SymbolExposure of one symbol, creating it on first use."""
+        exposure = self.exposures.get(symbol)
+        if exposure is None:
+            exposure = self.exposures[symbol] = SymbolExposure()
+        return exposure
+
+    def __repr__(self):
+        return f"UserRiskState(open_orders={self.open_orders}, exposures={self.exposures})"
+
+
+class RiskManager(BookListener):
+    def __init__(self, order_book, limits=None, clock=time.monotonic, reference_prices=None):
+        """
+        Initialize a new RiskManager object and register it with the order book.
+
+        Orders added to the book directly (not through this object) have no
+        owner here and are ignored by the per-user counters.
+
+        Args:
+            order_book (OrderBook): The book the checked orders are sent to.
+            limits (RiskLimits, optional): The limits to enforce. Defaults to RiskLimits().
+            clock (callable, optional): Monotonic clock returning seconds, for the rate limit.
+                Defaults to time.monotonic.
+            reference_prices (PriceStore, optional): Reference prices by symbol for the price band.
+                Symbols without one fall back to the book's last matched price. Defaults to None,
+                which always uses the last matched price.
+        """
+        self.order_book = order_book
+        self.limits = limits or RiskLimits()
+        self.clock = clock
+        self.reference_prices = reference_prices
+        self.users = {}  # Username -> UserRiskState
+        self.owners = {}  # Order ID -> username of the resting orders added through this object
+        self.rejections = {}  # Rejection reason -> count
+        order_book.add_listener(self)
+
+    def state(self, username):
+        """Return the UserRiskState of a user, creating it on first use."""
+        state = self.users.get(username)
+        if state is None:
+            state = self.users[username] = UserRiskState(self.limits.burst, self.clock())
+        return state
+
+    def _reject(self, reason, message):
+        self.rejections[reason] = self.rejections.get(reason, 0) + 1
+        logging.warning(f"Risk check failed ({reason}): {message}")
+        raise RiskRejected(reason, message)
+
+    def _require(self, user, action):
+        if user is None:
+            self._reject('login_required', f"Login required to {action}")
+        if action not in ROLE_PERMISSIONS.get(user.role, ()):
+            self._reject('permission', f"Role {user.role} of user {user.username} may not {action}")
+
+    def check(self, order, user):
+        """
+        Run every pre-trade check for an order without adding it.
+
+        A token is taken from the user's rate-limit bucket when all other checks pass.
+
+        Args:
+            order (Order): The order to check.
+            user (User): The user sending the order.
+
+        Raises:
+            RiskRejected: If any check fails.
+        """
+        self._require(user, 'trade')
+        limits = self.limits
+        quantity = order.total_quantity  # Including an iceberg's hidden reserve
+
+        if limits.max_order_quantity is not None and quantity > limits.max_order_quantity:
+            self._reject('max_order_quantity',
+                         f"Order {order.order_id} quantity {quantity} exceeds {limits.max_order_quantity}")
+
+        reference = None
+        if self.reference_prices is not None:
+            reference = self.reference_prices.get(order.symbol)
+        if reference is None:
+            reference = self.order_book.last_matched_price
+        if limits.price_band is not None and reference:
+            band = reference * limits.price_band
+            if abs(order.price - reference) > band:
+                self._reject('price_band',
+                             f"Order {order.order_id} price {order.price} is outside "
+                             f"{reference - band:.2f}-{reference + band:.2f}")
+
+        state = self.state(user.username)
+        if limits.max_open_orders is not None and state.open_orders >= limits.max_open_orders:
+            self._reject('max_open_orders',
+                         f"User {user.username} already has {state.open_orders} open orders")
+
+        if limits.max_position is not None:
+            # Worst case in this symbol: every resting order on this side fills, plus this one
+            exposure = state.exposure(order.symbol)
+            if order.side == 'buy':
+                worst = exposure.position + exposure.open_buy_quantity + quantity
+            else:
+                worst = exposure.open_sell_quantity + quantity - exposure.position
+            if worst > limits.max_position:
+                self._reject('max_position',
+                             f"Order {order.order_id} could take user {user.username} "
+                             f"past a position of {limits.max_position} in {order.symbol}")
+
+        if limits.max_orders_per_second is not None:
+            now = self.clock()
+            state.tokens = min(limits.burst,
+                               state.tokens + (now - state.last_refill) * limits.max_orders_per_second)
+            state.last_refill = now
+            if state.tokens < 1:
+                self._reject('rate_limit',
+                             f"User {user.username} exceeded {limits.max_orders_per_second} orders per second")
+            state.tokens -= 1
+
+    def add_order(self, order, user):
+        """
+        Check an order and add it to the book on behalf of a user, who becomes its owner.
+
+        Raises:
+            RiskRejected: If a risk check fails.
+            ValueError: If the order book rejects the order.
+        """
+        book = self.order_book
+        # Reject a reused ID before touching owners, which still maps it to the resting order's owner
+        if order.order_id in book.orders_by_id or order.order_id in book.stops:
+            raise ValueError(f"Order ID {order.order_id} is already in the book")
+        self.check(order, user)
+        previous_owner = order.owner
+        order.owner = user.username
+        self.owners[order.order_id] = user.username
+        try:
+            book.add_order(order)
+        except Exception:
+            # Undo the ownership unless the order made it into the book before the failure
+            if book.orders_by_id.get(order.order_id) is not order and order.order_id not in book.stops:
+                self.owners.pop(order.order_id, None)
+                order.owner = previous_owner
+            raise
+
+    def cancel_order(self, order_id, user):
+        """
+        Cancel an order on behalf of a user. Users may only cancel their own
+        orders unless their role allows cancelling any order.
+
+        Returns:
+            str: The order book's cancel message.
+
+        Raises:
+            RiskRejected: If the user may not cancel the order.
+        """
+        self._require(user, 'cancel')
+        owner = self.owners.get(order_id)
+        if owner is not None and owner != user.username and 'cancel_any' not in ROLE_PERMISSIONS[user.role]:
+            self._reject('permission', f"User {user.username} may not cancel order {order_id} of {owner}")
+        return self.order_book.cancel_order(order_id)
+
+    def cancel_all(self, user):
+        """
+        Cancel every open order of a user through the book's per-owner index.
+
+        Returns:
+            int: The number of orders cancelled.
+
+        Raises:
+            RiskRejected: If the user may not cancel orders.
+        """
+        self._require(user, 'cancel')
+        return self.order_book.cancel_all_for_owner(user.username)
+
+    def mass_cancel(self, user, symbol=None, side=None, owner=None, min_price=None, max_price=None):
+        """
+        Cancel every open order matching the filters on behalf of a user (see
+        OrderBook.mass_cancel). Users may only mass-cancel their own orders unless
+        their role allows cancelling any order.
+
+        Returns:
+            int: The number of orders cancelled.
+
+        Raises:
+            RiskRejected: If the user may not cancel the matching orders.
+        """
+        self._require(user, 'cancel')
+        if owner != user.username and 'cancel_any' not in ROLE_PERMISSIONS[user.role]:
+            self._reject('permission', f"User {user.username} may only mass-cancel their own orders")
+        return self.order_book.mass_cancel(symbol, side, owner, min_price, max_price)
+
+    def match_orders(self):
+        return self.order_book.match_orders()
+
+    def order_added(self, order):
+        username = self.owners.get(order.order_id)
+        if username is None:
+            return
+        state = self.state(username)
+        state.open_orders += 1
+        exposure = state.exposure(order.symbol)
+        if order.side == 'buy':
+            exposure.open_buy_quantity += order.total_quantity
+        else:
+            exposure.open_sell_quantity += order.total_quantity
+
+    def order_cancelled(self, order):
+        username = self.owners.pop(order.order_id, None)
+        if username is None:
+            return
+        state = self.users[username]
+        state.open_orders -= 1
+        exposure = state.exposure(order.symbol)
+        if order.side == 'buy':
+            exposure.open_buy_quantity -= order.total_quantity
+        else:
+            exposure.open_sell_quantity -= order.total_quantity
+
+    def order_reduced(self, order, quantity):
+        username = self.owners.get(order.order_id)
+        if username is None:
+            return
+        exposure = self.users[username].exposure(order.symbol)
+        if order.side == 'buy':
+            exposure.open_buy_quantity -= quantity
+        else:
+            exposure.open_sell_quantity -= quantity
+
+    def orders_matched(self, buy_order, sell_order, quantity, price):
+        owners = self.owners
+        username = owners.get(buy_order.order_id)
+        if username is not None:
+            state = self.users[username]
+            exposure = state.exposure(buy_order.symbol)
+            exposure.open_buy_quantity -= quantity
+            exposure.position += quantity
+            if not buy_order.total_quantity:
+                state.open_orders -= 1
+                del owners[buy_order.order_id]
+        username = owners.get(sell_order.order_id)
+        if username is not None:
+            state = self.users[username]
+            exposure = state.exposure(sell_order.symbol)
+            exposure.open_sell_quantity -= quantity
+            exposure.position -= quantity
+            if not sell_order.total_quantity:
+                state.open_orders -= 1
+                del owners[sell_order.order_id]
@@ -0,0 +1,281 @@
+"""
+This module contains a matching engine that shards symbols across worker processes.
+
+Matching in OrderBook is pure Python and holds the GIL, so one process can
+only use one core. ShardedOrderBook runs one worker process per shard; each
+worker owns an OrderBook per symbol for the symbols hashed to it, so books
+never cross shards and the shards match in parallel.
+
+The router (the process using ShardedOrderBook) talks to each worker over a
+multiprocessing Pipe. New orders are validated in the router, buffered per
+shard as plain tuples and sent in batches, so one pickle and one pipe write
+carry many orders. Cancels, matching and queries flush the buffers first,
+so every call sees the effect of the orders added before it, exactly as
+with a single OrderBook.
+"""
+
+import logging
+import math
+import multiprocessing
+import zlib
+
+from order import Order
+from order_book import BookListener, OrderBook
+from trigger_book import STOP_ORDER_TYPES
+
+
+class RemovedOrders(BookListener):
+    """
+    Collects the IDs of the orders a shard's books remove: full fills, cancels,
+    expiries and self-trade prevention, so the router can forget them.
+    """
+
+    def __init__(self):
+        self.order_ids = []
+
+    def order_cancelled(self, order):
+        self.order_ids.append(order.order_id)
+
+    def orders_matched(self, buy_order, sell_order, quantity, price):
+        if not buy_order.total_quantity:
+            self.order_ids.append(buy_order.order_id)
+        if not sell_order.total_quantity:
+            self.order_ids.append(sell_order.order_id)
+
+
+def _shard_main(connection, instrumented):
+    """
+    Run one shard: apply batches of commands from the router until told to stop.
+
+    A batch is a list of (command, argument) tuples. Only a batch ending in a
+    command that needs an answer gets a reply, so batches of adds stream
+    through the pipe without round trips. A reply is (errors, removed order
+    IDs, answer, failure): the adds rejected and the orders removed since the
+    last reply, the answer of the last command, and the message of a command
+    that raised, or None. The worker keeps running after any error.
+    """
+    books = {}  # Symbol -> OrderBook
+    removed = RemovedOrders()  # Listener on every book
+
+    def book_for(symbol):
+        book = books.get(symbol)
+        if book is None:
+            book = books[symbol] = OrderBook(instrumented=instrumented)
+            book.add_listener(removed)
+        return book
+
+    errors = []  # (order ID, message) of adds rejected since the last reply
+    while True:
+        batch = connection.recv()
+        reply = None
+        failure = None
+        for command, argument in batch:
+            try:
+                if command == 'add':
+                    book_for(argument[2]).add_order(Order(*argument))
+                elif command == 'cancel':
+                    symbol, order_id = argument
+                    reply = book_for(symbol).cancel_order(order_id)
+                elif command == 'match':
+                    reply = [fill for book in books.values() for fill in book.match_orders()]
+                elif command == 'depth':
+                    symbol, levels = argument
+                    reply = book_for(symbol).get_depth(levels)
+                elif command == 'history':
+                    reply = [trade for book in books.values() for trade in book.order_history]
+                elif command == 'count':
+                    reply = sum(len(book.orders_by_id) for book in books.values())
+                elif command == 'stop':
+                    connection.send((errors, removed.order_ids, None, None))
+                    connection.close()
+                    return
+            except Exception as e:
+                if command == 'add':
+                    errors.append((argument[1], str(e)))
+                else:
+                    logging.exception(f"Shard command {command} failed")
+                    reply, failure = None, f"{command} failed: {e}"
+        if batch[-1][0] != 'add':
+            connection.send((errors, removed.order_ids, reply, failure))
+            errors = []
+            removed.order_ids = []
+
+
+class ShardedOrderBook:
+    def __init__(self, shards=None, batch_size=256, instrumented=False, start_method=None):
+        """
+        Initialize a new ShardedOrderBook object and start its worker processes.
+
+        Args:
+            shards (int, optional): Number of worker processes. Defaults to the number of CPUs.
+            batch_size (int, optional): Orders buffered per shard before they are sent. Defaults to 256.
+            instrumented (bool, optional): Create the shards' OrderBooks with instrumentation.
+                Defaults to False.
+            start_method (str, optional): multiprocessing start method, e.g. 'spawn'.
+                Defaults to the platform default.
+        """
+        context = multiprocessing.get_context(start_method)
+        self.shard_count = shards or multiprocessing.cpu_count()
+        self.batch_size = batch_size
+        self.connections = []
+        self.processes = []
+        for index in range(self.shard_count):
+            router_end, shard_end = context.Pipe()
+            process = context.Process(target=_shard_main, args=(shard_end, instrumented),
+                                      name=f"clob-shard-{index}", daemon=True)
+            process.start()
+            shard_end.close()
+            self.connections.append(router_end)
+            self.processes.append(process)
+        self.buffers = [[] for _ in range(self.shard_count)]  # Commands not yet sent, per shard
+        self.shard_by_symbol = {}  # Symbol -> shard index, cached so each symbol is hashed once
+        self.symbol_by_id = {}  # Order ID -> symbol of every order that may still be resting, pruned from shard replies
+        self.rejected = []  # (order ID, message) of adds the shards rejected
+        logging.info(f"Sharded order book started with {self.shard_count} shards")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def shard_for(self, symbol):
+        """Return the index of the shard owning a symbol, stable across processes and runs."""
+        shard = self.shard_by_symbol.get(symbol)
+        if shard is None:
+            shard = self.shard_by_symbol[symbol] = zlib.crc32(symbol.encode('utf-8')) % self.shard_count
+        return shard
+
+    def validate_order(self, order):
+        if not (math.isfinite(order.price) and math.isfinite(order.quantity)):
+            raise ValueError("Price and quantity must be finite numbers")
+        if order.price <= 0 or order.quantity <= 0:
+            raise ValueError("Price and quantity must be greater than zero")
+        if order.side not in ["buy", "sell"]:
+            raise ValueError("Side must be either 'buy' or 'sell'")
+        if order.order_id in self.symbol_by_id:
+            raise ValueError(f"Order ID {order.order_id} is already in the book")
+        if order.stop_price is not None and not math.isfinite(order.stop_price):
+            raise ValueError("Stop price must be a finite number")
+        if order.order_type in STOP_ORDER_TYPES and not (order.stop_price and order.stop_price > 0):
+            raise ValueError("Stop orders need a stop price greater than zero")
+        if order.display_quantity is not None and order.display_quantity <= 0:
+            raise ValueError("Display quantity must be greater than zero")
+
+    def add_order(self, order):
+        """
+        Validate an order and queue it for its symbol's shard.
+
+        The order is sent as a tuple of its fields; the shard builds its own
+        Order, so the object passed in is not updated by later fills.
+
+        Raises:
+            ValueError: If the order is invalid or its ID is already in the book.
+        """
+        self.validate_order(order)
+        self.symbol_by_id[order.order_id] = order.symbol
+        shard = self.shard_for(order.symbol)
+        buffer = self.buffers[shard]
+        buffer.append(('add', (order.timestamp, order.order_id, order.symbol, order.price,
+                               order.total_quantity, order.side, order.order_type, order.stop_price,
+                               order.display_quantity, order.time_in_force, order.expire_at,
+                               order.owner)))
+        if len(buffer) >= self.batch_size:
+            self._send(shard)
+
+    def _send(self, shard):
+        buffer = self.buffers[shard]
+        if buffer:
+            self.connections[shard].send(buffer)
+            self.buffers[shard] = []
+
+    def _receive(self, shard):
+        errors, removed, reply, failure = self.connections[shard].recv()
+        symbol_by_id = self.symbol_by_id
+        for order_id in removed:
+            symbol_by_id.pop(order_id, None)
+        for order_id, message in errors:
+            symbol_by_id.pop(order_id, None)
+            self.rejected.append((order_id, message))
+            logging.warning(f"Shard {shard} rejected order {order_id}: {message}")
+        if failure is not None:
+            raise RuntimeError(f"Shard {shard} {failure}")
+        return reply
+
+    def _call(self, shard, command, argument=None):
+        self.buffers[shard].append((command, argument))
+        self._send(shard)
+        return self._receive(shard)
+
+    def _call_all(self, command, argument=None):
+        # Send to every shard before waiting on any, so the shards work in parallel
+        for shard in range(self.shard_count):
+            self.buffers[shard].append((command, argument))
+            self._send(shard)
+        # Read every reply, even after a failure, so the pipes stay in step
+        replies = []
+        failure = None
+        for shard in range(self.shard_count):
+            try:
+                replies.append(self._receive(shard))
+            except RuntimeError as e:
+                failure = failure or e
+        if failure is not None:
+            raise failure
+        return replies
+
+    def flush(self):
+        """Send all buffered orders and wait until every shard has applied them."""
+        self._call_all('count')
+
+    def cancel_order(self, order_id):
+        """
+        Cancel an order on its symbol's shard.
+
+        Returns:
+            str: "Order <id> cancelled." or "Order <id> not found.", as OrderBook.cancel_order.
+        """
+        symbol = self.symbol_by_id.pop(order_id, None)
+        if symbol is None:
+            return f"Order {order_id} not found."
+        return self._call(self.shard_for(symbol), 'cancel', (symbol, order_id))
+
+    def match_orders(self):
+        """
+        Match every symbol's book on all shards in parallel.
+
+        Returns:
+            list: (buy_order, sell_order, quantity) tuples as from OrderBook.match_orders,
+                with copies of the shards' orders taken at the end of matching.
+        """
+        matched = []
+        # Filled, expired and self-trade-cancelled orders come back with the reply and leave symbol_by_id
+        for fills in self._call_all('match'):
+            matched.extend(fills)
+        return matched
+
+    def get_depth(self, symbol, levels=10):
+        """Return OrderBook.get_depth() of one symbol's book."""
+        return self._call(self.shard_for(symbol), 'depth', (symbol, levels))
+
+    def get_order_history(self):
+        """Return the matched trades of every shard, most recent first."""
+        history = [trade for trades in self._call_all('history') for trade in trades]
+        history.sort(key=lambda trade: trade['timestamp'], reverse=True)
+        return history
+
+    def count_orders(self):
+        """Return the number of resting orders across all shards."""
+        return sum(self._call_all('count'))
+
+    def close(self):
+        """Flush the buffered orders, stop the workers and wait for them to exit."""
+        if not self.processes:
+            return
+        self._call_all('stop')
+        for connection, process in zip(self.connections, self.processes):
+            connection.close()
+            process.join()
+        self.connections = []
+        self.processes = []
+        logging.info("Sharded order book stopped")
@@ -0,0 +1,106 @@
+"""
+This module keeps an incremental digest of an order book's state.
+
+A StateDigest is a BookListener with two 64-bit parts:
+
+- the order digest: the sum, modulo 2**64, of a hash of every open order's
+  (order ID, side, price, total remaining quantity), dormant stops
+  included. Sums do not depend on order, so an add, cancel or fill updates
+  it in O(1) by subtracting the order's old hash and adding its new one.
+- the trade digest: a hash chain over every fill (buy and sell order IDs,
+  quantity, price) in execution order, so it also captures which orders had
+  priority.
+
+Two books that processed the same events agree on both parts exactly when
+they hold the same open orders and produced the same fills in the same
+order. Hashes are BLAKE2b of a text encoding of the fields, so digests are
+stable across processes and Python versions.
+
+book_digest() recomputes the order digest by scanning a book, to check the
+incremental value.
+"""
+
+import struct
+from hashlib import blake2b
+
+from order_book import BookListener
+
+MASK = (1 << 64) - 1
+
+
+def order_hash(order_id, side, price, quantity):
+    """Return the 64-bit hash of one open order's state."""
+    return int.from_bytes(blake2b(f"{order_id}|{side}|{price!r}|{quantity}".encode(), digest_size=8).digest(),
+                          "little")
+
+
+class StateDigest(BookListener):
+    def __init__(self, order_digest=0, trade_digest=0):
+        """
+        Initialize a new StateDigest object.
+
+        Use StateDigest.from_book() to start from a book that already holds orders.
+
+        Args:
+            order_digest (int, optional): Starting order digest. Defaults to 0, an empty book.
+            trade_digest (int, optional): Starting trade digest. Defaults to 0, no fills.
+        """
+        self.order_digest = order_digest
+        self.trade_digest = trade_digest
+        self.events = 0  # Adds, cancels, fills and reductions seen
+
+    @classmethod
+    def from_book(cls, book):
+        """Create a StateDigest seeded with a book's current open orders."""
+        return cls(book_digest(book))
+
+    def hexdigest(self):
+        """Return both parts as one 32-character hex string."""
+        return f"{self.order_digest:016x}{self.trade_digest:016x}"
+
+    def _change(self, order, before, after):
+        digest = self.order_digest
+        if before:
+            digest -= order_hash(order.order_id, order.side, order.price, before)
+        if after:
+            digest += order_hash(order.order_id, order.side, order.price, after)
+        self.order_digest = digest & MASK
+        self.events += 1
+
+    # BookListener callbacks; quantities are the total (displayed plus hidden) remaining quantity
+
+    def order_added(self, order):
+        self._change(order, 0, order.total_quantity)
+
+    def order_cancelled(self, order):
+        self._change(order, order.total_quantity, 0)
+
+    def orders_matched(self, buy_order, sell_order, quantity, price):
+        self._change(buy_order, buy_order.total_quantity + quantity, buy_order.total_quantity)
+        self._change(sell_order, sell_order.total_quantity + quantity, sell_order.total_quantity)
+        fill = f"{buy_order.order_id}|{sell_order.order_id}|{quantity}|{price!r}".encode()
+        self.trade_digest = int.from_bytes(
+            blake2b(struct.pack('<Q', self.trade_digest) + fill, digest_size=8).digest(), "little")
+
+    def order_reduced(self, order, quantity):
+        self._change(order, order.total_quantity + quantity, order.total_quantity)
+
+
+def book_digest(book):
+    """
+    Compute the order digest of a book from scratch by scanning its open orders.
+
+    Works with OrderBook (resting orders and dormant stops) and with any book
+    offering iter_orders(side).
+
+    Returns:
+        int: The order digest, equal to StateDigest.order_digest when the incremental value is right.
+    """
+    digest = 0
+    orders = [order for side in ("buy", "sell") for order in book.iter_orders(side)]
+    stops = getattr(book, "stops", None)
+    if stops is not None:
+        orders.extend(stops.orders_by_id.values())
+    for order in orders:
+        digest += order_hash(order.order_id, order.side, order.price, order.total_quantity)
+    return digest & MASK
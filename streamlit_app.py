@@ -1,16 +1,130 @@
+import os
+import threading
+import time
 import streamlit as st
 import pandas as pd
 from order_book import OrderBook, fetch_current_prices, generate_realistic_order
-from user import User
 import excel_exporter
 from order import Order
+from auth import SELF_SERVICE_ROLES, UserStore
+from user_repository import SQLiteUserRepository
+from risk import RiskManager, RiskRejected
+from price_feed import PriceStore, feed_from_env
+from trade_tape import TradeTapeReader
 
-# Initialize the order book
-order_book = OrderBook()
+# Columns shown for resting orders; building rows from these avoids copying every order's __dict__
+ORDER_COLUMNS = ["order_id", "symbol", "price", "quantity", "order_type", "status", "execution_time"]
+PAGE_SIZES = [25, 50, 100, 250]
+DEPTH_LEVELS = 10
 
 # Sample data for symbols
 symbols = ['AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA']
-current_prices = fetch_current_prices(symbols)
+
+
+@st.cache_resource
+def get_order_book():
+    """
+    Returns the order book shared by every rerun and every browser session.
+
+    Streamlit re-executes this script on each interaction, so the book must
+    live in the resource cache rather than at module level. CLOB_STP names
+    a self-trade prevention mode and CLOB_TAPE a directory to record fills to.
+    """
+    order_book = OrderBook(self_trade_prevention=os.environ.get("CLOB_STP") or None)
+    if os.environ.get("CLOB_TAPE"):
+        order_book.enable_trade_tape(os.environ["CLOB_TAPE"])
+    return order_book
+
+
+@st.cache_resource
+def get_order_book_lock():
+    """Returns the lock serialising changes to the shared order book across sessions."""
+    return threading.Lock()
+
+
+@st.cache_resource
+def get_risk_manager():
+    """Returns the pre-trade risk checks in front of the shared order book, banded around the reference prices."""
+    return RiskManager(get_order_book(), reference_prices=get_price_store()[0])
+
+
+@st.cache_resource
+def get_user_store():
+    """Returns the user store shared by every session; users load lazily from CLOB_USER_DB."""
+    return UserStore(repository=SQLiteUserRepository.from_env())
+
+
+@st.cache_resource
+def get_price_store():
+    """Returns the reference price store and the feed publishing to it, shared by every session."""
+    store = PriceStore()
+    feed = feed_from_env(symbols)
+    feed.poll(store)
+    fetch_current_prices(symbols, store)
+    return store, feed
+
+
+def order_page(side, start, limit):
+    """
+    Builds a DataFrame holding one page of orders in priority order.
+
+    The page comes from OrderBook.iter_orders, which skips whole price levels
+    before the page, and only the rows on the page are converted, so the cost
+    follows the page rather than the size of the book.
+
+    Args:
+        side (str): "buy" or "sell".
+        start (int): Index of the first order on the page.
+        limit (int): Number of orders on the page.
+
+    Returns:
+        pd.DataFrame: One row per order with the ORDER_COLUMNS columns.
+    """
+    rows = [[getattr(order, column) for column in ORDER_COLUMNS]
+            for order in order_book.iter_orders(side, start, limit)]
+    return pd.DataFrame(rows, columns=ORDER_COLUMNS)
+
+
+def show_order_side(title, side):
+    """
+    Renders a paginated st.dataframe for one side of the book.
+
+    Args:
+        title (str): The subheader text.
+        side (str): "buy" or "sell", also used as the widget key prefix.
+    """
+    order_count = order_book.count_orders(side)
+    st.subheader(f"{title} ({order_count})")
+    size_col, page_col = st.columns(2)
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES, key=f"{side}_page_size")
+    page_count = max(1, -(-order_count // page_size))
+    # Clamp rather than set max_value, since the book may shrink under a stored page number
+    page = min(page_col.number_input(f"Page (of {page_count})", min_value=1, value=1, key=f"{side}_page"), page_count)
+    with order_book_lock:
+        page_df = order_page(side, (page - 1) * page_size, page_size)
+    st.dataframe(page_df, hide_index=True, use_container_width=True)
+
+
+def show_depth():
+    """Renders the aggregated depth of the best DEPTH_LEVELS price levels on each side."""
+    with order_book_lock:
+        depth = order_book.get_depth(levels=DEPTH_LEVELS)
+    bid_col, ask_col = st.columns(2)
+    for col, key, title in ((bid_col, "bids", "Bids"), (ask_col, "asks", "Asks")):
+        col.caption(title)
+        col.dataframe(pd.DataFrame(depth[key], columns=["price", "quantity", "orders"]),
+                      hide_index=True, use_container_width=True)
+
+
+order_book = get_order_book()
+order_book_lock = get_order_book_lock()
+user_store = get_user_store()
+risk_manager = get_risk_manager()
+price_store, price_feed = get_price_store()
+with order_book_lock:
+    # Advance the reference prices once per rerun
+    price_feed.poll(price_store)
+current_prices = price_store.prices_for(symbols)
 
 # Streamlit app layout
 st.title("Order Book Management System")
@@ -19,15 +133,38 @@ st.title("Order Book Management System")
 st.sidebar.header("User Login")
 username = st.sidebar.text_input("Username")
 password = st.sidebar.text_input("Password", type="password")
-role = st.sidebar.selectbox("Role", ["admin", "trader", "viewer"])
+# Only used when a new username registers itself; admins are granted (see auth.py)
+role = st.sidebar.selectbox("Role", SELF_SERVICE_ROLES)
 
 if st.sidebar.button("Login"):
-    user = User(username, password, role)
-    st.session_state['user'] = user
-    st.sidebar.success(f"Logged in as {username}")
+    if not username:
+        st.sidebar.error("Enter a username")
+    else:
+        # First login for a username registers it; later logins check the stored hash once.
+        # Hashing runs on the store's worker pool, outside the order book lock.
+        if username not in user_store:
+            try:
+                user_store.register_async(username, password, role).result()
+            except ValueError:
+                pass  # Registered by a concurrent session; the login below checks the password
+        token = user_store.login_async(username, password).result()
+        if token is None:
+            st.sidebar.error("Invalid username or password")
+        else:
+            st.session_state['session_token'] = token
+            st.sidebar.success(f"Logged in as {username}")
 
-if 'user' in st.session_state:
-    st.sidebar.write(f"Welcome, {st.session_state['user'].username}")
+# Validate the session token on every rerun in O(1), without another bcrypt check
+current_user = user_store.validate_session(st.session_state.get('session_token'))
+if current_user is not None:
+    st.sidebar.write(f"Welcome, {current_user.username} ({current_user.role})")
+    if st.sidebar.button("Logout"):
+        user_store.logout(st.session_state.pop('session_token'))
+        st.rerun()
+    if st.sidebar.button("Cancel My Orders"):
+        with order_book_lock:
+            cancelled = risk_manager.cancel_all(current_user)
+        st.sidebar.success(f"{cancelled} orders cancelled.")
 
 # Adding a custom order
 st.header("Add Custom Order")
@@ -37,34 +174,75 @@ with st.form(key='add_order_form'):
     price = st.number_input("Price", min_value=0.0, format="%.2f")
     quantity = st.number_input("Quantity", min_value=1)
     side = st.selectbox("Side", ["buy", "sell"])
-    order_type = st.selectbox("Type", ["limit", "market"])
+    order_type = st.selectbox("Type", ["limit", "market", "stop", "stop_limit"])
+    stop_price = st.number_input("Stop Price (stop orders only)", min_value=0.0, format="%.2f")
+    display_quantity = st.number_input("Display Quantity (iceberg orders, 0 shows all)", min_value=0)
+    time_in_force = st.selectbox("Time in Force", ["gtc", "day", "gtt"])
+    expire_seconds = st.number_input("GTT Seconds (gtt orders only)", min_value=1, value=3600)
     add_order_button = st.form_submit_button("Add Order")
 
     if add_order_button:
         timestamp = int(pd.Timestamp.now().timestamp() * 1000)
-        order = Order(timestamp, order_id, symbol, price, quantity, side, order_type)
-        order_book.add_order(order)
-        st.success(f"Order {order_id} added successfully.")
+        order = Order(timestamp, order_id, symbol, price, quantity, side, order_type,
+                      stop_price if order_type in ("stop", "stop_limit") else None, display_quantity or None,
+                      time_in_force, time.time() + expire_seconds if time_in_force == "gtt" else None)
+        try:
+            with order_book_lock:
+                risk_manager.add_order(order, current_user)
+            st.success(f"Order {order_id} added successfully.")
+        except RiskRejected as e:
+            st.error(f"Order rejected: {e}")
+        except ValueError as e:
+            st.error(f"Invalid order: {e}")
 
-# Display the order book
-st.header("Order Book")
-order_book_data = order_book.get_order_book()
-buy_orders_df = pd.DataFrame([order.__dict__ for _, _, order in order_book_data['buy_orders']])
-sell_orders_df = pd.DataFrame([order.__dict__ for _, _, order in order_book_data['sell_orders']])
-st.subheader("Buy Orders")
-st.table(buy_orders_df)
-st.subheader("Sell Orders")
-st.table(sell_orders_df)
-
-# Match orders
-if st.button("Match Orders"):
-    matched_orders = order_book.match_orders()
+# Match orders and export before rendering the book so the tables below show the result
+match_col, auction_col, export_col = st.columns(3)
+if match_col.button("Match Orders"):
+    with order_book_lock:
+        matched_orders = order_book.match_orders()
     st.success(f"Matched {len(matched_orders)} orders.")
-    for buy, sell, qty in matched_orders:
+    for buy, sell, qty in matched_orders[:100]:
         st.write(f"Matched {qty} units between buy order {buy.order_id} and sell order {sell.order_id}")
 
+# Uncross the whole book at one clearing price
+allocation = auction_col.selectbox("Auction allocation", ["fifo", "pro_rata"])
+if auction_col.button("Run Auction"):
+    with order_book_lock:
+        matched_orders = order_book.run_auction(allocation)
+    if matched_orders:
+        volume = sum(qty for _, _, qty in matched_orders)
+        st.success(f"Auction executed {volume} units at {order_book.last_matched_price} "
+                   f"in {len(matched_orders)} fills.")
+    else:
+        st.info("The book is not crossed; nothing to execute.")
+
 # Export matched orders to Excel
-if st.button("Export Matched Orders to Excel"):
+if export_col.button("Export Matched Orders to Excel"):
     matched_orders = order_book.get_order_history()
-    result = excel_exporter.export_orders_to_excel(matched_orders)
+    with order_book.profiler.section("export"):
+        result = excel_exporter.export_orders_to_excel(matched_orders)
     st.success(result)
+
+# One-minute bars of a symbol's trades, read straight from the memory-mapped trade tape
+if order_book.tape is not None:
+    st.header("Trade Tape")
+    tape_reader = TradeTapeReader(order_book.tape.directory)
+    tape_days = tape_reader.days()
+    if tape_days:
+        tape_col, symbol_col = st.columns(2)
+        tape_day = tape_col.selectbox("Day", tape_days[::-1])
+        tape_symbol = symbol_col.selectbox("Symbol", tape_reader.symbols(tape_day))
+        tape = tape_reader.open(tape_day, tape_symbol)
+        bars = pd.DataFrame(tape.bars(60), columns=["time", "open", "high", "low", "close", "volume"])
+        bars["time"] = pd.to_datetime(bars["time"], unit="ns")
+        st.write(f"{len(tape)} trades")
+        st.dataframe(bars.iloc[::-1], hide_index=True)
+        tape.close()
+    else:
+        st.info("No trades recorded yet.")
+
+# Display the top of the book, then each side one page at a time
+st.header("Order Book")
+show_depth()
+show_order_side("Buy Orders", "buy")
+show_order_side("Sell Orders", "sell")
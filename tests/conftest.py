@@ -0,0 +1,20 @@
+"""
+Shared pytest setup: make the flat top-level modules importable and keep
+the log files OrderBook creates out of the repository.
+
+Run from the repository root:
+
+    python -m pytest
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,56 @@
+import pytest
+
+from auction import clearing_price
+from order import Order
+from order_book import OrderBook
+
+
+def crossed_book():
+    book = OrderBook()
+    for order_id, price, quantity, side in [("b1", 101.0, 10, "buy"), ("b2", 100.0, 7, "buy"),
+                                            ("b3", 100.0, 3, "buy"), ("s1", 99.0, 5, "sell"),
+                                            ("s2", 100.0, 10, "sell")]:
+        book.add_order(Order(0, order_id, "AAPL", price, quantity, side))
+    return book
+
+
+def test_clearing_price_maximizes_executed_volume():
+    book = crossed_book()
+    result = clearing_price(book.bids, book.asks)
+    # Volume is 5 at 99, 15 at 100 and 10 at 101
+    assert (result.price, result.volume, result.demand, result.supply) == (100.0, 15, 20, 15)
+    assert result.imbalance == 5
+
+
+def test_uncrossed_book_has_no_clearing_price():
+    book = OrderBook()
+    book.add_order(Order(0, "b", "AAPL", 99.0, 5, "buy"))
+    book.add_order(Order(0, "s", "AAPL", 100.0, 5, "sell"))
+    assert clearing_price(book.bids, book.asks) is None
+    assert book.run_auction() == []
+
+
+@pytest.mark.parametrize("allocation, expected", [
+    ("fifo", {"b1": 10, "b2": 5}),
+    # 7 and 3 share 5 as 3 and 1; the rounding lot goes to the older order
+    ("pro_rata", {"b1": 10, "b2": 4, "b3": 1}),
+])
+def test_auction_allocates_the_marginal_level(allocation, expected):
+    book = crossed_book()
+    fills = book.run_auction(allocation)
+
+    bought = {}
+    for buy, sell, quantity in fills:
+        bought[buy.order_id] = bought.get(buy.order_id, 0) + quantity
+    assert bought == expected
+    assert sum(quantity for _, _, quantity in fills) == 15
+    # Every fill trades at the single clearing price and the short side fills in full
+    assert {trade["price"] for trade in book.get_order_history()} == {100.0}
+    assert book.last_matched_price == 100.0
+    assert not book.asks
+    assert book.bids.best().price == 100.0
+
+
+def test_unknown_allocation_is_rejected():
+    with pytest.raises(ValueError):
+        crossed_book().run_auction("pro-rata")
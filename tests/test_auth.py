@@ -0,0 +1,68 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from auth import SELF_SERVICE_ROLES, SessionManager, UserStore
+
+
+@pytest.fixture
+def store():
+    store = UserStore(bcrypt_rounds=4)
+    yield store
+    store.shutdown()
+
+
+def test_registration_cannot_choose_admin(store):
+    with pytest.raises(ValueError):
+        store.register_async("mallory", "pw", "admin")
+    assert "mallory" not in store
+    for role in SELF_SERVICE_ROLES:
+        assert store.register_async(f"user-{role}", "pw", role).result().role == role
+
+
+def test_only_an_admin_grants_roles(store):
+    admin = store.add_user("root", "pw", "admin")
+    trader = store.register_async("bob", "pw").result()
+    with pytest.raises(ValueError):
+        store.grant_role(trader, "bob", "admin")
+    assert store.grant_role(admin, "bob", "admin").role == "admin"
+
+
+def test_expired_session_revoked_during_validation():
+    sessions = SessionManager(ttl=10, clock=lambda: 0.0)
+    token = sessions.create(SimpleNamespace(username="alice"))
+
+    def clock():
+        # Another thread revokes the session between validate()'s lookup and its expiry check
+        sessions.revoke(token)
+        return 10.0
+
+    sessions.clock = clock
+    assert sessions.validate(token) is None
+    assert len(sessions) == 0
+
+
+def test_sessions_survive_concurrent_expiry_and_revocation():
+    sessions = SessionManager(ttl=10, clock=lambda: 0.0)
+    tokens = [sessions.create(SimpleNamespace(username=f"user{index % 4}")) for index in range(2000)]
+    sessions.clock = lambda: 10.0  # Every session is now expired
+    errors = []
+
+    def run(work):
+        try:
+            work()
+        except Exception as e:
+            errors.append(e)
+
+    workers = [lambda: [sessions.validate(token) for token in tokens] for _ in range(4)]
+    workers += [lambda: [sessions.revoke(token) for token in tokens[::3]], sessions.purge_expired,
+                lambda: sessions.revoke_user("user1")]
+    threads = [threading.Thread(target=run, args=(work,)) for work in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(sessions) == 0
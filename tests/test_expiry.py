@@ -0,0 +1,74 @@
+import pytest
+
+from order import Order
+from order_book import OrderBook
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def gtt(order_id, expire_at, side="buy", price=100.0):
+    return Order(0, order_id, "AAPL", price, 5, side, time_in_force="gtt", expire_at=expire_at)
+
+
+def test_order_expires_exactly_at_its_expiry_time():
+    clock = Clock(1000.0)
+    book = OrderBook(clock=clock)
+    book.add_order(gtt("early", 1000.25))
+    book.add_order(gtt("boundary", 1000.5))
+    book.add_order(gtt("later", 1001.0))
+
+    # Orders due later in the same second stay scheduled
+    assert book.expire_orders(now=1000.49) == 1
+    assert "boundary" in book.orders_by_id
+    assert book.expire_orders(now=1000.5) == 1
+    assert "boundary" not in book.orders_by_id
+    assert list(book.orders_by_id) == ["later"]
+
+    clock.now = 1001.0
+    book.match_orders()
+    assert not book.orders_by_id and not book.bids
+
+
+def test_expired_order_does_not_trade_in_the_pass_it_expires():
+    clock = Clock(1000.0)
+    book = OrderBook(clock=clock)
+    order = gtt("gtt", 1001.0)
+    book.add_order(order)
+    book.add_order(Order(0, "s1", "AAPL", 100.0, 5, "sell"))
+    clock.now = 1001.0
+    assert book.match_orders() == []
+    assert order.status == "expired"
+    assert "s1" in book.orders_by_id
+
+
+def test_filled_or_cancelled_orders_are_skipped():
+    book = OrderBook(clock=Clock(1000.0))
+    book.add_order(gtt("filled", 1001.0))
+    book.add_order(gtt("cancelled", 1001.0))
+    book.add_order(Order(0, "s1", "AAPL", 100.0, 5, "sell"))
+    book.match_orders()
+    book.cancel_order("cancelled")
+    assert book.expire_orders(now=1001.0) == 0
+
+
+@pytest.mark.parametrize("expire_at", [None, 999.0, 1000.0, float("nan")])
+def test_gtt_order_needs_an_expiry_in_the_future(expire_at):
+    book = OrderBook(clock=Clock(1000.0))
+    with pytest.raises(ValueError):
+        book.add_order(gtt("gtt", expire_at))
+
+
+def test_end_session_expires_day_orders_only():
+    book = OrderBook(clock=Clock(1000.0))
+    book.add_order(Order(0, "day", "AAPL", 100.0, 5, "buy", time_in_force="day"))
+    book.add_order(Order(0, "day_stop", "AAPL", 90.0, 5, "sell", order_type="stop_limit", stop_price=95.0,
+                         time_in_force="day"))
+    book.add_order(Order(0, "gtc", "AAPL", 99.0, 5, "buy"))
+    assert book.end_session() == 2
+    assert list(book.orders_by_id) == ["gtc"] and not book.stops
@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+from gateway import OrderGateway
+
+GARBAGE = [
+    b'not json\n',
+    b'[1, 2, 3]\n',
+    b'{"type": "new"}\n',
+    b'{"type": "bogus", "id": "g0"}\n',
+    b'{"type": "new", "id": ["x"], "symbol": "AAPL", "price": 100, "qty": 1, "side": "buy"}\n',
+    b'{"type": "new", "id": "g1", "symbol": ["X"], "price": 100, "qty": 1, "side": "buy"}\n',
+    b'{"type": "new", "id": "g2", "symbol": "AAPL", "price": 100, "qty": 1e400, "side": "buy"}\n',
+    b'{"type": "new", "id": "g3", "symbol": "AAPL", "price": NaN, "qty": 1, "side": "buy"}\n',
+    b'{"type": "new", "id": "g4", "symbol": "AAPL", "price": Infinity, "qty": 1, "side": "buy"}\n',
+    b'{"type": "new", "id": "g5", "symbol": "AAPL", "price": 100, "qty": 1.5, "side": "buy"}\n',
+    b'{"type": "new", "id": "g6", "symbol": "AAPL", "price": "abc", "qty": 1, "side": "buy"}\n',
+    b'{"type": "new", "id": "g7", "symbol": "AAPL", "price": 100, "qty": 1, "side": "up"}\n',
+    b'{"type": "new", "id": "g8", "symbol": "AAPL", "price": 100, "qty": 1, "side": "buy",'
+    b' "order_type": "stop", "stop_price": NaN}\n',
+    b'{"type": "cancel", "id": "never-sent"}\n',
+]
+
+
+async def exchange(lines):
+    gateway = OrderGateway(port=0)
+    await gateway.start()
+    reader, writer = await asyncio.open_connection('127.0.0.1', gateway.port)
+    try:
+        for line in lines:
+            writer.write(line)
+        await writer.drain()
+        replies = [json.loads(await asyncio.wait_for(reader.readline(), 5)) for _ in lines]
+        return gateway, replies
+    finally:
+        writer.close()
+        await gateway.stop()
+
+
+def test_garbage_is_rejected_and_the_symbol_keeps_working():
+    valid = [
+        b'{"type": "new", "id": "a", "symbol": "AAPL", "price": 100, "qty": 5, "side": "buy"}\n',
+        b'{"type": "modify", "id": "a", "price": NaN}\n',
+        b'{"type": "new", "id": "b", "symbol": "AAPL", "price": 101, "qty": 5, "side": "buy"}\n',
+    ]
+    gateway, replies = asyncio.run(exchange(GARBAGE + valid))
+
+    assert [reply['type'] for reply in replies[:len(GARBAGE)]] == ['reject'] * len(GARBAGE)
+    assert [reply['type'] for reply in replies[len(GARBAGE):]] == ['ack', 'reject', 'ack']
+    # Rejected IDs are released and the modify left order a resting at its price
+    assert set(gateway.orders) == {'a', 'b'}
+    assert gateway.books['AAPL'].orders_by_id['a'].price == 100
+    assert len(gateway.books['AAPL'].orders_by_id) == 2
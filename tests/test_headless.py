@@ -0,0 +1,65 @@
+import csv
+import time
+
+from headless import EVENT_COLUMNS, HeadlessEngine, read_events, run_events
+
+
+def event(**fields):
+    row = dict.fromkeys(EVENT_COLUMNS, "")
+    row.update(fields)
+    return row
+
+
+def add(order_id, side, **fields):
+    return event(action="add", timestamp="0", order_id=order_id, symbol="AAPL", price="100.0", quantity="5",
+                 side=side, order_type="limit", **fields)
+
+
+def test_add_events_carry_time_in_force_expiry_and_owner():
+    engine = HeadlessEngine()
+    expire_at = time.time() + 3600
+    engine.apply(add("day", "buy", time_in_force="day", owner="alice"))
+    engine.apply(add("gtt", "buy", time_in_force="gtt", expire_at=str(expire_at), owner="bob"))
+    engine.apply(add("gtc", "buy"))
+
+    book = engine.books["AAPL"]
+    assert engine.rejected == 0
+    day, gtt, gtc = (book.orders_by_id[order_id] for order_id in ("day", "gtt", "gtc"))
+    assert (day.time_in_force, day.owner) == ("day", "alice")
+    assert (gtt.time_in_force, gtt.expire_at, gtt.owner) == ("gtt", expire_at, "bob")
+    assert (gtc.time_in_force, gtc.expire_at, gtc.owner) == ("gtc", None, None)
+    assert book.orders_by_owner["alice"].keys() == {"day"}
+    assert book.end_session() == 1
+
+
+def test_gtt_order_without_expiry_is_rejected():
+    engine = HeadlessEngine()
+    engine.apply(add("gtt", "buy", time_in_force="gtt"))
+    assert engine.rejected == 1
+
+
+def test_recorded_events_replay_with_the_new_columns(tmp_path):
+    events = [add("b1", "buy", owner="alice"), add("s1", "sell", owner="bob", time_in_force="day"),
+              event(action="match", symbol="AAPL")]
+    filename = tmp_path / "events.csv"
+    run_events(HeadlessEngine(), iter(events), record=filename)
+    with open(filename, newline="") as f:
+        assert csv.DictReader(f).fieldnames == EVENT_COLUMNS
+
+    engine = HeadlessEngine()
+    run_events(engine, read_events(filename))
+    assert engine.fills == 1
+    trade = engine.books["AAPL"].get_order_history()[0]
+    assert (trade["buy_owner"], trade["sell_owner"]) == ("alice", "bob")
+
+
+def test_files_without_the_new_columns_still_replay(tmp_path):
+    filename = tmp_path / "old.csv"
+    columns = EVENT_COLUMNS[:EVENT_COLUMNS.index("time_in_force")]
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerow({key: value for key, value in add("b1", "buy").items() if key in columns})
+    engine = HeadlessEngine()
+    run_events(engine, read_events(filename))
+    assert engine.books["AAPL"].orders_by_id["b1"].time_in_force == "gtc"
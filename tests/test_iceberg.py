@@ -0,0 +1,39 @@
+from order import Order
+from order_book import OrderBook
+
+
+def fill(book, order_id, quantity):
+    book.add_order(Order(0, order_id, "AAPL", 100.0, quantity, "buy"))
+    return [(sell.order_id, filled) for _, sell, filled in book.match_orders()]
+
+
+def test_iceberg_shows_only_its_clip():
+    book = OrderBook()
+    book.add_order(Order(0, "ice", "AAPL", 100.0, 10, "sell", display_quantity=4))
+    assert (book.orders_by_id["ice"].quantity, book.orders_by_id["ice"].hidden_quantity) == (4, 6)
+    assert book.get_depth()["asks"] == [(100.0, 4, 1)]
+
+
+def test_iceberg_loses_priority_on_refill():
+    book = OrderBook()
+    book.add_order(Order(0, "ice", "AAPL", 100.0, 10, "sell", display_quantity=4))
+    book.add_order(Order(0, "plain", "AAPL", 100.0, 5, "sell"))
+
+    # Filling the clip refills it from the reserve at the back of the level
+    assert fill(book, "b1", 4) == [("ice", 4)]
+    assert [order.order_id for order in book.iter_orders("sell")] == ["plain", "ice"]
+    assert (book.orders_by_id["ice"].quantity, book.orders_by_id["ice"].hidden_quantity) == (4, 2)
+
+    # The order queued behind the first clip now trades first
+    assert fill(book, "b2", 6) == [("plain", 5), ("ice", 1)]
+    # A partly filled clip keeps its place and the last refill is the rest of the reserve
+    assert fill(book, "b3", 5) == [("ice", 3), ("ice", 2)]
+    assert not book.asks and "ice" not in book.orders_by_id
+
+
+def test_refills_queue_behind_later_arrivals_each_time():
+    book = OrderBook()
+    book.add_order(Order(0, "ice", "AAPL", 100.0, 6, "sell", display_quantity=2))
+    book.add_order(Order(0, "p1", "AAPL", 100.0, 2, "sell"))
+    book.add_order(Order(0, "p2", "AAPL", 100.0, 2, "sell"))
+    assert fill(book, "b1", 10) == [("ice", 2), ("p1", 2), ("p2", 2), ("ice", 2), ("ice", 2)]
@@ -0,0 +1,93 @@
+import itertools
+import random
+
+import pytest
+
+from order import Order
+from order_book import BookListener, OrderBook
+
+SYMBOLS = ["AAPL", "MSFT"]
+OWNERS = ["alice", "bob", None]
+
+
+class Batches(BookListener):
+    def __init__(self):
+        self.batches = []
+
+    def orders_cancelled(self, orders):
+        self.batches.append([order.order_id for order in orders])
+
+
+def build_book():
+    rng = random.Random(7)
+    book = OrderBook()
+    orders = []
+    for index in range(60):
+        side = rng.choice(["buy", "sell"])
+        # Bids rest below 100 and asks above, so nothing crosses
+        price = float(rng.randint(90, 99) if side == "buy" else rng.randint(101, 110))
+        if index % 10 == 0:
+            order = Order(0, f"o{index}", rng.choice(SYMBOLS), price, 5, side, order_type="stop_limit",
+                          stop_price=price + (5 if side == "buy" else -5), owner=OWNERS[index // 10 % 3])
+        else:
+            order = Order(0, f"o{index}", rng.choice(SYMBOLS), price, rng.randint(1, 9), side,
+                          owner=rng.choice(OWNERS))
+        book.add_order(order)
+        orders.append(order)
+    return book, orders
+
+
+def matches(order, symbol, side, owner, min_price, max_price):
+    if order.order_type in ("stop", "stop_limit") and (min_price is not None or max_price is not None):
+        # Dormant stops are only cancelled without a price band
+        return False
+    return ((symbol is None or order.symbol == symbol) and (side is None or order.side == side)
+            and (owner is None or order.owner == owner)
+            and (min_price is None or order.price >= min_price) and (max_price is None or order.price <= max_price))
+
+
+FILTERS = list(itertools.product([None, "AAPL"], [None, "buy", "sell"], [None, "alice"],
+                                 [None, 95.0, 104.0], [None, 97.0, 106.0]))
+
+
+@pytest.mark.parametrize("symbol, side, owner, min_price, max_price", FILTERS)
+def test_mass_cancel_filters_combine(symbol, side, owner, min_price, max_price):
+    book, orders = build_book()
+    batches = Batches()
+    book.add_listener(batches)
+    expected = {order.order_id for order in orders if matches(order, symbol, side, owner, min_price, max_price)}
+
+    assert book.mass_cancel(symbol, side, owner, min_price, max_price) == len(expected)
+    assert len(batches.batches) == 1 and set(batches.batches[0]) == expected
+    for order in orders:
+        cancelled = order.order_id in expected
+        assert (order.status == "canceled") == cancelled
+        assert (order.order_id in book.orders_by_id or order.order_id in book.stops) != cancelled
+
+    # The levels, counts and owner index only hold what is left
+    for book_side in ("buy", "sell"):
+        remaining = list(book.iter_orders(book_side))
+        assert {order.order_id for order in remaining} == {
+            order.order_id for order in orders if order.side == book_side and order.order_id not in expected
+            and order.order_type == "limit"}
+        assert book.count_orders(book_side) == len(remaining)
+        assert sum(quantity for _, quantity, _ in book.get_depth(levels=100)[
+            "bids" if book_side == "buy" else "asks"]) == sum(order.quantity for order in remaining)
+    for name in ("alice", "bob"):
+        assert set(book.orders_by_owner.get(name, {})) == {
+            order.order_id for order in orders if order.owner == name and order.order_id not in expected}
+
+
+def test_cancel_all_for_owner_includes_stops():
+    book, orders = build_book()
+    alice = {order.order_id for order in orders if order.owner == "alice"}
+    assert any(order.order_type == "stop_limit" for order in orders if order.owner == "alice")
+    assert book.cancel_all_for_owner("alice") == len(alice)
+    assert "alice" not in book.orders_by_owner
+    assert not alice & (set(book.orders_by_id) | set(book.stops.orders_by_id))
+
+
+def test_mass_cancel_rejects_an_unknown_side():
+    book, _ = build_book()
+    with pytest.raises(ValueError):
+        book.mass_cancel(side="both")
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from numpy_book import NumpyOrderBook
+from order import Order
+from order_book import OrderBook
+
+
+def crossed_backlog(seed, count=300):
+    rng = random.Random(seed)
+    specs = []
+    for index in range(count):
+        side = rng.choice(["buy", "sell"])
+        centre = 100.05 if side == "buy" else 99.95
+        specs.append((index, str(index), "AAPL", round(centre + rng.randint(-15, 15) * 0.01, 2),
+                      rng.randint(1, 100), side))
+    return specs
+
+
+def build(book_class, specs):
+    book = book_class()
+    for spec in specs:
+        book.add_order(Order(*spec))
+    return book
+
+
+def outcome(book, fills):
+    return ([(buy.order_id, sell.order_id, quantity) for buy, sell, quantity in fills],
+            book.get_order_history(), book.get_depth(levels=None), book.last_matched_price)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_match_orders_matches_the_object_book(seed):
+    specs = crossed_backlog(seed)
+    books = [build(OrderBook, specs), build(NumpyOrderBook, specs)]
+    results = [outcome(book, book.match_orders()) for book in books]
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("allocation", ["fifo", "pro_rata"])
+def test_auction_matches_the_object_book(seed, allocation):
+    # A trade first, so the reference price takes part in the tie-breaks
+    specs = [(0, "ref_buy", "AAPL", 100.0, 1, "buy"), (0, "ref_sell", "AAPL", 100.0, 1, "sell")]
+    books = [build(OrderBook, specs), build(NumpyOrderBook, specs)]
+    for book in books:
+        book.match_orders()
+        for spec in crossed_backlog(seed):
+            book.add_order(Order(*spec))
+    indicative = [book.indicative_auction() for book in books]
+    assert repr(indicative[0]) == repr(indicative[1])
+
+    results = [outcome(book, book.run_auction(allocation)) for book in books]
+    assert results[0] == results[1]
+    assert {trade["price"] for trade in results[1][1][:len(results[1][0])]} == {indicative[1].price}
+    # The auction leaves the book uncrossed
+    assert books[1].indicative_auction() is None
+
+
+def test_pro_rata_shares_the_marginal_level():
+    book = NumpyOrderBook()
+    book.add_order(Order(0, "b1", "AAPL", 100.0, 7, "buy"))
+    book.add_order(Order(0, "b2", "AAPL", 100.0, 3, "buy"))
+    book.add_order(Order(0, "s1", "AAPL", 100.0, 5, "sell"))
+    fills = book.run_auction("pro_rata")
+    assert [(buy.order_id, quantity) for buy, _, quantity in fills] == [("b1", 4), ("b2", 1)]
+    with pytest.raises(ValueError):
+        book.run_auction("pro-rata")
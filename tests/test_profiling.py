@@ -0,0 +1,55 @@
+import logging
+import os
+import threading
+
+import pytest
+
+from order_book import OrderBook
+from profiling import SessionProfiler
+
+
+@pytest.mark.parametrize("value", ["cprofle", "yes", "memory"])
+def test_unknown_profile_mode_falls_back_to_disabled(monkeypatch, caplog, value):
+    monkeypatch.setenv("CLOB_PROFILE", value)
+    with caplog.at_level(logging.WARNING):
+        book = OrderBook()
+    assert not book.is_profiling()
+    assert "CLOB_PROFILE" in caplog.text
+
+
+def test_known_profile_mode_starts_a_session(monkeypatch, tmp_path):
+    monkeypatch.setenv("CLOB_PROFILE", "1")
+    monkeypatch.setenv("CLOB_PROFILE_DIR", str(tmp_path))
+    profiler = SessionProfiler.from_env()
+    assert profiler.enabled and profiler.mode == "cprofile"
+    assert all(os.path.exists(path) for path in profiler.stop())
+
+
+@pytest.mark.parametrize("mode", ["cprofile", "sampling"])
+def test_sections_nest_per_thread(tmp_path, mode):
+    profiler = SessionProfiler(output_dir=str(tmp_path), sample_interval=0.001)
+    profiler.start(mode=mode)
+    entered = threading.Barrier(4)
+    errors = []
+
+    def work():
+        try:
+            with profiler.section("outer"):
+                # Every thread is inside its outermost section at the same time
+                entered.wait(timeout=5)
+                for _ in range(200):
+                    with profiler.section("inner"):
+                        sum(range(100))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    profiler.stop()
+
+    assert errors == []
+    assert profiler._section_calls == {"outer": 4, "inner": 800}
+    assert profiler._profile_thread is None and profiler._active == {}
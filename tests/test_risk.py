@@ -0,0 +1,46 @@
+import pytest
+
+from order import Order
+from order_book import OrderBook
+from risk import RiskLimits, RiskManager, RiskRejected
+from user import User
+
+
+@pytest.fixture
+def users():
+    return User("alice", "pw", "trader", rounds=4), User("bob", "pw", "trader", rounds=4)
+
+
+def manager(**limits):
+    return RiskManager(OrderBook(), RiskLimits(price_band=None, max_orders_per_second=None, **limits))
+
+
+def test_positions_in_different_symbols_do_not_offset(users):
+    alice, bob = users
+    risk = manager(max_position=100)
+    risk.add_order(Order(0, "a1", "AAPL", 100.0, 100, "buy"), alice)
+    risk.add_order(Order(0, "b1", "AAPL", 100.0, 100, "sell"), bob)
+    risk.add_order(Order(0, "a2", "MSFT", 100.0, 100, "sell"), alice)
+    risk.add_order(Order(0, "b2", "MSFT", 100.0, 100, "buy"), bob)
+    risk.match_orders()
+    state = risk.state("alice")
+    assert (state.exposure("AAPL").position, state.exposure("MSFT").position) == (100, -100)
+    # Long 100 AAPL already: one more share would breach the limit even though MSFT is short 100
+    with pytest.raises(RiskRejected) as rejected:
+        risk.add_order(Order(0, "a3", "AAPL", 100.0, 1, "buy"), alice)
+    assert rejected.value.reason == "max_position"
+    risk.add_order(Order(0, "a4", "AAPL", 100.0, 50, "sell"), alice)
+
+
+def test_duplicate_id_keeps_the_resting_owner(users):
+    alice, bob = users
+    risk = manager()
+    risk.add_order(Order(0, "1", "AAPL", 100.0, 10, "buy"), alice)
+    with pytest.raises(ValueError):
+        risk.add_order(Order(0, "1", "AAPL", 100.0, 5, "buy"), bob)
+    assert risk.owners == {"1": "alice"}
+    with pytest.raises(RiskRejected):
+        risk.cancel_order("1", bob)
+    risk.cancel_order("1", alice)
+    state = risk.state("alice")
+    assert (state.open_orders, state.exposure("AAPL").open_buy_quantity) == (0, 0)
@@ -0,0 +1,77 @@
+import pytest
+
+from order import Order
+from order_book import BookListener, OrderBook
+
+
+class Cancels(BookListener):
+    """Listener recording the orders cancelled and reduced without a trade."""
+
+    def __init__(self):
+        self.cancelled = []
+        self.reduced = []
+
+    def order_cancelled(self, order):
+        self.cancelled.append(order.order_id)
+
+    def order_reduced(self, order, quantity):
+        self.reduced.append((order.order_id, quantity))
+
+
+def run(mode):
+    book = OrderBook(self_trade_prevention=mode)
+    cancels = Cancels()
+    book.add_listener(cancels)
+    # alice's resting sell is older than her crossing buy; bob's sell queues behind it
+    book.add_order(Order(0, "alice_sell", "AAPL", 100.0, 5, "sell", owner="alice"))
+    book.add_order(Order(0, "bob_sell", "AAPL", 100.0, 4, "sell", owner="bob"))
+    book.add_order(Order(0, "alice_buy", "AAPL", 100.0, 3, "buy", owner="alice"))
+    fills = [(buy.order_id, sell.order_id, quantity) for buy, sell, quantity in book.match_orders()]
+    return book, cancels, fills
+
+
+def test_without_prevention_an_owner_can_trade_with_itself():
+    _, cancels, fills = run(None)
+    assert fills == [("alice_buy", "alice_sell", 3)]
+    assert cancels.cancelled == []
+
+
+def test_cancel_newest():
+    book, cancels, fills = run("cancel_newest")
+    assert fills == []
+    assert cancels.cancelled == ["alice_buy"]
+    assert [order.order_id for order in book.iter_orders("sell")] == ["alice_sell", "bob_sell"]
+    assert book.orders_by_owner["alice"].keys() == {"alice_sell"}
+
+
+def test_cancel_oldest():
+    book, cancels, fills = run("cancel_oldest")
+    # With the resting order gone, the incoming one trades with the next owner
+    assert fills == [("alice_buy", "bob_sell", 3)]
+    assert cancels.cancelled == ["alice_sell"]
+    assert "alice" not in book.orders_by_owner
+
+
+def test_decrement_both():
+    book, cancels, fills = run("decrement_both")
+    assert fills == []
+    assert cancels.reduced == [("alice_buy", 3), ("alice_sell", 3)]
+    assert cancels.cancelled == ["alice_buy"]
+    assert book.orders_by_id["alice_sell"].quantity == 2
+    assert book.get_depth()["asks"] == [(100.0, 6, 2)]
+    assert book.get_order_history() == []
+
+
+@pytest.mark.parametrize("mode", ["cancel_newest", "cancel_oldest", "decrement_both"])
+def test_orders_without_an_owner_or_of_different_owners_trade(mode):
+    book = OrderBook(self_trade_prevention=mode)
+    book.add_order(Order(0, "s1", "AAPL", 100.0, 5, "sell"))
+    book.add_order(Order(0, "b1", "AAPL", 100.0, 5, "buy"))
+    book.add_order(Order(0, "s2", "AAPL", 100.0, 5, "sell", owner="alice"))
+    book.add_order(Order(0, "b2", "AAPL", 100.0, 5, "buy", owner="bob"))
+    assert len(book.match_orders()) == 2
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        OrderBook(self_trade_prevention="cancel_both")
@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from differential import apply_event, random_events
+from order import Order
+from order_book import OrderBook
+from state_digest import StateDigest, book_digest
+
+
+def apply_mixed(book, rng, index):
+    """Apply one random event, adding the order kinds random_events() leaves out."""
+    roll = rng.random()
+    order_id = f"x{index}"
+    side = rng.choice(["buy", "sell"])
+    price = round(100 + rng.randint(-20, 20) * 0.01, 2)
+    owner = rng.choice(["alice", "bob", None])
+    if roll < 0.1:
+        book.add_order(Order(0, order_id, "AAPL", price, rng.randint(10, 100), side,
+                             display_quantity=rng.randint(1, 10), owner=owner))
+    elif roll < 0.2:
+        stop_price = price + (0.05 if side == "buy" else -0.05)
+        book.add_order(Order(0, order_id, "AAPL", price, rng.randint(1, 50), side,
+                             order_type=rng.choice(["stop", "stop_limit"]), stop_price=stop_price, owner=owner))
+    elif roll < 0.25:
+        book.mass_cancel(owner=owner, side=rng.choice(["buy", "sell", None]))
+    elif roll < 0.3:
+        book.mass_cancel(min_price=price, max_price=price + 0.05)
+    else:
+        book.add_order(Order(0, order_id, "AAPL", price, rng.randint(1, 100), side, owner=owner))
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("mode", [None, "cancel_newest", "cancel_oldest", "decrement_both"])
+def test_incremental_digest_matches_a_full_scan(seed, mode):
+    book = OrderBook(self_trade_prevention=mode)
+    book.state_digest()
+    rng = random.Random(seed)
+    for index, event in enumerate(random_events(400, seed=seed, match_every=7)):
+        apply_event(book, event)
+        if rng.random() < 0.3:
+            apply_mixed(book, rng, index)
+        assert book.digest.order_digest == book_digest(book), f"event {index}: {event}"
+    assert book.get_order_history()
+
+
+def test_same_events_give_the_same_digest():
+    books = [OrderBook(), OrderBook()]
+    for book in books:
+        book.state_digest()
+        for event in random_events(300, seed=11):
+            apply_event(book, event)
+    assert books[0].state_digest() == books[1].state_digest()
+
+
+def test_fill_order_changes_the_trade_digest():
+    digests = []
+    for sells in (["s1", "s2"], ["s2", "s1"]):
+        book = OrderBook()
+        book.state_digest()
+        for order_id in sells:
+            book.add_order(Order(0, order_id, "AAPL", 100.0, 5, "sell"))
+        book.add_order(Order(0, "b1", "AAPL", 100.0, 10, "buy"))
+        book.match_orders()
+        digests.append(book.digest)
+    # Both books end up empty, so only the priority of the fills tells them apart
+    assert digests[0].order_digest == digests[1].order_digest == 0
+    assert digests[0].trade_digest != digests[1].trade_digest
+
+
+def test_digest_seeded_from_a_book_with_orders():
+    book = OrderBook()
+    for event in random_events(200, seed=3):
+        apply_event(book, event)
+    digest = StateDigest.from_book(book)
+    book.add_listener(digest)
+    for event in random_events(200, seed=4):
+        if event[0] == "add":
+            event = ("add", ("n" + event[1][0],) + event[1][1:])
+        apply_event(book, event)
+    assert digest.order_digest == book_digest(book)
@@ -0,0 +1,51 @@
+from order import Order
+from order_book import OrderBook
+
+
+def test_stop_trigger_cascade():
+    book = OrderBook()
+    book.add_order(Order(0, "b1", "AAPL", 100.0, 5, "buy"))
+    book.add_order(Order(0, "b2", "AAPL", 98.0, 5, "buy"))
+    book.add_order(Order(0, "b3", "AAPL", 96.0, 5, "buy"))
+    book.add_order(Order(0, "stop1", "AAPL", 95.0, 5, "sell", order_type="stop_limit", stop_price=99.0))
+    book.add_order(Order(0, "stop2", "AAPL", 95.0, 5, "sell", order_type="stop_limit", stop_price=97.0))
+    book.add_order(Order(0, "far", "AAPL", 80.0, 5, "sell", order_type="stop_limit", stop_price=90.0))
+    book.add_order(Order(0, "buy_stop", "AAPL", 120.0, 5, "buy", order_type="stop", stop_price=101.0))
+    assert len(book.stops) == 4 and not book.asks
+
+    book.add_order(Order(0, "s1", "AAPL", 99.0, 5, "sell"))
+    fills = book.match_orders()
+
+    # The trade at 99 triggers stop1, whose fill at 95 triggers stop2
+    assert [(buy.order_id, sell.order_id, quantity) for buy, sell, quantity in fills] == [
+        ("b1", "s1", 5), ("b2", "stop1", 5), ("b3", "stop2", 5)]
+    assert [trade["price"] for trade in reversed(book.get_order_history())] == [99.0, 95.0, 95.0]
+    assert book.get_order_history()[0]["price"] == book.last_matched_price == 95.0
+    assert sorted(order.order_id for order in book.stops.orders_by_id.values()) == ["buy_stop", "far"]
+    assert not book.orders_by_id
+
+
+def test_triggered_stops_change_type_and_join_the_back_of_their_level():
+    book = OrderBook()
+    book.add_order(Order(0, "b1", "AAPL", 100.0, 10, "buy"))
+    book.add_order(Order(0, "stop", "AAPL", 110.0, 3, "buy", order_type="stop", stop_price=100.0))
+    book.add_order(Order(0, "stop_limit", "AAPL", 99.0, 3, "buy", order_type="stop_limit", stop_price=100.0))
+    book.add_order(Order(0, "late", "AAPL", 99.0, 3, "buy"))
+    book.add_order(Order(0, "s1", "AAPL", 100.0, 1, "sell"))
+    book.match_orders()
+
+    assert book.orders_by_id["stop"].order_type == "market"
+    assert book.orders_by_id["stop_limit"].order_type == "limit"
+    # A triggered stop queues behind orders that were resting at its price
+    assert [order.order_id for order in book.iter_orders("buy")] == ["stop", "b1", "late", "stop_limit"]
+    assert not book.stops
+
+
+def test_cancelled_stop_never_triggers():
+    book = OrderBook()
+    book.add_order(Order(0, "b1", "AAPL", 100.0, 5, "buy"))
+    book.add_order(Order(0, "stop", "AAPL", 90.0, 5, "sell", order_type="stop_limit", stop_price=100.0))
+    book.cancel_order("stop")
+    book.add_order(Order(0, "s1", "AAPL", 100.0, 5, "sell"))
+    assert len(book.match_orders()) == 1
+    assert "stop" not in book.stops and "stop" not in book.orders_by_id
@@ -0,0 +1,36 @@
+import os
+
+from order import Order
+from trade_tape import TradeTapeReader, TradeTapeWriter, tape_day
+
+START_NS = 1_700_000_000_000_000_000
+
+
+def write_fills(directory, fills):
+    clock = iter(range(START_NS, START_NS + len(fills)))
+    writer = TradeTapeWriter(directory, clock=lambda: next(clock))
+    for symbol, buy_id, sell_id, buy_owner, sell_owner in fills:
+        buy = Order(0, buy_id, symbol, 100.0, 0, "buy", owner=buy_owner)
+        sell = Order(0, sell_id, symbol, 100.0, 0, "sell", owner=sell_owner)
+        writer.orders_matched(buy, sell, 1, 100.5)
+    writer.close()
+
+
+def test_long_utf8_fields_are_cut_at_a_character_boundary(tmp_path, caplog):
+    write_fills(tmp_path, [("AAPL", "an-order-id-longer-than-16", "s1", "abcdefghijklmnoé", None)])
+    trades = list(TradeTapeReader(tmp_path).iter_trades())
+    assert trades[0]["buy_order_id"] == "an-order-id-long"
+    assert trades[0]["buy_owner"] == "abcdefghijklmno"
+    assert trades[0]["sell_owner"] is None
+    assert "longer than 16 bytes" in caplog.text
+
+
+def test_symbols_stay_inside_the_tape_directory(tmp_path):
+    symbols = ["../escape", "BRK/B", ".hidden", "100%"]
+    write_fills(tmp_path / "tape", [(symbol, f"b{i}", f"s{i}", None, None) for i, symbol in enumerate(symbols)])
+    day = tape_day(START_NS)
+    assert os.listdir(tmp_path) == ["tape"]
+    reader = TradeTapeReader(tmp_path / "tape")
+    assert reader.symbols(day) == sorted(symbols)
+    assert {trade["symbol"]: trade["buy_order_id"] for trade in reader.iter_trades()} == {
+        symbol: f"b{i}" for i, symbol in enumerate(symbols)}
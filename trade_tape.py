@@ -0,0 +1,402 @@
+"""
+This module persists the fill stream to memory-mapped trade tape files.
+
+Every fill is appended as one fixed-width binary record to a file per UTC
+day and symbol, <directory>/<YYYY-MM-DD>/<symbol>.tape (the symbol
+percent-encoded by tape_filename(), so it is always one safe file name), so the history
+survives the process and can grow far beyond memory. A file starts with a
+header followed by RECORD-sized records in time order:
+
+    timestamp (ns since epoch), price, quantity,
+    buy order ID, sell order ID, buy owner, sell owner (16 bytes each, UTF-8,
+    NUL-padded; longer values are cut at a character boundary and logged)
+
+Next to each tape a sparse index, <symbol>.idx, holds the timestamp and
+record number of every index_interval-th record. Readers map the tape
+read-only and decode records in place: a time-range seek bisects the small
+index and then at most one interval of the tape, and TapeFile.array()
+exposes the records as a numpy.memmap structured array for vectorized
+analysis, such as TapeFile.bars(), without a parsing or loading step.
+
+Record fills from a book with OrderBook.enable_trade_tape(directory), or
+register a TradeTapeWriter as a BookListener. Print a summary of a tape
+directory with:
+
+    python trade_tape.py <directory>
+"""
+
+import argparse
+import logging
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_left
+from datetime import datetime, timezone
+from urllib.parse import quote, unquote
+
+from order_book import BookListener
+
+MAGIC = b'CLOBTAPE'
+VERSION = 1
+
+HEADER = struct.Struct('<8sII')  # magic, version, record size
+RECORD = struct.Struct('<qdq16s16s16s16s')  # timestamp_ns, price, quantity, buy/sell order ID, buy/sell owner
+INDEX_ENTRY = struct.Struct('<qQ')  # timestamp_ns, record number
+DAY_NS = 86_400 * 1_000_000_000
+FIELD_SIZE = 16  # Bytes of each order ID and owner field
+RECORD_FIELDS = ("timestamp_ns", "price", "quantity", "buy_order_id", "sell_order_id", "buy_owner", "sell_owner")
+
+
+def _text(value):
+    if value is None:
+        return b''
+    encoded = str(value).encode()
+    if len(encoded) <= FIELD_SIZE:
+        return encoded
+    # Cut at a character boundary so the field still decodes; the record can no longer be joined by this value
+    cut = encoded[:FIELD_SIZE].decode('utf-8', 'ignore').encode()
+    logging.warning(f"Trade tape field {value!r} is longer than {FIELD_SIZE} bytes; stored as {cut.decode()!r}")
+    return cut
+
+
+def _field(raw):
+    # errors='replace' keeps tapes written before fields were cut at character boundaries readable
+    return raw.rstrip(b'\0').decode('utf-8', 'replace')
+
+
+def tape_filename(symbol):
+    """
+    Return the file name of a symbol's tape, percent-encoding anything that is not safe in one path component.
+
+    Raises:
+        ValueError: If the symbol is empty.
+    """
+    symbol = str(symbol)
+    if not symbol:
+        raise ValueError("A trade tape needs a non-empty symbol")
+    name = quote(symbol, safe='')
+    if name.startswith('.'):
+        # Never '.', '..' or a hidden file
+        name = '%2E' + name[1:]
+    return f"{name}.tape"
+
+
+def tape_day(timestamp_ns):
+    """Return the UTC day, as YYYY-MM-DD, a tape record with this timestamp is filed under."""
+    return datetime.fromtimestamp(timestamp_ns / 1e9, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+class _TapeAppender:
+    def __init__(self, path, index_interval):
+        # Open for appending, dropping a torn record left by a crash mid-write
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER.size
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        if exists:
+            magic, version, record_size = HEADER.unpack(self.file.read(HEADER.size))
+            if magic != MAGIC or record_size != RECORD.size:
+                raise ValueError(f"{path} is not a version {VERSION} trade tape")
+            self.records = (os.path.getsize(path) - HEADER.size) // RECORD.size
+            self.file.truncate(HEADER.size + self.records * RECORD.size)
+            self.last_timestamp = 0
+            if self.records:
+                self.file.seek(HEADER.size + (self.records - 1) * RECORD.size)
+                self.last_timestamp = RECORD.unpack(self.file.read(RECORD.size))[0]
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+            self.records = 0
+            self.last_timestamp = 0
+        self.index = open(path[:-len('.tape')] + '.idx', 'r+b' if exists else 'w+b')
+        self.index.truncate(-(-self.records // index_interval) * INDEX_ENTRY.size)
+        self.index.seek(0, os.SEEK_END)
+        self.index_interval = index_interval
+
+    def append(self, timestamp_ns, price, quantity, buy_order, sell_order):
+        # Timestamps never go backwards within a file, so the index and bisects stay valid
+        timestamp_ns = max(timestamp_ns, self.last_timestamp)
+        self.last_timestamp = timestamp_ns
+        if self.records % self.index_interval == 0:
+            self.index.write(INDEX_ENTRY.pack(timestamp_ns, self.records))
+        self.file.write(RECORD.pack(timestamp_ns, price, quantity, _text(buy_order.order_id),
+                                    _text(sell_order.order_id), _text(buy_order.owner), _text(sell_order.owner)))
+        self.records += 1
+
+    def flush(self):
+        self.file.flush()
+        self.index.flush()
+
+    def close(self):
+        self.file.close()
+        self.index.close()
+
+
+class TradeTapeWriter(BookListener):
+    def __init__(self, directory, index_interval=1024, clock=time.time_ns):
+        """
+        Initialize a new TradeTapeWriter object appending fills under a directory.
+
+        Writes are buffered; call flush() (the order book does after every match
+        pass) to make them visible to readers in other processes.
+
+        Args:
+            directory (str): The tape directory, created if needed.
+            index_interval (int, optional): Records between sparse index entries. Defaults to 1024.
+            clock (callable, optional): Returns the fill time in nanoseconds since the epoch.
+                Defaults to time.time_ns.
+        """
+        self.directory = directory
+        self.index_interval = index_interval
+        self.clock = clock
+        self.files = {}  # (day, symbol) -> _TapeAppender
+        self.records = 0  # Records written by this object
+        self.day = None  # Current UTC day and its bounds in ns, so the day is not formatted per fill
+        self.day_start = self.day_end = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def orders_matched(self, buy_order, sell_order, quantity, price):
+        timestamp_ns = self.clock()
+        if not self.day_start <= timestamp_ns < self.day_end:
+            self.day = tape_day(timestamp_ns)
+            self.day_start = timestamp_ns - timestamp_ns % DAY_NS
+            self.day_end = self.day_start + DAY_NS
+        day = self.day
+        tape = self.files.get((day, buy_order.symbol))
+        if tape is None:
+            # A new day or symbol: finish the previous day's files before opening the next
+            for key in [key for key in self.files if key[0] != day]:
+                self.files.pop(key).close()
+            os.makedirs(os.path.join(self.directory, day), exist_ok=True)
+            tape = self.files[day, buy_order.symbol] = _TapeAppender(
+                os.path.join(self.directory, day, tape_filename(buy_order.symbol)), self.index_interval)
+        tape.append(timestamp_ns, price, quantity, buy_order, sell_order)
+        self.records += 1
+
+    def flush(self):
+        for tape in self.files.values():
+            tape.flush()
+
+    def close(self):
+        for tape in self.files.values():
+            tape.close()
+        self.files = {}
+        logging.info(f"Trade tape closed after {self.records} records in {self.directory}")
+
+
+class TapeFile:
+    def __init__(self, path):
+        """
+        Initialize a new TapeFile object, mapping a tape and its sparse index read-only.
+
+        Records appended after this object was created are not visible; open
+        the file again to see them.
+
+        Args:
+            path (str): The .tape file.
+
+        Raises:
+            ValueError: If the file is not a trade tape of this version.
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, version, record_size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or record_size != RECORD.size:
+                raise ValueError(f"{path} is not a version {VERSION} trade tape")
+            self.records = (os.fstat(f.fileno()).st_size - HEADER.size) // RECORD.size
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.records else b''
+        index_path = path[:-len('.tape')] + '.idx'
+        self.index_timestamps, self.index_records = [], []
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as f:
+                entries = f.read()
+                entries = entries[:len(entries) - len(entries) % INDEX_ENTRY.size]  # Drop a torn entry
+                for timestamp_ns, record in INDEX_ENTRY.iter_unpack(entries):
+                    if record < self.records:
+                        self.index_timestamps.append(timestamp_ns)
+                        self.index_records.append(record)
+
+    def __len__(self):
+        return self.records
+
+    def record(self, number):
+        """Return one raw record tuple (see RECORD_FIELDS) by its record number."""
+        return RECORD.unpack_from(self.data, HEADER.size + number * RECORD.size)
+
+    def timestamp(self, number):
+        return struct.unpack_from('<q', self.data, HEADER.size + number * RECORD.size)[0]
+
+    def seek(self, timestamp_ns):
+        """
+        Return the number of the first record at or after a timestamp.
+
+        The sparse index narrows the search to one index interval, which is
+        then bisected in the mapped file, so only a few pages are touched.
+        """
+        # The answer lies after the last entry before the timestamp and at or
+        # before the first entry at or after it
+        entry = bisect_left(self.index_timestamps, timestamp_ns)
+        low = self.index_records[entry - 1] if entry > 0 else 0
+        high = self.index_records[entry] if entry < len(self.index_records) else self.records
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamp(middle) < timestamp_ns:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def record_range(self, start_ns=None, end_ns=None):
+        """Return the (first, last + 1) record numbers with timestamps in [start_ns, end_ns)."""
+        first = 0 if start_ns is None else self.seek(start_ns)
+        last = self.records if end_ns is None else self.seek(end_ns)
+        return first, max(first, last)
+
+    def iter_records(self, start_ns=None, end_ns=None):
+        """Iterate over the raw record tuples (see RECORD_FIELDS) with timestamps in [start_ns, end_ns)."""
+        first, last = self.record_range(start_ns, end_ns)
+        if first == last:
+            return iter(())
+        view = memoryview(self.data)[HEADER.size + first * RECORD.size:HEADER.size + last * RECORD.size]
+        return RECORD.iter_unpack(view)
+
+    def iter_trades(self, symbol, start_ns=None, end_ns=None):
+        """
+        Iterate over the trades in [start_ns, end_ns) as dictionaries in the
+        order book's history format, oldest first.
+
+        The timestamp is in seconds with a fraction rather than the history's
+        whole seconds.
+        """
+        for timestamp_ns, price, quantity, buy_id, sell_id, buy_owner, sell_owner in \
+                self.iter_records(start_ns, end_ns):
+            yield {
+                "buy_order_id": _field(buy_id),
+                "sell_order_id": _field(sell_id),
+                "symbol": symbol,
+                "quantity": quantity,
+                "price": price,
+                "timestamp": timestamp_ns / 1e9,
+                "buy_owner": _field(buy_owner) or None,
+                "sell_owner": _field(sell_owner) or None,
+            }
+
+    def array(self, start_ns=None, end_ns=None):
+        """
+        Return the records in [start_ns, end_ns) as a read-only numpy.memmap structured array.
+
+        numpy is imported on first use, so reading a tape without it still works.
+        """
+        import numpy as np
+
+        dtype = np.dtype([("timestamp_ns", "<i8"), ("price", "<f8"), ("quantity", "<i8"),
+                          ("buy_order_id", "S16"), ("sell_order_id", "S16"), ("buy_owner", "S16"),
+                          ("sell_owner", "S16")])
+        first, last = self.record_range(start_ns, end_ns)
+        if first == last:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=HEADER.size + first * RECORD.size,
+                         shape=(last - first,))
+
+    def bars(self, interval_s, start_ns=None, end_ns=None):
+        """
+        Build OHLCV bars from the records in [start_ns, end_ns).
+
+        Args:
+            interval_s (float): Bar length in seconds.
+
+        Returns:
+            list: (bar start in ns, open, high, low, close, volume) tuples, oldest first,
+            for the intervals with at least one trade.
+        """
+        import numpy as np
+
+        records = self.array(start_ns, end_ns)
+        if not len(records):
+            return []
+        interval_ns = int(interval_s * 1e9)
+        buckets = records["timestamp_ns"] // interval_ns
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(records)]
+        prices = records["price"]
+        highs = np.maximum.reduceat(prices, starts)
+        lows = np.minimum.reduceat(prices, starts)
+        volumes = np.add.reduceat(records["quantity"], starts)
+        return [(int(buckets[start]) * interval_ns, float(prices[start]), float(high), float(low),
+                 float(prices[end - 1]), int(volume))
+                for start, end, high, low, volume in zip(starts, ends, highs, lows, volumes)]
+
+    def close(self):
+        if self.records:
+            self.data.close()
+
+
+class TradeTapeReader:
+    def __init__(self, directory):
+        """
+        Initialize a new TradeTapeReader object over a tape directory.
+
+        Args:
+            directory (str): The directory a TradeTapeWriter writes to.
+        """
+        self.directory = directory
+
+    def days(self):
+        """Return the days with tapes, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory)
+                      if os.path.isdir(os.path.join(self.directory, name)))
+
+    def symbols(self, day):
+        """Return the symbols with a tape on a day."""
+        return sorted(unquote(name[:-len('.tape')]) for name in os.listdir(os.path.join(self.directory, day))
+                      if name.endswith('.tape'))
+
+    def open(self, day, symbol):
+        """Map the tape of one symbol on one day; see TapeFile."""
+        return TapeFile(os.path.join(self.directory, day, tape_filename(symbol)))
+
+    def iter_trades(self, symbols=None, start_ns=None, end_ns=None):
+        """
+        Iterate over the trades in [start_ns, end_ns) as history dictionaries,
+        day by day and, within a day, symbol by symbol in time order.
+
+        Args:
+            symbols (list, optional): The symbols to read. Defaults to every symbol.
+            start_ns (int, optional): Earliest timestamp. Defaults to the start of the tape.
+            end_ns (int, optional): Timestamp to stop before. Defaults to the end of the tape.
+        """
+        first_day = tape_day(start_ns) if start_ns is not None else None
+        last_day = tape_day(end_ns) if end_ns is not None else None
+        for day in self.days():
+            if (first_day is not None and day < first_day) or (last_day is not None and day > last_day):
+                continue
+            for symbol in self.symbols(day):
+                if symbols is not None and symbol not in symbols:
+                    continue
+                tape = self.open(day, symbol)
+                try:
+                    yield from tape.iter_trades(symbol, start_ns, end_ns)
+                finally:
+                    tape.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a trade tape directory")
+    parser.add_argument("directory", help="Directory written by a TradeTapeWriter")
+    args = parser.parse_args()
+
+    reader = TradeTapeReader(args.directory)
+    for day in reader.days():
+        for symbol in reader.symbols(day):
+            tape = reader.open(day, symbol)
+            if len(tape):
+                last = tape.record(len(tape) - 1)
+                print(f"{day} {symbol:<8} {len(tape):>12} trades  last {last[1]:.2f} x {last[2]}")
+            else:
+                print(f"{day} {symbol:<8} {0:>12} trades")
+            tape.close()
+
+
+if __name__ == "__main__":
+    main()
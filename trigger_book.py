@@ -0,0 +1,162 @@
+"""
+This module holds dormant stop and stop-limit orders until a trade triggers them.
+
+A buy stop triggers when a trade prints at or above its stop price and a
+sell stop when a trade prints at or below it. Each side keeps its stops in
+buckets keyed by stop price with a sorted list of keys, arranged so the
+stops a trade triggers first are at the end of the list: keys are the
+negated stop price for buy stops (lowest stop last) and the stop price for
+sell stops (highest stop last).
+
+Activating the stops crossed by a trade is then one bisect and one slice
+off the end of the key list, O(k + log n) for k triggered stops, however
+many stops are resting further away. Triggered stops come out in a
+deterministic order: buy stops before sell stops, each in the order the
+price move reaches them, and in time priority within a stop price.
+"""
+
+from bisect import bisect_left, insort
+from collections import deque
+
+STOP_ORDER_TYPES = {"stop": "market", "stop_limit": "limit"}  # Stop type -> type once triggered
+
+
+class TriggerSide:
+    def __init__(self, side):
+        """
+        Initialize a new TriggerSide object.
+
+        Args:
+            side (str): The side of the stops held by this object ("buy" or "sell").
+        """
+        self.side = side
+        self.sign = -1 if side == "buy" else 1
+        self.buckets = {}  # Key -> deque of stops in time priority
+        self.keys = []  # Keys in ascending order; the next stops to trigger are last
+        self.order_count = 0
+
+    def __len__(self):
+        return self.order_count
+
+    def add(self, order):
+        key = self.sign * order.stop_price
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = deque()
+            insort(self.keys, key)
+        bucket.append(order)
+        self.order_count += 1
+
+    def remove(self, order):
+        """Remove a stop; linear only in the number of stops sharing its stop price."""
+        key = self.sign * order.stop_price
+        bucket = self.buckets[key]
+        bucket.remove(order)
+        self.order_count -= 1
+        if not bucket:
+            del self.buckets[key]
+            del self.keys[bisect_left(self.keys, key)]
+
+    def remove_orders(self, orders):
+        """Remove many stops at once, dropping or rebuilding each affected bucket once."""
+        by_key = {}  # Key -> set of stops to remove from its bucket
+        for order in orders:
+            by_key.setdefault(self.sign * order.stop_price, set()).add(order)
+        for key, removing in by_key.items():
+            bucket = self.buckets[key]
+            self.order_count -= len(removing)
+            if len(removing) == len(bucket):
+                del self.buckets[key]
+                del self.keys[bisect_left(self.keys, key)]
+            else:
+                self.buckets[key] = deque(order for order in bucket if order not in removing)
+
+    def pop_triggered(self, price):
+        """
+        Remove and return the stops triggered by a trade at the given price.
+
+        Args:
+            price (float): The highest traded price for buy stops, the lowest for sell stops.
+
+        Returns:
+            list: The triggered stops, first reached first and oldest first within a stop price.
+        """
+        keys = self.keys
+        index = bisect_left(keys, self.sign * price)
+        if index == len(keys):
+            return []
+        triggered = []
+        buckets = self.buckets
+        for key in reversed(keys[index:]):
+            triggered.extend(buckets.pop(key))
+        del keys[index:]
+        self.order_count -= len(triggered)
+        return triggered
+
+    def iter_orders(self):
+        """Iterate over the dormant stops in the order they would trigger."""
+        for index in range(len(self.keys) - 1, -1, -1):
+            yield from self.buckets[self.keys[index]]
+
+
+class TriggerBook:
+    def __init__(self):
+        """Initialize a new TriggerBook object with no dormant stops."""
+        self.buy_stops = TriggerSide("buy")
+        self.sell_stops = TriggerSide("sell")
+        self.orders_by_id = {}  # Dormant stops by order ID, for O(1) cancel lookup
+
+    def __len__(self):
+        return len(self.orders_by_id)
+
+    def __contains__(self, order_id):
+        return order_id in self.orders_by_id
+
+    def _side(self, side):
+        return self.buy_stops if side == "buy" else self.sell_stops
+
+    def add(self, order):
+        self._side(order.side).add(order)
+        self.orders_by_id[order.order_id] = order
+
+    def cancel(self, order_id):
+        """
+        Remove a dormant stop by its ID.
+
+        Returns:
+            Order: The removed stop, or None if no dormant stop has that ID.
+        """
+        order = self.orders_by_id.pop(order_id, None)
+        if order is not None:
+            self._side(order.side).remove(order)
+        return order
+
+    def cancel_orders(self, orders):
+        """Remove many dormant stops at once, visiting each affected stop price once."""
+        by_side = {"buy": [], "sell": []}
+        for order in orders:
+            del self.orders_by_id[order.order_id]
+            by_side[order.side].append(order)
+        self.buy_stops.remove_orders(by_side["buy"])
+        self.sell_stops.remove_orders(by_side["sell"])
+
+    def pop_triggered(self, high, low):
+        """
+        Remove and return the stops triggered by trades between low and high.
+
+        Args:
+            high (float): The highest traded price, checked against the buy stops.
+            low (float): The lowest traded price, checked against the sell stops.
+
+        Returns:
+            list: The triggered stops in activation order: buy stops, then sell stops.
+        """
+        triggered = self.buy_stops.pop_triggered(high) if self.buy_stops else []
+        if self.sell_stops:
+            triggered.extend(self.sell_stops.pop_triggered(low))
+        for order in triggered:
+            del self.orders_by_id[order.order_id]
+        return triggered
+
+    def iter_orders(self, side):
+        return self._side(side).iter_orders()
@@ -1,8 +1,12 @@
+import os
 import bcrypt
 import logging
 
 class User:
-    def __init__(self, username, password, role):
+    # bcrypt cost factor for new password hashes; each extra round doubles the hashing time
+    bcrypt_rounds = int(os.environ.get("CLOB_BCRYPT_ROUNDS", "12"))
+
+    def __init__(self, username, password, role, rounds=None):
         """
         Initialize a new User object.
 
@@ -10,10 +14,15 @@ class User:
             username (str): The username of the user.
             password (str): The password of the user.
             role (str): The role of the user.
+            rounds (int, optional): bcrypt cost factor for the password hash.
+                Defaults to User.bcrypt_rounds (CLOB_BCRYPT_ROUNDS, or 12).
         """
         # Set the username of the user
         self.username = username
 
+        # Set the bcrypt cost factor used for this user's password hashes
+        self.rounds = rounds or self.bcrypt_rounds
+
         # Hash the password using bcrypt and set it as the user's password
         self.password = self.hash_password(password)
 
@@ -26,8 +35,29 @@ class User:
         # Configure logging to a file named 'user.log' with the INFO log level and a specific format for log messages
         logging.basicConfig(filename='user.log', level=logging.INFO, format='%(asctime)s %(message)s')
 
+    @classmethod
+    def from_hash(cls, username, password_hash, role):
+        """
+        Create a User from a stored bcrypt hash without hashing anything.
+
+        Args:
+            username (str): The username of the user.
+            password_hash (bytes): The bcrypt hash stored for the user.
+            role (str): The role of the user.
+
+        Returns:
+            User: The user.
+        """
+        user = cls.__new__(cls)
+        user.username = username
+        user.rounds = cls.bcrypt_rounds
+        user.password = password_hash
+        user.role = role
+        user.logged_in = False
+        return user
+
     def hash_password(self, password):
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds))
 
     def check_password(self, password):
         return bcrypt.checkpw(password.encode('utf-8'), self.password)
@@ -0,0 +1,112 @@
+"""
+This module contains the persistent user repository backing the UserStore.
+
+Users are stored in SQLite with their existing bcrypt hashes, so restarting
+the application never rehashes a password. Nothing is read at startup: the
+UserStore loads a user's record the first time that username is looked up.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+
+
+class SQLiteUserRepository:
+    def __init__(self, path='users.db'):
+        """
+        Initialize a new SQLiteUserRepository object, creating the table if needed.
+
+        Args:
+            path (str, optional): Path of the SQLite database file, or ':memory:'.
+                Defaults to 'users.db'.
+        """
+        self.path = path
+        # One connection shared by the UI thread and the bcrypt worker pool, serialised by a lock
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                " username TEXT PRIMARY KEY,"
+                " password_hash BLOB NOT NULL,"
+                " role TEXT NOT NULL)"
+            )
+        logging.info(f"User repository opened: {path}")
+
+    @classmethod
+    def from_env(cls):
+        """Open the repository at CLOB_USER_DB, defaulting to 'users.db'."""
+        return cls(os.environ.get("CLOB_USER_DB", "users.db"))
+
+    def load(self, username):
+        """
+        Load one user's record.
+
+        Returns:
+            tuple: (password_hash, role), or None if the username is unknown.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT password_hash, role FROM users WHERE username = ?", (username,)
+            ).fetchone()
+        return None if row is None else (bytes(row[0]), row[1])
+
+    def exists(self, username):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT 1 FROM users WHERE username = ?", (username,)
+            ).fetchone() is not None
+
+    def count(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def insert(self, username, password_hash, role):
+        """
+        Store a new user.
+
+        Raises:
+            ValueError: If the username is already stored.
+        """
+        try:
+            with self._lock:
+                self._connection.execute(
+                    "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+                    (username, password_hash, role)
+                )
+        except sqlite3.IntegrityError:
+            raise ValueError(f"User {username} already exists")
+
+    def insert_many(self, records):
+        """
+        Store many (username, password_hash, role) records in one transaction.
+
+        This is meant for seeding and imports of existing hashes; no bcrypt work is done.
+        """
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(
+                    "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)", records
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def update(self, username, password_hash, role):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE users SET password_hash = ?, role = ? WHERE username = ?",
+                (password_hash, role, username)
+            )
+
+    def delete(self, username):
+        with self._lock:
+            self._connection.execute("DELETE FROM users WHERE username = ?", (username,))
+
+    def close(self):
+        with self._lock:
+            self._connection.close()